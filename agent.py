@@ -1,5 +1,5 @@
 # agent.py (UPDATED FOR OPENVOICE)
-import os, random, string, shutil
+import os, random, string
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -11,18 +11,59 @@ PUBLIC_DIR = "public_downloads"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(PUBLIC_DIR, exist_ok=True)
 
-# Music + Mixing
-from musicgen_generator import MusicGenGenerator
+# Music + Mixing (musicgen_generator pulls in torch; imported on first use)
 from mixer import mix_vocals_and_beat
+from pipeline import Stage, run_graph, run_graph_background
+from ffmpeg_render import render_videos
+from catalog import get_catalog
+from publisher import publish_file
+from events import JobProgress
+from metrics import StageTimer
+from looper import LOOP_CLIP_SECONDS, LOOP_FADE_OUT_SECONDS, build_loop_cell
+from inference_server import inference_enabled, get_client
+
+# rough share of a job's wall time per stage, for progress percent / ETA
+STAGE_WEIGHTS = {
+    "instrumental": 30,
+    "beat": 1,
+    "vocals": 30,
+    "rvc": 8,
+    "mix": 4,
+    "videos": 20,
+    "simple_mp4": 10,
+    "high_mp4": 10,
+    "wav": 1,
+    "search_image": 1,
+    "search_video": 1,
+    "artifacts": 0,
+    "publish": 1,
+}
+
+# "loop" = generate a short clip and loop one cell of it under the vocals (looper.py),
+# "full" = one 45 s MusicGen take, looped by the mixer
+INSTRUMENTAL_MODE = os.getenv("INSTRUMENTAL_MODE", "loop")
+
+# "ffmpeg" = single-pass filter-graph renderer, "moviepy" = generate_visual_mp4
+VIDEO_RENDERER = os.getenv("VIDEO_RENDERER", "ffmpeg")
+
+AUDIO_FORMATS = ("mp3", "wav")
+VIDEO_FORMATS = ("simple_mp4", "high_mp4")
+
+from assets import fetch_asset
 
 # Tools
 from tools import (
-    search_online_asset,
     generate_visual_mp4,
     store_generation,
     generate_voice_openvoice
 )
 
+# they are langchain @tool objects, which can't be called with keyword
+# arguments; the pipeline calls the plain functions underneath
+generate_visual_mp4, store_generation, generate_voice_openvoice = (
+    getattr(t, "func", t) for t in (generate_visual_mp4, store_generation, generate_voice_openvoice)
+)
+
 # Optional RVC
 try:
     from rvc_converter import convert_with_rvc
@@ -30,30 +71,11 @@ try:
 except:
     RVC_AVAILABLE = False
 
-# GitHub uploader fallback
+# GitHub uploader: custom module if present, else the durable background queue
 try:
     from agent_upload import upload_to_github
 except:
-    import base64, requests
-    GITHUB_USER = os.getenv("GITHUB_USER")
-    GITHUB_REPO = os.getenv("GITHUB_REPO")
-    GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-
-    def upload_to_github(local_path, github_folder="d-output"):
-        try:
-            filename = os.path.basename(local_path)
-            with open(local_path, "rb") as f:
-                content = base64.b64encode(f.read()).decode("utf-8")
-
-            url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{github_folder}/{filename}"
-            headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-            data = {"message": f"Add {filename}", "content": content}
-
-            r = requests.put(url, json=data, headers=headers)
-            return r.status_code in (200, 201)
-        except Exception as e:
-            print("GH upload error:", e)
-            return False
+    from uploader import upload_to_github
 
 
 # Helper: Large lyric support (6k words)
@@ -75,6 +97,24 @@ def split_lyrics(text, max_length=4000):
 
 
 
+# Helper: which outputs a request asks for
+def requested_formats(data):
+    """
+    Accepts file_format as a single name or comma separated list, or
+    file_formats as a list. Unknown names are dropped; defaults to mp3.
+    """
+    raw = data.get("file_formats") or data.get("file_format") or "mp3"
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    known = AUDIO_FORMATS + VIDEO_FORMATS
+    formats = []
+    for f in raw:
+        f = str(f).strip().lower()
+        if f in known and f not in formats:
+            formats.append(f)
+    return formats or ["mp3"]
+
+
 # ============================================================
 #                MAIN AGENT LOGIC (OPENVOICE)
 # ============================================================
@@ -84,7 +124,10 @@ def run_agent(data):
     genre = data.get("genre", "hip-hop")
     voice_type = data.get("voice_type", "default")   # "default", "clone"
     voice_sample = data.get("voice_sample")           # optional uploaded .wav
-    file_format = data.get("file_format", "mp3")
+    job_id = data.get("job_id")                       # set by the app's job queue
+    formats = requested_formats(data)
+    wants_simple = "simple_mp4" in formats
+    wants_high = "high_mp4" in formats
 
     # Generate unique ID
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -94,137 +137,277 @@ def run_agent(data):
     print("\n====================")
     print("[AGENT] STARTING JOB")
     print("====================\n")
+    print(f"[AGENT] formats: {', '.join(formats)}")
 
     # ---------------------------------------------------------
     # 1. Search for image + video background
+    #    (separate stages, so both searches run concurrently; each returns
+    #    a cached local file already sized for the renderers, or 'none')
     # ---------------------------------------------------------
-    print("[1] Searching background assets...")
-    pic_url = search_online_asset("image", title)
-    vid_url = search_online_asset("video", title)
+    def search_image(_):
+        print("[1] Fetching background image...")
+        return fetch_asset("image", title)
+
+    def search_video(_):
+        print("[1] Fetching background video...")
+        return fetch_asset("video", title)
 
     # ---------------------------------------------------------
     # 2. Generate instrumental using MUSICGEN
     # ---------------------------------------------------------
-    print("[2] Generating instrumental...")
-    instrumental = os.path.join(OUTPUT_DIR, f"{base}_instrumental.wav")
-
-    mg = MusicGenGenerator()
-    mg.generate(
-        prompt=f"{genre} instrumental",
-        duration=45,
-        out_path=instrumental
-    )
+    def instrumental(_):
+        print("[2] Generating instrumental...")
+        if inference_enabled():
+            # models live in the shared inference server, not in this worker
+            generate = get_client().musicgen
+        else:
+            from musicgen_generator import MusicGenGenerator
+            generate = MusicGenGenerator().generate
+        if INSTRUMENTAL_MODE == "loop":
+            out = os.path.join(OUTPUT_DIR, f"{base}_loop.wav")
+            generate(
+                prompt=f"{genre} instrumental loop, steady tempo",
+                duration=LOOP_CLIP_SECONDS,
+                out_path=out
+            )
+            return out
+        out = os.path.join(OUTPUT_DIR, f"{base}_instrumental.wav")
+        generate(
+            prompt=f"{genre} instrumental",
+            duration=45,
+            out_path=out
+        )
+        return out
+
+    # only the loop cell is written; the mixer repeats it to the vocal length
+    def beat(r):
+        print("[2b] Cutting the instrumental loop...")
+        out = os.path.join(OUTPUT_DIR, f"{base}_loop_cell.wav")
+        build_loop_cell(r["instrumental"], out)
+        return out
 
     # ---------------------------------------------------------
     # 3. Generate vocals using OPENVOICE
     # ---------------------------------------------------------
-    print("[3] Generating vocals with OpenVoice...")
-
-    vocal_raw = os.path.join(OUTPUT_DIR, f"{base}_vocals_raw.wav")
+    def vocals(_):
+        print("[3] Generating vocals with OpenVoice...")
 
-    if voice_type == "clone" and voice_sample:
-        print("[OpenVoice] Using user's uploaded voice sample...")
-        voice_clone_input = voice_sample
-    else:
-        voice_clone_input = None   # default OpenVoice voice
-
-    generated_vocals_path = generate_voice_openvoice(
-        lyrics=lyrics,
-        user_id=uid,
-        voice_clone_sample=voice_clone_input
-    )
+        if voice_type == "clone" and voice_sample:
+            print("[OpenVoice] Using user's uploaded voice sample...")
+            voice_clone_input = voice_sample
+        else:
+            voice_clone_input = None   # default OpenVoice voice
 
-    final_vocals = generated_vocals_path
+        tts = get_client().tts if inference_enabled() else generate_voice_openvoice
+        return tts(
+            lyrics=lyrics,
+            user_id=uid,
+            voice_clone_sample=voice_clone_input
+        )
 
     # ---------------------------------------------------------
     # 4. Optional RVC voice conversion
     # ---------------------------------------------------------
-    if voice_type == "clone" and RVC_AVAILABLE:
-        print("[4] Applying RVC model...")
-        rvc_out = os.path.join(OUTPUT_DIR, f"{base}_rvc.wav")
-        model_path = os.getenv("RVC_MODEL_PATH")
-        convert_with_rvc(final_vocals, rvc_out, model_path)
-        final_vocals = rvc_out
-    else:
+    def rvc(r):
+        final_vocals = r["vocals"]
+        if voice_type == "clone" and RVC_AVAILABLE:
+            print("[4] Applying RVC model...")
+            rvc_out = os.path.join(OUTPUT_DIR, f"{base}_rvc.wav")
+            model_path = os.getenv("RVC_MODEL_PATH")
+            convert_with_rvc(final_vocals, rvc_out, model_path)
+            return rvc_out
         print("[4] Skipping RVC...")
+        return final_vocals
 
     # ---------------------------------------------------------
     # 5. Mix vocals + instrumental → MP3
     # ---------------------------------------------------------
-    print("[5] Mixing vocals + instrumental...")
-    final_mp3 = os.path.join(OUTPUT_DIR, f"{base}.mp3")
-
-    mix_vocals_and_beat(
-        instrumental,
-        final_vocals,
-        final_mp3,
-        vocals_gain_dB=8.0
-    )
+    def mix(r):
+        print("[5] Mixing vocals + instrumental...")
+        final_mp3 = os.path.join(OUTPUT_DIR, f"{base}.mp3")
+        mix_vocals_and_beat(
+            r.get("beat") or r["instrumental"],
+            r["rvc"],
+            final_mp3,
+            vocals_gain_dB=8.0,
+            beat_fade_out=LOOP_FADE_OUT_SECONDS if r.get("beat") else 0.0
+        )
+        return final_mp3
 
     # ---------------------------------------------------------
     # 6. Generate MP4 videos (simple + high quality)
     # ---------------------------------------------------------
-    print("[6] Generating MP4 videos...")
+    def videos(r):
+        # one ffmpeg process renders both variants from a single audio decode
+        print("[6] Rendering simple + high MP4 in one ffmpeg pass...")
+        return render_videos(
+            audio_path=r["mix"],
+            title=title,
+            lyrics=lyrics.split("\n"),
+            user_id=uid,
+            pic=r.get("search_image"),
+            video=r.get("search_video"),
+            variants=[v for v in VIDEO_FORMATS if v in formats]
+        )
+
+    def simple_mp4(r):
+        print("[6] Generating simple MP4...")
+        return generate_visual_mp4(
+            audio_path=r["mix"],
+            file_format="simple_mp4",
+            pic=r["search_image"],
+            video=None,
+            title=title,
+            lyrics=lyrics.split("\n"),
+            user_id=uid
+        )
+
+    def high_mp4(r):
+        print("[6] Generating high MP4...")
+        return generate_visual_mp4(
+            audio_path=r["mix"],
+            file_format="high_mp4",
+            pic=None,
+            video=r["search_video"],
+            title=title,
+            lyrics=lyrics.split("\n"),
+            user_id=uid
+        )
 
-    simple_mp4 = generate_visual_mp4(
-        audio_path=final_mp3,
-        file_format="simple_mp4",
-        pic=pic_url,
-        video=None,
-        title=title,
-        lyrics=lyrics.split("\n"),
-        user_id=uid
-    )
-
-    high_mp4 = generate_visual_mp4(
-        audio_path=final_mp3,
-        file_format="high_mp4",
-        pic=None,
-        video=vid_url,
-        title=title,
-        lyrics=lyrics.split("\n"),
-        user_id=uid
-    )
+    # ---------------------------------------------------------
+    # 6b. WAV export (audio only)
+    # ---------------------------------------------------------
+    def wav(r):
+        print("[6] Exporting WAV...")
+        from pydub import AudioSegment
+        out = os.path.join(OUTPUT_DIR, f"{base}.wav")
+        AudioSegment.from_file(r["mix"]).export(out, format="wav")
+        return out
+
+    def artifacts(r):
+        out = {"audio": r["mix"]}
+        if "wav" in r:
+            out["wav"] = r["wav"]
+        out.update(r.get("videos", {}))
+        return out
 
     # ---------------------------------------------------------
-    # 7. Copy to public_downloads/
+    # 7. Publish to public_downloads/
     # ---------------------------------------------------------
-    print("[7] Copying files to public_downloads...")
-    for f in [final_mp3, simple_mp4, high_mp4]:
-        try:
-            shutil.copy(f, os.path.join(PUBLIC_DIR, os.path.basename(f)))
-        except Exception as e:
-            print("Copy error:", e)
+    def publish(r):
+        print("[7] Publishing files to public_downloads...")
+        catalog = get_catalog()
+        for kind, f in r["artifacts"].items():
+            try:
+                # hardlink/reflink into a content-addressed store, no byte copy
+                dest = publish_file(f, public_dir=PUBLIC_DIR)
+                catalog.add(dest, job_id=job_id, uid=uid,
+                            file_format="mp3" if kind == "audio" else kind)
+            except Exception as e:
+                print("Publish error:", e)
 
     # ---------------------------------------------------------
     # 8. Upload to GitHub
     # ---------------------------------------------------------
-    print("[8] Uploading to GitHub...")
-    upload_to_github(final_mp3)
-    upload_to_github(simple_mp4)
-    upload_to_github(high_mp4)
+    def upload(r):
+        print("[8] Uploading to GitHub...")
+        for f in r["artifacts"].values():
+            upload_to_github(f)
 
     # ---------------------------------------------------------
     # 9. Store metadata log
     # ---------------------------------------------------------
-    print("[9] Logging generation metadata...")
-    store_generation(
-        user_id=uid,
-        title=title,
-        lyrics=lyrics,
-        file_path=final_mp3,
-        file_format=file_format,
-        pic_url=pic_url,
-        video_url=vid_url
-    )
+    def store(r):
+        print("[9] Logging generation metadata...")
+        # one row per requested format with that format's file, so file_format
+        # stays a single indexed value (job_id groups a job's rows)
+        for fmt in formats:
+            path = r["artifacts"].get("audio" if fmt == "mp3" else fmt)
+            if path is None:
+                continue
+            store_generation(
+                user_id=uid,
+                title=title,
+                lyrics=lyrics,
+                file_path=path,
+                file_format=fmt,
+                pic_url=r.get("search_image"),
+                video_url=r.get("search_video"),
+                job_id=job_id
+            )
+
+    # Only the stages the requested formats need are scheduled: an audio-only
+    # job never searches for assets or touches the video encoder.
+    stages = [
+        Stage("instrumental", instrumental, resource="musicgen"),
+        Stage("vocals", vocals, resource="cpu"),
+        Stage("rvc", rvc, deps=["vocals"], resource="cpu"),
+    ]
+    if INSTRUMENTAL_MODE == "loop":
+        stages.append(Stage("beat", beat, deps=["instrumental"], resource="io"))
+        stages.append(Stage("mix", mix, deps=["beat", "rvc"], resource="ffmpeg"))
+    else:
+        stages.append(Stage("mix", mix, deps=["instrumental", "rvc"], resource="ffmpeg"))
+    artifact_deps = ["mix"]
+    search_deps = []
+    if wants_simple:
+        stages.append(Stage("search_image", search_image, resource="net"))
+        search_deps.append("search_image")
+    if wants_high:
+        stages.append(Stage("search_video", search_video, resource="net"))
+        search_deps.append("search_video")
+    if "wav" in formats:
+        stages.append(Stage("wav", wav, deps=["mix"], resource="ffmpeg"))
+        artifact_deps.append("wav")
+    if wants_simple or wants_high:
+        if VIDEO_RENDERER == "ffmpeg":
+            stages.append(Stage("videos", videos, deps=["mix", *search_deps], resource="ffmpeg"))
+        else:
+            rendered = []
+            if wants_simple:
+                stages.append(Stage("simple_mp4", simple_mp4, deps=["mix", "search_image"], resource="ffmpeg"))
+                rendered.append("simple_mp4")
+            if wants_high:
+                stages.append(Stage("high_mp4", high_mp4, deps=["mix", "search_video"], resource="ffmpeg"))
+                rendered.append("high_mp4")
+            stages.append(Stage("videos", lambda r: dict(r), deps=rendered, resource="io"))
+        artifact_deps.append("videos")
+    stages += [
+        Stage("artifacts", artifacts, deps=artifact_deps, resource="io"),
+        Stage("publish", publish, deps=["artifacts"], resource="io"),
+    ]
+
+    # Independent stages (searches, instrumental, vocals) start together;
+    # each resource class is capped by pipeline.RESOURCE_LIMITS.
+    progress = JobProgress(job_id, {s.name: STAGE_WEIGHTS.get(s.name, 1) for s in stages})
+    timer = StageTimer(job_id)
+
+    def on_stage(stage, state, error=None):
+        timer.on_stage(stage, state, error)
+        progress.on_stage(stage, state, error)
+
+    try:
+        results = run_graph(stages, on_stage=on_stage)
+    finally:
+        timer.finish()
+
+    # Uploads and bookkeeping don't block the job result.
+    run_graph_background([
+        Stage("upload", upload, deps=["artifacts"], resource="net"),
+        Stage("store", store, deps=["artifacts", *search_deps], resource="io"),
+    ], initial=results, name=f"agent-tail-{uid}", on_stage=timer.on_stage)
 
     print("\n====================")
     print("[AGENT] DONE")
     print("====================\n")
 
+    files = results["artifacts"]
     return {
-        "audio": final_mp3,
-        "simple_mp4": simple_mp4,
-        "high_mp4": high_mp4,
-        "uid": uid
+        "audio": files["audio"],
+        "wav": files.get("wav"),
+        "simple_mp4": files.get("simple_mp4"),
+        "high_mp4": files.get("high_mp4"),
+        "formats": formats,
+        "uid": uid,
+        "timings": dict(timer.timings)
     }
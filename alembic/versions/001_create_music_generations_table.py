@@ -0,0 +1,31 @@
+"""Create music generations table
+
+Revision ID: 001
+Revises:
+Create Date: 2025-10-30
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "music_generations",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(length=64), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("lyrics", sa.Text(), nullable=True),
+        sa.Column("file_path", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("music_generations")
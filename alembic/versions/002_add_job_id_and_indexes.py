@@ -0,0 +1,29 @@
+"""Add job id, lyrics length and lookup indexes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-10-30
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("music_generations", sa.Column("job_id", sa.String(length=32), nullable=True))
+    op.add_column("music_generations", sa.Column("lyrics_len", sa.Integer(), nullable=True))
+    op.create_index("ix_music_generations_user_id", "music_generations", ["user_id"])
+    op.create_index("ix_music_generations_created_at", "music_generations", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_music_generations_created_at", table_name="music_generations")
+    op.drop_index("ix_music_generations_user_id", table_name="music_generations")
+    op.drop_column("music_generations", "lyrics_len")
+    op.drop_column("music_generations", "job_id")
@@ -0,0 +1,22 @@
+"""Index file format
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_music_generations_file_format", "music_generations", ["file_format"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_music_generations_file_format", table_name="music_generations")
@@ -1,10 +1,16 @@
 # app.py
+import time
+_APP_IMPORT_T0 = time.perf_counter()
+
 import os
-import glob
+import json
 import threading
 from datetime import datetime
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, jsonify, send_from_directory, abort, url_for
+from flask import (
+    Flask, Response, render_template, request, jsonify, send_file, send_from_directory,
+    abort, url_for, stream_with_context
+)
 
 # -----------------------------------
 # Environment
@@ -13,6 +19,17 @@ load_dotenv()
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
+# Hand file bodies to the front-end server (nginx X-Accel / Apache X-Sendfile)
+# when one is configured; otherwise gunicorn's wsgi.file_wrapper sendfile()s
+# full responses itself.
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "0") == "1"
+ARTIFACT_MAX_AGE = int(os.getenv("ARTIFACT_MAX_AGE", 365 * 24 * 3600))
+
+# Server-Sent Events hold a request thread each (see gunicorn.conf.py); past
+# these limits the page falls back to polling /jobs/<id>
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", 8))          # per process
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", 600))
+
 # -----------------------------------
 # Directories
 # -----------------------------------
@@ -26,14 +43,35 @@ for folder in [OUTPUT_DIR, PUBLIC_DIR, VOICE_SAMPLES]:
     except Exception as e:
         print(f"[ERROR] Unable to create folder {folder}: {e}")
 
+from jobs import JobQueue, JobStore, QueueFull
+from model_registry import REGISTRY, WARMUP_MODELS
+from speaker_cache import get_speaker_cache
+from catalog import get_catalog
+from uploader import get_uploader, uploader_configured
+from events import BUS
+from inference_server import inference_enabled, get_client
+import metrics
+import startup
+
 # -----------------------------------
-# SAFE IMPORT — prevents Gunicorn crash
+# LAZY IMPORT — agent pulls in torch, moviepy and the models, so it is only
+# imported by the first job (or the warm-up thread), never by the web process
+# at boot. A failed import is retried on the next job instead of crashing.
 # -----------------------------------
-try:
-    from agent import run_agent
-except Exception as e:
-    print("\n[ERROR] Could not import agent.run_agent function!\n")
-    run_agent = None
+_run_agent = None
+_run_agent_lock = threading.Lock()
+
+
+def get_run_agent():
+    global _run_agent
+    with _run_agent_lock:
+        if _run_agent is None:
+            try:
+                _run_agent = startup.timed_import("agent").run_agent
+            except Exception as e:
+                print("\n[ERROR] Could not import agent.run_agent function!\n", e)
+                raise RuntimeError(f"run_agent() not available: {e}")
+        return _run_agent
 
 
 # -----------------------------------
@@ -51,34 +89,35 @@ def output_file_url(filename: str) -> str:
     return url_for("download", filename=filename, _external=False)
 
 
-def list_public_files(limit: int = 50):
+def list_public_files(limit: int = 50, cursor: int | None = None,
+                      job_id: str | None = None, file_format: str | None = None):
+    """Newest published files from the catalog; returns (items, next_cursor)."""
     try:
-        files = sorted(
-            glob.glob(os.path.join(PUBLIC_DIR, "*")),
-            key=os.path.getctime,
-            reverse=True,
+        rows, next_cursor = get_catalog().list(
+            limit=limit, cursor=cursor, job_id=job_id, file_format=file_format
         )
     except Exception as e:
         print(f"[ERROR] Could not list public files: {e}")
-        return []
-
-    files = files[:limit]
+        return [], None
 
     out = []
-    for p in files:
-        try:
-            stat = os.stat(p)
-            out.append({
-                "name": os.path.basename(p),
-                "size_bytes": stat.st_size,
-                "created_at": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                "public_url": public_file_url(os.path.basename(p)),
-                "output_url": output_file_url(os.path.basename(p))
-            })
-        except Exception as e:
-            print(f"[ERROR] Stat failed for {p}: {e}")
+    for row in rows:
+        out.append({
+            "name": row["name"],
+            "size_bytes": row["size_bytes"],
+            "created_at": datetime.fromtimestamp(row["created_at"]).isoformat(),
+            "format": row["format"],
+            "job_id": row["job_id"],
+            "public_url": public_file_url(row["name"]),
+            "output_url": output_file_url(row["name"])
+        })
 
-    return out
+    return out, next_cursor
+
+
+def catalog_etag(*parts) -> str:
+    # changes whenever anything is published, and per distinct query
+    return f"{get_catalog().version()}-" + "-".join(str(p) for p in parts)
 
 
 # -----------------------------------
@@ -89,37 +128,79 @@ def index():
     return render_template("index.html")
 
 
-@app.route("/download/<path:filename>")
-def download(filename):
+def serve_artifact(directory: str, filename: str):
+    """
+    Send a generated file with conditional + byte-range support (200/206/304).
+    ?inline=1 streams it for in-browser playback instead of forcing a download.
+    Artifact names are unique per job, so they are cached as immutable.
+    """
     filename = safe_filename(filename)
-    file_path = os.path.join(OUTPUT_DIR, filename)
-    if not os.path.exists(file_path):
+    file_path = os.path.join(directory, filename)
+    try:
+        st = os.stat(file_path)
+    except OSError:
         return abort(404)
-    return send_from_directory(OUTPUT_DIR, filename, as_attachment=True)
+
+    inline = request.args.get("inline", "").lower() in ("1", "true", "yes")
+    resp = send_file(
+        os.path.abspath(file_path),
+        as_attachment=not inline,
+        download_name=filename,
+        conditional=True,
+        etag=f"{st.st_size:x}-{st.st_mtime_ns:x}",
+        last_modified=st.st_mtime,
+        max_age=ARTIFACT_MAX_AGE,
+    )
+    resp.headers["Cache-Control"] = f"public, max-age={ARTIFACT_MAX_AGE}, immutable"
+    return resp
+
+
+@app.route("/download/<path:filename>")
+def download(filename):
+    return serve_artifact(OUTPUT_DIR, filename)
 
 
 @app.route("/public/<path:filename>")
 def public(filename):
-    filename = safe_filename(filename)
-    file_path = os.path.join(PUBLIC_DIR, filename)
-    if not os.path.exists(file_path):
-        return abort(404)
-    return send_from_directory(PUBLIC_DIR, filename, as_attachment=True)
+    return serve_artifact(PUBLIC_DIR, filename)
 
 
 @app.route("/latest")
 def latest():
-    files = glob.glob(os.path.join(PUBLIC_DIR, "*"))
-    if not files:
-        return jsonify({"error": "No generated file yet"}), 404
-    latest_file = max(files, key=os.path.getctime)
-    return send_from_directory(PUBLIC_DIR, os.path.basename(latest_file), as_attachment=True)
+    fmt = request.args.get("format")
+    # a file deleted behind the catalog's back is dropped and the next one tried
+    while True:
+        row = get_catalog().latest(file_format=fmt)
+        if row is None:
+            return jsonify({"error": "No generated file yet"}), 404
+        if os.path.exists(os.path.join(PUBLIC_DIR, row["name"])):
+            return send_from_directory(PUBLIC_DIR, row["name"], as_attachment=True)
+        get_catalog().remove(row["name"])
 
 
 @app.route("/list")
 def list_files():
-    limit = int(request.args.get("limit", 25))
-    return jsonify(list_public_files(limit=limit))
+    try:
+        limit = int(request.args.get("limit", 25))
+        cursor = request.args.get("cursor")
+        cursor = int(cursor) if cursor is not None else None
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be integers"}), 400
+    limit = max(1, min(limit, 500))
+    job_id = request.args.get("job")
+    fmt = request.args.get("format")
+
+    etag = catalog_etag(limit, cursor, job_id, fmt)
+    if request.if_none_match.contains(etag):
+        return "", 304, {"ETag": f'"{etag}"'}
+
+    items, next_cursor = list_public_files(limit=limit, cursor=cursor, job_id=job_id, file_format=fmt)
+    resp = jsonify(items)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    if next_cursor is not None:
+        resp.headers["X-Next-Cursor"] = str(next_cursor)
+    return resp
 
 
 @app.route("/upload_voice", methods=["POST"])
@@ -140,44 +221,170 @@ def upload_voice():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    # extract the speaker embedding now so the generation job finds it ready
+    try:
+        if inference_enabled():
+            get_client().speaker_prefetch(dest)
+        else:
+            get_speaker_cache().prefetch(dest)
+    except Exception as e:
+        print("[upload_voice] embedding prefetch failed:", e)
+
     return jsonify({"message": "uploaded", "path": dest})
 
 
 # -----------------------------------
-# BACKGROUND AGENT THREAD
+# BACKGROUND JOB QUEUE
 # -----------------------------------
-def _run_agent_thread(data: dict):
-    if run_agent is None:
-        print("[agent thread] ERROR: run_agent() not available")
-        return
+def _run_agent_job(job):
+    run_agent = get_run_agent()
+
+    print(f"[agent job {job.id}] Starting generation at {datetime.utcnow()}")
+    result = run_agent(dict(job.data, job_id=job.id))
+    print(f"[agent job {job.id}] Finished at {datetime.utcnow()}")
+    return result
+
+
+def _publish_job_status(job):
+    BUS.publish(job.id, dict(job.to_dict(), type="job"))
+    if job.status == "running":
+        metrics.JOB_QUEUE_WAIT_SECONDS.observe((job.started_at - job.created_at).total_seconds())
+    elif job.status in ("done", "failed") and job.started_at:
+        metrics.JOB_SECONDS.observe((job.finished_at - job.started_at).total_seconds(), status=job.status)
+
+
+job_queue = JobQueue(_run_agent_job, listener=_publish_job_status, store=JobStore())
+metrics.METRICS.gauge("lyricbeats_jobs_running", "Jobs currently being generated.",
+                      fn=job_queue.running)
+metrics.METRICS.gauge("lyricbeats_jobs_queued", "Jobs waiting for a worker.",
+                      fn=job_queue.pending)
 
+
+def _warmup():
+    t0 = time.perf_counter()
     try:
-        print(f"[agent thread] Starting generation at {datetime.utcnow()}")
-        run_agent(data)
-        print(f"[agent thread] Finished at {datetime.utcnow()}")
-    except Exception as e:
-        print("[agent thread] EXCEPTION:", e)
+        get_run_agent()
+    except RuntimeError:
+        pass
+    REGISTRY.warmup()
+    startup.mark("warmup", time.perf_counter() - t0)
+
+
+# optional: load models in the background so the first job doesn't pay for it
+# (not with an inference server: it owns the models)
+if WARMUP_MODELS and not inference_enabled():
+    threading.Thread(target=_warmup, name="model-warmup", daemon=True).start()
+
+# pick up uploads queued before the last restart
+if uploader_configured():
+    get_uploader().start()
 
 
 @app.route("/generate", methods=["POST"])
 def generate():
     data = request.get_json() or {}
 
-    # Run agent safely in background
-    threading.Thread(
-        target=_run_agent_thread,
-        args=(data,),
-        daemon=True
-    ).start()
+    try:
+        job = job_queue.submit(data)
+    except QueueFull as e:
+        return jsonify({"error": str(e), "status": "busy"}), 503
 
     return jsonify({
-        "message": "Generation started",
-        "status": "working",
+        "message": "Generation queued",
+        "status": job.status,
+        "job_id": job.id,
+        "status_url": url_for("job_status", job_id=job.id),
+        "events_url": url_for("job_events", job_id=job.id),
         "poll_latest": "/latest",
         "list_files": "/list"
     }), 202
 
 
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job)
+
+
+_sse_streams = 0
+_sse_lock = threading.Lock()
+
+
+def _release_sse_stream():
+    global _sse_streams
+    with _sse_lock:
+        _sse_streams -= 1
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """
+    Server-Sent Events: job status changes and per-stage progress. Events are
+    in-process, so only the worker running the job can stream it; anything
+    else (another worker's job, too many open streams, a stream open for
+    SSE_MAX_SECONDS) sends the client back to polling status_url.
+    """
+    global _sse_streams
+    status_url = url_for("job_status", job_id=job_id)
+    if job_queue.get(job_id) is None:
+        if job_queue.status(job_id) is not None:
+            return jsonify({"error": "job runs in another worker; poll status_url",
+                            "status_url": status_url}), 409
+        return jsonify({"error": "unknown job"}), 404
+    with _sse_lock:
+        if _sse_streams >= SSE_MAX_STREAMS:
+            return jsonify({"error": "too many event streams; poll status_url",
+                            "status_url": status_url}), 503
+        _sse_streams += 1
+
+    def stream():
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        yield "retry: 5000\n\n"
+        for event in BUS.subscribe(job_id):
+            if time.monotonic() > deadline:
+                yield f"event: poll\ndata: {json.dumps({'status_url': status_url})}\n\n"
+                return
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    resp = Response(stream_with_context(stream()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",   # don't let nginx buffer the stream
+    })
+    resp.call_on_close(_release_sse_stream)
+    return resp
+
+
+@app.route("/models")
+def models():
+    if inference_enabled():
+        try:
+            return jsonify(get_client().ping()["models"])
+        except Exception as e:
+            return jsonify({"error": f"inference server unavailable: {e}"}), 503
+    return jsonify(REGISTRY.stats())
+
+
+@app.route("/uploads")
+def uploads():
+    return jsonify(get_uploader().stats())
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    # per process: with several gunicorn workers each scrape hits one of them
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/startup")
+def startup_report():
+    return jsonify(startup.report())
+
+
 # -----------------------------------
 # Health
 # -----------------------------------
@@ -186,6 +393,9 @@ def health():
     return jsonify({"status": "ok", "time": datetime.utcnow().isoformat()})
 
 
+startup.mark("app_import", time.perf_counter() - _APP_IMPORT_T0)
+
+
 # -----------------------------------
 # LOCAL DEV ONLY
 # -----------------------------------
@@ -0,0 +1,374 @@
+# assets.py
+import os
+import re
+import glob
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from urllib.parse import urljoin, urlparse
+
+# -----------------------------------
+# Config
+# -----------------------------------
+# Serper-compatible search API; point at a local stub in tests
+ASSET_SEARCH_URL = os.getenv("ASSET_SEARCH_URL", "https://google.serper.dev")
+SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+ASSET_SEARCH_TTL = float(os.getenv("ASSET_SEARCH_TTL", 6 * 3600))        # seconds
+# only media from these (free stock) sites is used; empty = any host
+ASSET_HOSTS = tuple(h.strip() for h in os.getenv(
+    "ASSET_HOSTS", "pexels.com,unsplash.com,pixabay.com").split(",") if h.strip())
+
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", os.path.join("cache", "assets"))
+ASSET_CACHE_MAX_BYTES = int(float(os.getenv("ASSET_CACHE_MAX_MB", 2048)) * 2**20)
+ASSET_MAX_DOWNLOAD_BYTES = int(float(os.getenv("ASSET_MAX_DOWNLOAD_MB", 200)) * 2**20)
+ASSET_MAX_VIDEO_SECONDS = int(os.getenv("ASSET_MAX_VIDEO_SECONDS", 120))  # renders loop it
+ASSET_MAX_TRIES = int(os.getenv("ASSET_MAX_TRIES", 3))                    # candidates per fetch
+ASSET_TIMEOUT = (5, float(os.getenv("ASSET_READ_TIMEOUT", 30)))           # connect, read
+
+ASSET_SIZE = (1280, 720)
+ASSET_FPS = int(os.getenv("VIDEO_FPS", 24))
+PREPARED_TAG = f"{ASSET_SIZE[0]}x{ASSET_SIZE[1]}"
+
+_META_TAG = re.compile(r"<meta\s[^>]*>", re.I)
+_META_ATTR = re.compile(r'(property|name|content)\s*=\s*["\']([^"\']*)["\']', re.I)
+_PAGE_MEDIA = {
+    "image": ("og:image", "og:image:url", "twitter:image"),
+    "video": ("og:video:secure_url", "og:video:url", "og:video", "twitter:player:stream"),
+}
+
+
+def _host_allowed(url: str | None, hosts=ASSET_HOSTS) -> bool:
+    if not url:
+        return False
+    if not hosts:
+        return True
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in hosts)
+
+
+def is_prepared(path: str | None) -> bool:
+    """True for files written by AssetCache.prepare (already 1280x720)."""
+    return bool(path) and f"_{PREPARED_TAG}." in os.path.basename(path)
+
+
+# ============================================================
+#   SEARCH (TTL cached, one pooled HTTP session)
+# ============================================================
+class AssetSearch:
+    """
+    Image/video search against a Serper-compatible API. Results are cached
+    in memory per (type, query) for `ttl` seconds, so every job for the same
+    title reuses one lookup.
+    """
+
+    def __init__(self, base_url: str = ASSET_SEARCH_URL, api_key: str | None = SERPER_API_KEY,
+                 ttl: float = ASSET_SEARCH_TTL, hosts=ASSET_HOSTS):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.ttl = ttl
+        self.hosts = hosts
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None:
+            import requests
+            s = requests.Session()
+            if self.api_key:
+                s.headers["X-API-KEY"] = self.api_key
+            self._local.session = s
+        return s
+
+    def search(self, asset_type: str, query: str) -> list:
+        """Candidate URLs, best first. Empty on any error."""
+        key = (asset_type, " ".join(query.lower().split()))
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and hit[0] > now:
+                self.hits += 1
+                return list(hit[1])
+            self.misses += 1
+
+        try:
+            urls = self._query(asset_type, query)
+        except Exception as e:
+            print(f"[assets] {asset_type} search failed for '{query}':", e)
+            return []
+
+        with self._lock:
+            self._cache[key] = (now + self.ttl, urls)
+            for k in [k for k, (exp, _) in self._cache.items() if exp <= now]:
+                del self._cache[k]
+        return list(urls)
+
+    def _query(self, asset_type: str, query: str) -> list:
+        if not self.api_key and self.base_url == "https://google.serper.dev":
+            raise RuntimeError("SERPER_API_KEY not set")
+        endpoint = "images" if asset_type == "image" else "videos"
+        r = self._session().post(f"{self.base_url}/{endpoint}",
+                                 json={"q": f"{query} free stock {asset_type}"},
+                                 timeout=ASSET_TIMEOUT)
+        r.raise_for_status()
+        urls = []
+        for item in r.json().get(endpoint, []):
+            page = item.get("link")
+            # images come with a direct file URL; videos only with their page
+            url = item.get("imageUrl") if asset_type == "image" else page
+            if url and url not in urls and (_host_allowed(page, self.hosts) or _host_allowed(url, self.hosts)):
+                urls.append(url)
+        return urls
+
+
+# ============================================================
+#   CONTENT-HASHED, PRE-SIZED MEDIA CACHE
+# ============================================================
+class AssetCache:
+    """
+    Downloads media into a local cache keyed by the SHA-256 of its bytes and
+    stores it once, pre-scaled/cropped to 1280x720 (JPEG for images, a silent
+    H.264 clip for videos). Renders then read a local file that needs no
+    per-frame resize. An index maps each source URL to its content hash, and
+    files are evicted least-recently-used above max_bytes. Media that a web
+    page points to must come from `hosts` too.
+    """
+
+    def __init__(self, root: str = ASSET_CACHE_DIR, max_bytes: int = ASSET_CACHE_MAX_BYTES,
+                 hosts=ASSET_HOSTS):
+        self.root = root
+        self.hosts = hosts
+        self.media_dir = os.path.join(root, "media")
+        self.url_dir = os.path.join(root, "urls")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.downloads = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._files = OrderedDict()   # path -> size, oldest use first
+        self._bytes = 0
+        os.makedirs(self.media_dir, exist_ok=True)
+        os.makedirs(self.url_dir, exist_ok=True)
+        self._scan()
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    def fetch(self, url: str, asset_type: str) -> str:
+        """Local 1280x720 file for url; downloads and prepares it on a miss."""
+        url_key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        with self._lock:
+            lock = self._url_locks.setdefault(url_key, threading.Lock())
+
+        # one download per URL at a time; other callers wait and then hit
+        with lock:
+            path = self._lookup(url_key)
+            if path is not None:
+                return path
+
+            tmp_dir = tempfile.mkdtemp(prefix="asset_")
+            try:
+                src, digest = self._download(url, asset_type, tmp_dir)
+                dest = self._media_path(digest, asset_type)
+                with self._lock:
+                    known = dest in self._files
+                if known:
+                    with self._lock:
+                        self.hits += 1
+                    self._touch(dest)
+                else:
+                    self.prepare(src, dest, asset_type)
+                    self._add(dest)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            self._write_index(url_key, url, dest)
+            return dest
+
+    def prepare(self, src: str, dest: str, asset_type: str):
+        w, h = ASSET_SIZE
+        fit = f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h}"
+        # unique per call; a dot-file, so _scan() never mistakes it for media
+        tmp = os.path.join(os.path.dirname(dest), f".{uuid.uuid4().hex}{os.path.splitext(dest)[1]}")
+        if asset_type == "image":
+            cmd = ["ffmpeg", "-v", "error", "-y", "-i", src, "-vf", fit,
+                   "-frames:v", "1", "-q:v", "3", tmp]
+        else:
+            cmd = ["ffmpeg", "-v", "error", "-y", "-i", src, "-t", str(ASSET_MAX_VIDEO_SECONDS),
+                   "-an", "-vf", f"{fit},fps={ASSET_FPS},format=yuv420p",
+                   "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+                   "-movflags", "+faststart", tmp]
+        try:
+            subprocess.run(cmd, check=True)
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "downloads": self.downloads,
+                "evictions": self.evictions,
+                "files": len(self._files),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    # --------------------------
+    # Download
+    # --------------------------
+    def _download(self, url: str, asset_type: str, tmp_dir: str, follow_page: bool = True):
+        """Stream url to tmp_dir while hashing; a web page is resolved to its og: media."""
+        import requests
+
+        h = hashlib.sha256()
+        path = os.path.join(tmp_dir, "download")
+        with requests.get(url, stream=True, timeout=ASSET_TIMEOUT,
+                          headers={"User-Agent": "lyricbeats-assets/1.0"}) as r:
+            r.raise_for_status()
+            ctype = r.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if ctype in ("text/html", "application/xhtml+xml"):
+                if not follow_page:
+                    raise ValueError(f"{url} is a page, not {asset_type} media")
+                media = self._page_media(r.text, url, asset_type)
+                if not media:
+                    raise ValueError(f"no {asset_type} found on {url}")
+                if not _host_allowed(media, self.hosts):
+                    raise ValueError(f"{url} points to {media}, outside ASSET_HOSTS")
+                return self._download(media, asset_type, tmp_dir, follow_page=False)
+            if ctype and not ctype.startswith((asset_type + "/", "application/octet-stream")):
+                raise ValueError(f"{url} is {ctype}, not {asset_type}")
+
+            size = 0
+            with open(path, "wb") as f:
+                for block in r.iter_content(1 << 16):
+                    size += len(block)
+                    if size > ASSET_MAX_DOWNLOAD_BYTES:
+                        raise ValueError(f"{url} is larger than {ASSET_MAX_DOWNLOAD_BYTES} bytes")
+                    h.update(block)
+                    f.write(block)
+        with self._lock:
+            self.downloads += 1
+        return path, h.hexdigest()
+
+    @staticmethod
+    def _page_media(html: str, base_url: str, asset_type: str) -> str | None:
+        found = {}
+        for tag in _META_TAG.findall(html):
+            attrs = {k.lower(): v for k, v in _META_ATTR.findall(tag)}
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            if name and attrs.get("content") and name not in found:
+                found[name] = attrs["content"]
+        for name in _PAGE_MEDIA[asset_type]:
+            if name in found:
+                return urljoin(base_url, found[name])
+        return None
+
+    # --------------------------
+    # Index / LRU
+    # --------------------------
+    def _media_path(self, digest: str, asset_type: str) -> str:
+        ext = ".jpg" if asset_type == "image" else ".mp4"
+        return os.path.join(self.media_dir, f"{digest}_{PREPARED_TAG}{ext}")
+
+    def _lookup(self, url_key: str) -> str | None:
+        try:
+            with open(os.path.join(self.url_dir, url_key), encoding="utf-8") as f:
+                path = json.load(f)["path"]
+        except (OSError, ValueError, KeyError):
+            return None
+        with self._lock:
+            if path not in self._files:
+                return None   # evicted since
+            self.hits += 1
+        self._touch(path)
+        return path
+
+    def _write_index(self, url_key: str, url: str, path: str):
+        tmp = os.path.join(self.url_dir, f"{url_key}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "path": path}, f)
+        os.replace(tmp, os.path.join(self.url_dir, url_key))
+
+    def _scan(self):
+        entries = []
+        for p in glob.glob(os.path.join(self.media_dir, f"*_{PREPARED_TAG}.*")):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p, st.st_size))
+        for _, p, size in sorted(entries):
+            self._files[p] = size
+            self._bytes += size
+
+    def _touch(self, path: str):
+        with self._lock:
+            if path in self._files:
+                self._files.move_to_end(path)
+        try:
+            # mtime doubles as the LRU order after a restart
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _add(self, path: str):
+        size = os.path.getsize(path)
+        with self._lock:
+            self._bytes -= self._files.pop(path, 0)
+            self._files[path] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                old, old_size = self._files.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+
+_SEARCH = None
+_CACHE = None
+_SINGLETON_LOCK = threading.Lock()
+
+
+def get_search() -> AssetSearch:
+    global _SEARCH
+    with _SINGLETON_LOCK:
+        if _SEARCH is None:
+            _SEARCH = AssetSearch()
+        return _SEARCH
+
+
+def get_asset_cache() -> AssetCache:
+    global _CACHE
+    with _SINGLETON_LOCK:
+        if _CACHE is None:
+            _CACHE = AssetCache()
+        return _CACHE
+
+
+def fetch_asset(asset_type: str, query: str) -> str:
+    """
+    Search for an image/video matching query and return a local, pre-sized
+    copy of the first candidate that downloads; 'none' if nothing does.
+    """
+    for url in get_search().search(asset_type, query)[:ASSET_MAX_TRIES]:
+        try:
+            return get_asset_cache().fetch(url, asset_type)
+        except Exception as e:
+            print(f"[assets] skipping {url}: {e}")
+    return "none"
@@ -1,7 +1,9 @@
 # bark_generator.py
-import os, math, uuid
+import os, math, uuid, subprocess
 from pathlib import Path
 
+from model_registry import REGISTRY
+
 # guarded imports
 try:
     from bark import generate_audio, preload_models, save_audio, SAMPLE_RATE
@@ -10,14 +12,25 @@ except Exception as e:
     BARK_AVAILABLE = False
     print("[bark_generator] WARNING: bark not available:", e)
 
+# assemble chunks in-process (no part files, no ffmpeg); set 0 for the old concat path
+BARK_IN_MEMORY = os.getenv("BARK_IN_MEMORY", "1") == "1"
+
 def ensure_bark():
     if not BARK_AVAILABLE:
         raise RuntimeError("Bark package not installed. Install and retry.")
 
+def _load_bark():
+    ensure_bark()
+    # bark keeps its weights in module globals; preloading once is enough
+    preload_models()
+    return True
+
+REGISTRY.register("bark", _load_bark)
+
 class BarkGenerator:
     def __init__(self):
         if BARK_AVAILABLE:
-            preload_models()
+            REGISTRY.get("bark")
         else:
             print("[BarkGenerator] bark not installed; vocals won't generate.")
 
@@ -38,21 +51,43 @@ class BarkGenerator:
             chunks.append(" ".join(cur))
         return chunks
 
-    def generate_vocals(self, lyrics: str, voice: str, out_wav: str):
+    def _prompt(self, chunk: str, voice: str) -> str:
+        style = "deep male singer" if voice == "male" else "female soulful singer" if voice == "female" else "male singer"
+        return f"{style}. Sing the following lyrics melodically:\n\n{chunk}"
+
+    def generate_vocals(self, lyrics: str, voice: str, out_wav: str, in_memory: bool = BARK_IN_MEMORY):
         """
         lyrics: full text (up to ~6000 words)
         voice: 'male','female','custom'
         out_wav: output path
+        in_memory: stream chunks into one open WAV writer instead of
+                   part files + ffmpeg concat
         """
         ensure_bark()
         # split lyrics into manageable chunks
         chunks = self._chunks(lyrics, max_chars=400)  # tune size
         print(f"[BarkGenerator] split into {len(chunks)} chunks")
+        if in_memory:
+            return self._generate_streamed(chunks, voice, out_wav)
+        return self._generate_concat(chunks, voice, out_wav)
+
+    def _generate_streamed(self, chunks, voice: str, out_wav: str):
+        # bark.generate_audio takes a single prompt, so chunks are generated one
+        # at a time; each array goes straight to the writer and is dropped
+        import numpy as np
+        import soundfile as sf
+
+        with sf.SoundFile(out_wav, "w", samplerate=SAMPLE_RATE, channels=1, subtype="PCM_16") as out:
+            for i, chunk in enumerate(chunks):
+                print(f"[Bark] generating chunk {i+1}/{len(chunks)}")
+                audio_arr = generate_audio(self._prompt(chunk, voice))
+                out.write(np.asarray(audio_arr, dtype=np.float32).reshape(-1))
+        return out_wav
+
+    def _generate_concat(self, chunks, voice: str, out_wav: str):
         tmp_files = []
         for i, chunk in enumerate(chunks):
-            # craft prompt
-            style = "deep male singer" if voice == "male" else "female soulful singer" if voice == "female" else "male singer"
-            prompt = f"{style}. Sing the following lyrics melodically:\n\n{chunk}"
+            prompt = self._prompt(chunk, voice)
             tmp_out = f"{out_wav}.part{i}.wav"
             print(f"[Bark] generating chunk {i+1}/{len(chunks)} -> {tmp_out}")
             audio_arr = generate_audio(prompt)  # depends on bark API; returns numpy arr or similar
@@ -69,14 +104,18 @@ class BarkGenerator:
         with open(concat_list, "w", encoding="utf-8") as f:
             for p in tmp_files:
                 f.write(f"file '{os.path.abspath(p)}'\n")
-        # ffmpeg concat
-        os.system(f"ffmpeg -y -f concat -safe 0 -i \"{concat_list}\" -c copy \"{out_wav}\"")
-        # cleanup
-        for p in tmp_files:
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_list, "-c", "copy", out_wav],
+                check=True
+            )
+        finally:
+            # cleanup
+            for p in tmp_files:
+                try:
+                    os.remove(p)
+                except: pass
             try:
-                os.remove(p)
+                os.remove(concat_list)
             except: pass
-        try:
-            os.remove(concat_list)
-        except: pass
         return out_wav
\ No newline at end of file
@@ -0,0 +1,122 @@
+# benchmarks/bench_musicgen_cpu.py
+"""
+Compare MusicGen CPU settings: thread counts, inference_mode, int8 dynamic
+quantization, bf16 autocast and model size.
+
+    python benchmarks/bench_musicgen_cpu.py --duration 10 --sizes small --out cpu.json
+    python benchmarks/bench_musicgen_cpu.py --settings baseline,int8,int8+threads
+
+Each setting runs in a fresh subprocess. That is the only way to apply
+torch's process-wide thread settings, and it keeps the peak-memory figures
+honest. Reports load time, generation time, seconds of audio per wall-clock
+second (after one warm-up generation) and peak RSS.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHYSICAL_CORES = max(1, (os.cpu_count() or 2) // 2)
+
+# name -> env overrides (on top of batching and cache being disabled)
+SETTINGS = {
+    "baseline": {"MUSICGEN_INFERENCE_MODE": "0"},
+    "inference_mode": {},
+    "threads": {"MUSICGEN_THREADS": str(PHYSICAL_CORES), "MUSICGEN_INTEROP_THREADS": "1"},
+    "int8": {"MUSICGEN_QUANTIZE": "int8"},
+    "bf16": {"MUSICGEN_BF16": "1"},
+    "int8+threads": {"MUSICGEN_QUANTIZE": "int8", "MUSICGEN_THREADS": str(PHYSICAL_CORES),
+                     "MUSICGEN_INTEROP_THREADS": "1"},
+}
+
+
+def child(duration: int, repeat: int, prompt: str):
+    """Runs inside the subprocess: load, warm up, time, print one JSON line."""
+    sys.path.insert(0, ROOT)
+    import resource
+    import tempfile
+
+    t0 = time.perf_counter()
+    import musicgen_generator as mg
+    entry = mg.musicgen_entry()
+    load_s = time.perf_counter() - t0
+
+    gen = mg.MusicGenGenerator()
+    out = os.path.join(tempfile.mkdtemp(prefix="bench_mg_"), "take.wav")
+    gen.generate(prompt, 2, out, seed=0)   # warm-up: first call pays one-off costs
+
+    runs = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        gen.generate(prompt, duration, out, seed=i)
+        runs.append(time.perf_counter() - t0)
+    gen_s = sorted(runs)[len(runs) // 2]
+
+    print(json.dumps({
+        "profile": mg.cpu_profile(),
+        "load_s": round(load_s, 2),
+        "gen_s": round(gen_s, 2),
+        "runs": [round(r, 2) for r in runs],
+        "audio_s_per_wall_s": round(duration / gen_s, 3),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "param_mb": round((entry.param_bytes or 0) / 2**20, 1),
+    }))
+
+
+def run_setting(name: str, size: str, args) -> dict:
+    env = dict(os.environ, **SETTINGS[name])
+    env.update(MUSICGEN_SIZE=size, MUSICGEN_BATCHING="0", INSTRUMENTAL_CACHE="0")
+    env.pop("MUSICGEN_MODEL", None)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child",
+           "--duration", str(args.duration), "--repeat", str(args.repeat), "--prompt", args.prompt]
+    p = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=ROOT)
+    lines = [line for line in p.stdout.splitlines() if line.startswith("{")]
+    if p.returncode != 0 or not lines:
+        return {"error": (p.stderr.strip().splitlines() or ["exit %d" % p.returncode])[-1]}
+    return json.loads(lines[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--duration", type=int, default=10, help="seconds of audio per generation")
+    ap.add_argument("--repeat", type=int, default=2)
+    ap.add_argument("--sizes", default="small", help="comma separated: small,medium,large")
+    ap.add_argument("--settings", default=",".join(SETTINGS))
+    ap.add_argument("--prompt", default="hip-hop instrumental loop, steady tempo")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.duration, args.repeat, args.prompt)
+        return
+
+    names = [s.strip() for s in args.settings.split(",") if s.strip()]
+    unknown = set(names) - set(SETTINGS)
+    if unknown:
+        ap.error(f"unknown setting(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    print(f"{'size':<8}{'setting':<16}{'load':>8}{'gen':>9}{'audio s/s':>11}{'peak MB':>10}")
+    for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        for name in names:
+            r = results[f"{size}/{name}"] = run_setting(name, size, args)
+            if "error" in r:
+                print(f"{size:<8}{name:<16} ERROR {r['error'][:80]}")
+                continue
+            print(f"{size:<8}{name:<16}{r['load_s']:>7.1f}s{r['gen_s']:>8.1f}s"
+                  f"{r['audio_s_per_wall_s']:>11.3f}{r['peak_rss_mb']:>10.0f}")
+
+    report = {"duration": args.duration, "repeat": args.repeat, "cpus": os.cpu_count(), "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# benchmarks/bench_pipeline.py
+"""
+Offline benchmark of the generation pipeline, with the models replaced by the
+deterministic stubs in benchmarks/stubs.py (no weights, no network).
+
+    python benchmarks/bench_pipeline.py --durations 30,180,600 --repeat 3 --out bench.json
+    python benchmarks/bench_pipeline.py --out new.json --baseline bench.json --threshold 0.15
+    python benchmarks/bench_pipeline.py --compare bench.json new.json
+
+For each song length it times split_lyrics, mix_vocals_and_beat,
+generate_visual_mp4 (simple_mp4 and high_mp4), create_simple_mp4, Bark vocals
+and a full run_agent. The median wall time of each goes to JSON. With
+--baseline / --compare, a benchmark more than `threshold` slower than the
+baseline is flagged as a regression, and the exit status is 1.
+
+Everything runs in a scratch directory, so output/, the catalog and the DB
+are throwaway. A benchmark that can't run here (e.g. moviepy missing) is
+recorded with its error and skipped in comparisons.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import stubs  # noqa: E402  (benchmarks/ is on sys.path as the script dir)
+
+BENCHMARKS = (
+    "split_lyrics",
+    "mix",
+    "visual_simple_mp4",
+    "visual_high_mp4",
+    "create_simple_mp4",
+    "bark_vocals",
+    "run_agent",
+)
+
+
+def _unwrap(fn):
+    return getattr(fn, "func", fn)   # langchain @tool -> plain function
+
+
+def timed(fn, repeat: int, number: int = 1) -> dict:
+    """Run fn `number` times per round, `repeat` rounds; seconds per call."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            out = fn()
+        runs.append((time.perf_counter() - t0) / number)
+    return {
+        "wall_s": round(statistics.median(runs), 6),
+        "min_s": round(min(runs), 6),
+        "runs": [round(r, 6) for r in runs],
+        "last": out,
+    }
+
+
+class Bench:
+    """Fixtures and benchmark bodies for one song length."""
+
+    def __init__(self, seconds: int, formats: list):
+        self.seconds = seconds
+        self.formats = formats
+        self.tag = f"{seconds}s"
+        self.lyrics = stubs.lyrics_for(seconds)
+        self.beat = os.path.join("output", f"bench_beat_{self.tag}.wav")
+        self.vocals = os.path.join("output", f"bench_vocals_{self.tag}.wav")
+        self.mix_out = os.path.join("output", f"bench_mix_{self.tag}.mp3")
+        # run_agent asks MusicGen for 45 s; the vocals set the song length
+        stubs.StubMusicGenGenerator(rtf=0).generate("bench instrumental", 45, self.beat)
+        stubs.StubTTS(rtf=0).tts(self.lyrics, self.vocals)
+
+    def split_lyrics(self):
+        from agent import split_lyrics
+        return lambda: len(split_lyrics(self.lyrics)), 200
+
+    def mix(self):
+        from mixer import mix_vocals_and_beat
+        return lambda: mix_vocals_and_beat(self.beat, self.vocals, self.mix_out, vocals_gain_dB=8.0), 1
+
+    def _visual(self, fmt):
+        from tools import generate_visual_mp4
+        fn = _unwrap(generate_visual_mp4)
+        self._need_mix()
+        return lambda: fn(audio_path=self.mix_out, file_format=fmt, pic=None, video=None,
+                          title="Benchmark", lyrics=self.lyrics.split("\n"),
+                          user_id=f"bench_{self.tag}"), 1
+
+    def visual_simple_mp4(self):
+        return self._visual("simple_mp4")
+
+    def visual_high_mp4(self):
+        return self._visual("high_mp4")
+
+    def create_simple_mp4(self):
+        from mixer import create_simple_mp4
+        self._need_mix()
+        lyrics_file = os.path.join("output", f"bench_lyrics_{self.tag}.txt")
+        with open(lyrics_file, "w", encoding="utf-8") as f:
+            f.write(self.lyrics)
+        out = os.path.join("output", f"bench_simple_{self.tag}.mp4")
+        return lambda: create_simple_mp4(self.mix_out, out, title="Benchmark", lyrics_file=lyrics_file), 1
+
+    def bark_vocals(self):
+        from bark_generator import BarkGenerator
+        out = os.path.join("output", f"bench_bark_{self.tag}.wav")
+        gen = BarkGenerator()
+        return lambda: gen.generate_vocals(self.lyrics, "male", out), 1
+
+    def run_agent(self):
+        import agent
+        data = {"title": f"Benchmark {self.tag}", "lyrics": self.lyrics,
+                "genre": "hip-hop", "file_formats": self.formats}
+        return lambda: agent.run_agent(dict(data)), 1
+
+    def _need_mix(self):
+        if not os.path.exists(self.mix_out):
+            from mixer import mix_vocals_and_beat
+            mix_vocals_and_beat(self.beat, self.vocals, self.mix_out, vocals_gain_dB=8.0)
+
+
+def prepare_environment(workdir: str):
+    """Point every on-disk side effect at workdir, then install the stubs."""
+    os.chdir(workdir)
+    os.makedirs("output", exist_ok=True)
+    os.environ.setdefault("CATALOG_DB", os.path.join(workdir, "catalog.db"))
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("UPLOAD_QUEUE_DB", os.path.join(workdir, "uploads.db"))
+    stubs.install()
+
+
+def offline_agent():
+    """Stub the network-facing helpers run_agent imported by name."""
+    import agent
+    agent.fetch_asset = lambda *a, **k: "none"
+    agent.upload_to_github = lambda *a, **k: True
+
+
+def run(durations, repeat: int, only, formats) -> dict:
+    results = {}
+    agent_ok = True
+    try:
+        offline_agent()
+    except Exception as e:
+        agent_ok = False
+        print(f"[bench] agent unavailable: {e}")
+
+    for seconds in durations:
+        bench = Bench(seconds, formats)
+        for name in only:
+            key = f"{name}@{bench.tag}"
+            try:
+                fn, number = getattr(bench, name)()
+                res = timed(fn, repeat, number)
+            except Exception as e:
+                results[key] = {"error": f"{type(e).__name__}: {e}"}
+                print(f"[bench] {key:<28} ERROR {results[key]['error'][:100]}")
+                continue
+            last = res.pop("last")
+            if name == "run_agent" and agent_ok and isinstance(last, dict):
+                res["stages"] = last.get("timings")
+            if name != "split_lyrics":
+                res["audio_s_per_wall_s"] = round(seconds / res["wall_s"], 2) if res["wall_s"] else None
+            results[key] = res
+            print(f"[bench] {key:<28} {res['wall_s']:10.4f}s")
+    return results
+
+
+def metadata(args) -> dict:
+    try:
+        rev = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True).stdout.strip() or None
+    except Exception:
+        rev = None
+    return {
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "durations": args.durations,
+        "formats": args.formats,
+        "stub_rtf": stubs.STUB_RTF,
+        "mixer_engine": os.getenv("MIXER_ENGINE", "numpy"),
+        "video_renderer": os.getenv("VIDEO_RENDERER", "ffmpeg"),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# -----------------------------------
+# Comparison
+# -----------------------------------
+def compare(baseline: dict, current: dict, threshold: float, min_delta: float = 0.001) -> list:
+    """
+    Rows of (key, base_s, new_s, ratio, verdict) for keys timed in both.
+    Differences under min_delta seconds are timer noise and never flagged.
+    """
+    rows = []
+    base_r, cur_r = baseline.get("results", {}), current.get("results", {})
+    for key in sorted(set(base_r) & set(cur_r)):
+        b, c = base_r[key].get("wall_s"), cur_r[key].get("wall_s")
+        if not b or c is None:
+            continue
+        ratio = c / b
+        if abs(c - b) < min_delta:
+            verdict = "ok"
+        elif ratio > 1 + threshold:
+            verdict = "REGRESSION"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "ok"
+        rows.append((key, b, c, ratio, verdict))
+    return rows
+
+
+def print_comparison(rows, threshold: float) -> int:
+    print(f"\n{'benchmark':<30}{'baseline':>12}{'current':>12}{'ratio':>9}  (threshold ±{threshold:.0%})")
+    for key, b, c, ratio, verdict in rows:
+        print(f"{key:<30}{b:>11.4f}s{c:>11.4f}s{ratio:>9.2f}  {verdict}")
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    print(f"\n{len(regressions)} regression(s) in {len(rows)} comparable benchmark(s)")
+    return 1 if regressions else 0
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--durations", default="30,180,600", help="song lengths in seconds")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", default=",".join(BENCHMARKS), help="comma separated benchmark names")
+    ap.add_argument("--formats", default="mp3,wav,simple_mp4,high_mp4", help="formats for run_agent")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="compare this run against a saved JSON")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown (0.15 = 15%%)")
+    ap.add_argument("--min-delta", type=float, default=0.001,
+                    help="ignore differences smaller than this many seconds")
+    ap.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                    help="only compare two saved result files")
+    ap.add_argument("--workdir", help="scratch directory (default: a new temp dir)")
+    args = ap.parse_args()
+
+    if args.compare:
+        rows = compare(load(args.compare[0]), load(args.compare[1]), args.threshold, args.min_delta)
+        sys.exit(print_comparison(rows, args.threshold))
+
+    # resolve user paths before changing directory
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = load(os.path.abspath(args.baseline)) if args.baseline else None
+    args.durations = [int(d) for d in args.durations.split(",") if d.strip()]
+    args.formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    only = [b.strip() for b in args.only.split(",") if b.strip()]
+    unknown = set(only) - set(BENCHMARKS)
+    if unknown:
+        ap.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    prepare_environment(args.workdir or tempfile.mkdtemp(prefix="lyricbeats_bench_"))
+    report = {"meta": metadata(args), "results": run(args.durations, args.repeat, only, args.formats)}
+
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[bench] results written to {out}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if baseline is not None:
+        sys.exit(print_comparison(compare(baseline, report, args.threshold, args.min_delta), args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_render.py
+"""
+Compare video render throughput: moviepy (tools.generate_visual_mp4, one call
+per variant) vs the single-pass ffmpeg filter graph (ffmpeg_render).
+
+    python benchmarks/bench_render.py --seconds 30 --preset veryfast --threads 0
+
+Reports encoded frames per wall-clock second for both variants together.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ffmpeg_render  # noqa: E402
+
+
+def make_audio(path: str, seconds: int):
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "lavfi",
+         "-i", f"sine=frequency=220:duration={seconds}", "-b:a", "192k", path],
+        check=True,
+    )
+
+
+def bench_moviepy(audio, lyrics, uid):
+    from tools import generate_visual_mp4
+    fn = getattr(generate_visual_mp4, "func", generate_visual_mp4)   # unwrap @tool
+    t0 = time.perf_counter()
+    for fmt in ffmpeg_render.VARIANTS:
+        fn(audio_path=audio, file_format=fmt, pic=None, video=None,
+           title="Benchmark", lyrics=lyrics, user_id=uid)
+    return time.perf_counter() - t0
+
+
+def bench_ffmpeg(audio, lyrics, uid, preset, threads):
+    t0 = time.perf_counter()
+    ffmpeg_render.render_videos(audio, "Benchmark", lyrics, uid,
+                                preset=preset, threads=threads)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=int, default=30)
+    ap.add_argument("--preset", default=ffmpeg_render.X264_PRESET)
+    ap.add_argument("--threads", default=ffmpeg_render.X264_THREADS)
+    ap.add_argument("--skip-moviepy", action="store_true")
+    args = ap.parse_args()
+
+    os.makedirs(ffmpeg_render.OUTPUT_DIR, exist_ok=True)
+    audio = os.path.join(ffmpeg_render.OUTPUT_DIR, "bench_render.mp3")
+    make_audio(audio, args.seconds)
+    lyrics = [f"line {i} of the benchmark lyrics" for i in range(40)]
+    frames = args.seconds * ffmpeg_render.VIDEO_FPS * len(ffmpeg_render.VARIANTS)
+
+    results = {"seconds": args.seconds, "preset": args.preset, "threads": args.threads}
+    secs = bench_ffmpeg(audio, lyrics, "bench_ff", args.preset, args.threads)
+    results["ffmpeg"] = {"wall_s": round(secs, 2), "fps": round(frames / secs, 1)}
+    if not args.skip_moviepy:
+        secs = bench_moviepy(audio, lyrics, "bench_mp")
+        results["moviepy"] = {"wall_s": round(secs, 2), "fps": round(frames / secs, 1)}
+        results["speedup"] = round(results["moviepy"]["wall_s"] / results["ffmpeg"]["wall_s"], 2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
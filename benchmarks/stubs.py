@@ -0,0 +1,170 @@
+# benchmarks/stubs.py
+"""
+Deterministic stand-ins for the models, so the pipeline can be benchmarked
+offline without weights, a GPU or network access. Every stub writes a real
+16-bit WAV of a predictable length. The audio is a few seeded sines plus
+noise, so the mixer and encoders do realistic work.
+
+STUB_RTF adds simulated compute: each stub sleeps rtf seconds per second of
+audio it returns (0 = as fast as the disk allows).
+"""
+import os
+import sys
+import time
+import types
+import wave
+import zlib
+
+MUSICGEN_RATE = 32000
+OPENVOICE_RATE = 24000
+BARK_RATE = 24000
+WORDS_PER_SECOND = 2.5      # sung lyrics, roughly
+
+STUB_RTF = float(os.getenv("STUB_RTF", 0.0))
+
+
+def synth_wav(path: str, seconds: float, rate: int, seed: str, channels: int = 1) -> str:
+    """Write `seconds` of seeded synthetic audio to path (int16 PCM)."""
+    import numpy as np
+
+    rng = np.random.default_rng(zlib.crc32(seed.encode("utf-8")))
+    freqs = rng.uniform(110.0, 880.0, size=3)
+    block = rate * 10   # 10 s at a time keeps memory flat for long songs
+    total = int(seconds * rate)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        for start in range(0, total, block):
+            t = np.arange(start, min(total, start + block), dtype=np.float64) / rate
+            x = sum(np.sin(2 * np.pi * f * t) for f in freqs) / 6.0
+            x += rng.normal(0.0, 0.02, size=len(t))
+            pcm = (np.clip(x, -1.0, 1.0) * 32767).astype("<i2")
+            if channels > 1:
+                pcm = np.repeat(pcm[:, None], channels, axis=1)
+            w.writeframes(pcm.tobytes())
+    return path
+
+
+def _simulate(seconds: float, rtf: float):
+    if rtf > 0:
+        time.sleep(seconds * rtf)
+
+
+class StubMusicGenGenerator:
+    """Same generate() signature as musicgen_generator.MusicGenGenerator."""
+
+    def __init__(self, model_name: str | None = None, rtf: float = STUB_RTF):
+        self.model_name = model_name
+        self.rtf = rtf
+
+    def generate(self, prompt, duration, out_path, seed=None):
+        _simulate(duration, self.rtf)
+        return synth_wav(out_path, duration, MUSICGEN_RATE, f"musicgen:{prompt}:{seed}")
+
+
+class StubTTS:
+    """Same tts() signature as openvoice.api.TTS; length follows the word count."""
+
+    def __init__(self, words_per_second: float = WORDS_PER_SECOND, rtf: float = STUB_RTF):
+        self.words_per_second = words_per_second
+        self.rtf = rtf
+
+    def tts(self, text, output_path, speaker_embedding=None, speed=1.0):
+        seconds = max(0.5, len(text.split()) / (self.words_per_second * speed))
+        _simulate(seconds, self.rtf)
+        return synth_wav(output_path, seconds, OPENVOICE_RATE, f"tts:{text[:64]}")
+
+
+class StubBark:
+    """Mimics bark's generate_audio(text) -> float32 array at 24 kHz."""
+
+    def __init__(self, words_per_second: float = WORDS_PER_SECOND, rtf: float = STUB_RTF):
+        self.words_per_second = words_per_second
+        self.rtf = rtf
+
+    def generate_audio(self, text, history_prompt=None, **_):
+        import numpy as np
+
+        seconds = max(0.5, len(text.split()) / self.words_per_second)
+        _simulate(seconds, self.rtf)
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        t = np.arange(int(seconds * BARK_RATE)) / BARK_RATE
+        return (0.3 * np.sin(2 * np.pi * rng.uniform(110, 440) * t)).astype(np.float32)
+
+
+class StubRVC:
+    """
+    Converter for rvc_worker (RVC_CONVERTER=benchmarks.stubs:StubRVC). The
+    "model" is the path and its size; conversion rewrites the input at 0.8
+    gain, so outputs differ from inputs but keep their length.
+    """
+
+    def __init__(self, rtf: float = STUB_RTF, load_seconds: float = 0.0):
+        self.rtf = rtf
+        self.load_seconds = load_seconds
+        self.loaded = []
+
+    def load_model(self, path):
+        time.sleep(self.load_seconds)
+        self.loaded.append(path)
+        return {"path": path, "bytes": os.path.getsize(path)}
+
+    def convert(self, model, input_wav, output_wav):
+        import numpy as np
+
+        with wave.open(input_wav, "rb") as r:
+            params = r.getparams()
+            pcm = np.frombuffer(r.readframes(params.nframes), dtype="<i2")
+        _simulate(params.nframes / params.framerate, self.rtf)
+        with wave.open(output_wav, "wb") as w:
+            w.setparams(params)
+            w.writeframes((pcm * 0.8).astype("<i2").tobytes())
+        return output_wav
+
+    def convert_batch(self, model, pairs):
+        return [self.convert(model, i, o) for i, o in pairs]
+
+
+def install(rtf: float = STUB_RTF, words_per_second: float = WORDS_PER_SECOND):
+    """
+    Swap the stubs in before agent/tools are imported:
+      - musicgen_generator is replaced by a module exposing the stub class
+        (the real one imports torch at module level)
+      - 'openvoice' in the model registry loads StubTTS
+      - bark_generator's module-level bark functions call StubBark
+    Chunked TTS is forced in-process (OPENVOICE_WORKERS=1), since spawned
+    pool workers would load the real model.
+    """
+    from model_registry import REGISTRY
+
+    os.environ.setdefault("OPENVOICE_WORKERS", "1")
+
+    mg = types.ModuleType("musicgen_generator")
+    mg.DEVICE = "cpu"
+    mg.MusicGenGenerator = lambda *a, **k: StubMusicGenGenerator(*a, rtf=rtf, **k)
+    sys.modules["musicgen_generator"] = mg
+
+    try:
+        import tools  # noqa: F401  registers the real loader at import; override it after
+    except Exception as e:
+        print("[stubs] tools not importable:", e)
+    REGISTRY.register("openvoice", lambda: StubTTS(words_per_second, rtf))
+
+    import bark_generator
+    bark = StubBark(words_per_second, rtf)
+    bark_generator.BARK_AVAILABLE = True
+    bark_generator.SAMPLE_RATE = BARK_RATE
+    bark_generator.generate_audio = bark.generate_audio
+    REGISTRY.register("bark", lambda: True)
+
+
+def lyrics_for(seconds: float, words_per_second: float = WORDS_PER_SECOND) -> str:
+    """Deterministic lyrics that a StubTTS sings in about `seconds`."""
+    vocab = ("we ride the night under neon light hearts on fire never stop "
+             "the beat goes on city lights and dreams come alive tonight").split()
+    words = int(seconds * words_per_second)
+    lines = []
+    for i in range(0, words, 8):
+        lines.append(" ".join(vocab[(i + j) % len(vocab)] for j in range(min(8, words - i))))
+    return "\n".join(lines)
@@ -0,0 +1,172 @@
+# catalog.py
+import os
+import glob
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# -----------------------------------
+# Config
+# -----------------------------------
+PUBLIC_DIR = "public_downloads"
+CATALOG_DB = os.getenv("CATALOG_DB", "catalog.db")
+
+_FORMAT_BY_EXT = {".mp3": "mp3", ".wav": "wav"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    name        TEXT NOT NULL UNIQUE,
+    job_id      TEXT,
+    uid         TEXT,
+    format      TEXT,
+    size_bytes  INTEGER NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_files_job ON files (job_id);
+CREATE INDEX IF NOT EXISTS ix_files_format ON files (format);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+
+def guess_format(name: str) -> str | None:
+    base, ext = os.path.splitext(name.lower())
+    if ext == ".mp4":
+        for variant in ("simple", "high"):
+            if os.path.basename(base).startswith(variant + "_"):
+                return f"{variant}_mp4"
+        return "mp4"
+    return _FORMAT_BY_EXT.get(ext)
+
+
+class FileCatalog:
+    """
+    SQLite index of everything published to public_downloads/. It is written
+    when a job publishes, so /list and /latest never glob or stat the
+    directory. The shared database file keeps every gunicorn worker in sync.
+    A 'version' counter bumps on every change and drives the HTTP ETags.
+    """
+
+    def __init__(self, db_path: str = CATALOG_DB, public_dir: str = PUBLIC_DIR):
+        self.db_path = db_path
+        self.public_dir = public_dir
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _conn(self):
+        self._ensure_schema()
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ensure_schema(self):
+        if self._ready:
+            return
+        with self._init_lock:
+            if self._ready:
+                return
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                empty = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 0
+                conn.commit()
+            finally:
+                conn.close()
+            self._ready = True
+        if empty:
+            self.backfill()
+
+    # --------------------------
+    # Writes
+    # --------------------------
+    def add(self, path: str, job_id: str | None = None, uid: str | None = None,
+            file_format: str | None = None):
+        name = os.path.basename(path)
+        st = os.stat(path)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO files (name, job_id, uid, format, size_bytes, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET job_id=excluded.job_id, uid=excluded.uid, "
+                "format=excluded.format, size_bytes=excluded.size_bytes, created_at=excluded.created_at",
+                (name, job_id, uid, file_format or guess_format(name), st.st_size, st.st_ctime or time.time()),
+            )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def remove(self, name: str):
+        with self._conn() as conn:
+            cur = conn.execute("DELETE FROM files WHERE name = ?", (name,))
+            if cur.rowcount:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def backfill(self):
+        """One-time import of files already on disk (oldest first)."""
+        paths = sorted(glob.glob(os.path.join(self.public_dir, "*")), key=os.path.getctime)
+        for p in paths:
+            if os.path.isfile(p) and not p.endswith(".txt"):
+                try:
+                    self.add(p)
+                except OSError:
+                    pass
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def version(self) -> int:
+        with self._conn() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def list(self, limit: int = 25, cursor: int | None = None, job_id: str | None = None,
+             file_format: str | None = None):
+        """
+        Newest first. Returns (rows, next_cursor); pass next_cursor back to get
+        the following page, None means there is nothing older.
+        """
+        limit = max(1, limit)
+        where, args = [], []
+        if cursor is not None:
+            where.append("id < ?")
+            args.append(cursor)
+        if job_id:
+            where.append("job_id = ?")
+            args.append(job_id)
+        if file_format:
+            where.append("format = ?")
+            args.append(file_format)
+        sql = "SELECT * FROM files"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        args.append(limit + 1)
+
+        with self._conn() as conn:
+            rows = [dict(r) for r in conn.execute(sql, args)]
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def latest(self, file_format: str | None = None):
+        rows, _ = self.list(limit=1, file_format=file_format)
+        return rows[0] if rows else None
+
+
+_CATALOG = None
+_CATALOG_LOCK = threading.Lock()
+
+
+def get_catalog() -> FileCatalog:
+    global _CATALOG
+    with _CATALOG_LOCK:
+        if _CATALOG is None:
+            _CATALOG = FileCatalog()
+        return _CATALOG
@@ -0,0 +1,195 @@
+# chunked_tts.py
+import os
+import re
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# -----------------------------------
+# Config
+# -----------------------------------
+CHUNKED_TTS = os.getenv("OPENVOICE_CHUNKED", "1") == "1"
+CHUNK_CHARS = int(os.getenv("OPENVOICE_CHUNK_CHARS", 600))
+# lyrics shorter than this go through a single tts call
+CHUNKED_MIN_CHARS = int(os.getenv("OPENVOICE_CHUNKED_MIN_CHARS", 1500))
+MAX_WORKERS = int(os.getenv("OPENVOICE_WORKERS", min(4, os.cpu_count() or 1)))
+CROSSFADE_MS = int(os.getenv("OPENVOICE_CROSSFADE_MS", 40))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def split_on_boundaries(text: str, max_chars: int = CHUNK_CHARS):
+    """
+    Split text into chunks of at most max_chars, breaking on line ends first,
+    then sentence ends, and only falling back to word boundaries for very long
+    sentences. Short lines are packed together.
+    """
+    pieces = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) <= max_chars:
+            pieces.append(line)
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            if len(sentence) <= max_chars:
+                pieces.append(sentence)
+                continue
+            words, buff = sentence.split(), ""
+            for w in words:
+                if buff and len(buff) + len(w) + 1 > max_chars:
+                    pieces.append(buff)
+                    buff = w
+                else:
+                    buff = f"{buff} {w}" if buff else w
+            if buff:
+                pieces.append(buff)
+
+    chunks, buff = [], ""
+    for p in pieces:
+        if buff and len(buff) + len(p) + 1 > max_chars:
+            chunks.append(buff)
+            buff = p
+        else:
+            buff = f"{buff}\n{p}" if buff else p
+    if buff:
+        chunks.append(buff)
+    return chunks
+
+
+# -----------------------------------
+# Worker side (runs in pool processes, or in-process with one worker)
+# -----------------------------------
+def _init_worker():
+    from model_registry import REGISTRY
+    REGISTRY.entry("openvoice")
+
+
+def _synthesize_chunk(args):
+    text, speaker_embedding, out_path = args
+    from model_registry import REGISTRY
+
+    ov = REGISTRY.entry("openvoice")
+    with ov.lock:
+        ov.model.tts(
+            text=text,
+            output_path=out_path,
+            speaker_embedding=speaker_embedding,
+            speed=1.0
+        )
+    return out_path
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # one pool per process, reused across jobs so each worker loads the model once;
+    # sized from the config, not from whichever job happens to create it.
+    # spawn, because forking a process that runs job threads is unsafe
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=max(1, MAX_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _POOL
+
+
+# -----------------------------------
+# Assembly
+# -----------------------------------
+class _CrossfadeWriter:
+    """
+    Appends WAV chunks to one open output file, crossfading each join.
+    Only the fade tail of the previous chunk is held back, so memory stays at
+    roughly one chunk regardless of song length.
+    """
+
+    def __init__(self, out_path: str, crossfade_ms: int):
+        self.out_path = out_path
+        self.crossfade_ms = crossfade_ms
+        self._out = None
+        self._tail = None
+        self._fade = 0
+
+    def append(self, wav_path: str):
+        import numpy as np
+        import soundfile as sf
+
+        data, sr = sf.read(wav_path, dtype="float32", always_2d=True)
+        if self._out is None:
+            self._out = sf.SoundFile(self.out_path, "w", samplerate=sr,
+                                     channels=data.shape[1], subtype="PCM_16")
+            self._fade = int(sr * self.crossfade_ms / 1000)
+
+        if self._tail is not None:
+            n = min(len(self._tail), len(data))
+            if n:
+                ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)[:, None]
+                data[:n] = self._tail[-n:] * (1.0 - ramp) + data[:n] * ramp
+                self._out.write(self._tail[:-n])
+            else:
+                self._out.write(self._tail)
+
+        keep = min(self._fade, len(data))
+        self._out.write(data[:len(data) - keep])
+        self._tail = data[len(data) - keep:].copy()
+
+    def close(self):
+        if self._out is not None:
+            if self._tail is not None:
+                self._out.write(self._tail)
+            self._out.close()
+
+
+def synthesize_chunked(text: str, speaker_embedding, out_path: str,
+                       max_chars: int = CHUNK_CHARS, workers: int = MAX_WORKERS,
+                       crossfade_ms: int = CROSSFADE_MS) -> str:
+    """
+    Synthesize text chunk by chunk (across the shared process pool when
+    workers > 1) and stream the chunks, in order, into out_path. workers
+    caps how many of this job's chunks the pool works on at once.
+    """
+    chunks = split_on_boundaries(text, max_chars)
+    workers = max(1, min(workers, len(chunks)))
+    print(f"[OpenVoice] chunked synthesis: {len(chunks)} chunks, {workers} worker(s)")
+
+    tmp_dir = tempfile.mkdtemp(prefix="ov_chunks_")
+    writer = _CrossfadeWriter(out_path, crossfade_ms)
+    try:
+        jobs = [(c, speaker_embedding, os.path.join(tmp_dir, f"{i:05d}.wav"))
+                for i, c in enumerate(chunks)]
+
+        if workers == 1:
+            for job in jobs:
+                writer.append(_synthesize_chunk(job))
+                os.remove(job[2])
+        else:
+            pool = _get_pool()
+            # keep at most 2 chunks per worker in flight to bound temp disk and memory,
+            # and so a long job leaves pool slots for the others
+            pending, todo = deque(), iter(jobs)
+            for job in todo:
+                pending.append(pool.submit(_synthesize_chunk, job))
+                if len(pending) >= workers * 2:
+                    break
+            while pending:
+                path = pending.popleft().result()
+                writer.append(path)
+                os.remove(path)
+                nxt = next(todo, None)
+                if nxt is not None:
+                    pending.append(pool.submit(_synthesize_chunk, nxt))
+    finally:
+        writer.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return out_path
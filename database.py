@@ -0,0 +1,245 @@
+# database.py
+import os
+import re
+import sys
+import time
+import atexit
+import threading
+from datetime import datetime
+
+from sqlalchemy import (
+    create_engine, inspect, insert, select, Column, Integer, String, Text, DateTime, Index
+)
+from sqlalchemy.orm import declarative_base, Session
+
+# -----------------------------------
+# Config
+# -----------------------------------
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///lyricbeats_memory.db")
+# local SQLite: create tables directly (stamped as the alembic head, so later
+# migrations apply on top); elsewhere run `alembic upgrade head`
+DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "1" if DATABASE_URL.startswith("sqlite") else "0") == "1"
+STORE_BATCH_SIZE = int(os.getenv("STORE_BATCH_SIZE", 50))
+STORE_FLUSH_INTERVAL = float(os.getenv("STORE_FLUSH_INTERVAL", 2.0))   # seconds
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic")
+
+Base = declarative_base()
+
+
+class MusicGeneration(Base):
+    __tablename__ = "music_generations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(64), nullable=False)
+    job_id = Column(String(32), nullable=True)
+    title = Column(String, nullable=True)
+    lyrics = Column(Text, nullable=True)
+    lyrics_len = Column(Integer, nullable=True)
+    file_path = Column(String, nullable=True)
+    file_format = Column(String, nullable=True)        # e.g., 'mp3', 'simple_mp4'
+    instrument_pic = Column(String, nullable=True)     # Path/URL
+    instrument_video = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_music_generations_user_id", "user_id"),
+        Index("ix_music_generations_created_at", "created_at"),
+        Index("ix_music_generations_file_format", "file_format"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "job_id": self.job_id,
+            "title": self.title,
+            "lyrics_len": self.lyrics_len,
+            "file_path": self.file_path,
+            "file_format": self.file_format,
+            "instrument_pic": self.instrument_pic,
+            "instrument_video": self.instrument_video,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+def make_engine(url: str = DATABASE_URL):
+    kwargs = {"future": True}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": 30}
+    return create_engine(url, **kwargs)
+
+
+def create_schema(engine):
+    """
+    create_all() for a fresh database, then record the newest alembic
+    revision so `alembic upgrade head` starts from there instead of
+    re-creating the table. A table that predates the stamp is left alone:
+    run `alembic stamp <its revision>` and upgrade it by hand.
+    """
+    existed = inspect(engine).has_table(MusicGeneration.__tablename__)
+    Base.metadata.create_all(engine)
+    if existed:
+        return
+    try:
+        from alembic.config import Config
+        from alembic.runtime.migration import MigrationContext
+        from alembic.script import ScriptDirectory
+    except ImportError:
+        print("[database] alembic not installed; schema created without a revision stamp")
+        return
+
+    cfg = Config()
+    cfg.set_main_option("script_location", ALEMBIC_DIR)
+    script = ScriptDirectory.from_config(cfg)
+    with engine.begin() as conn:
+        ctx = MigrationContext.configure(conn)
+        if ctx.get_current_revision() is None:
+            ctx.stamp(script, "head")
+            print(f"[database] created schema at revision {script.get_current_head()}")
+
+
+# ============================================================
+#   WRITE-BEHIND GENERATION STORE
+# ============================================================
+class GenerationStore:
+    """
+    record() only appends to an in-memory buffer; a background thread writes
+    the buffer in one executemany INSERT every flush_interval seconds, or as
+    soon as batch_size rows are waiting. Pending rows are flushed at exit.
+    """
+
+    def __init__(self, engine=None, batch_size: int = STORE_BATCH_SIZE,
+                 flush_interval: float = STORE_FLUSH_INTERVAL):
+        self.engine = engine or make_engine()
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.batches_written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        if DB_AUTO_CREATE:
+            create_schema(self.engine)
+        self._thread = threading.Thread(target=self._loop, name="generation-store", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def record(self, **fields):
+        fields.setdefault("created_at", datetime.utcnow())
+        if fields.get("lyrics") is not None and fields.get("lyrics_len") is None:
+            fields["lyrics_len"] = len(fields["lyrics"])
+        with self._lock:
+            self._buffer.append(fields)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                with Session(self.engine) as session, session.begin():
+                    session.execute(insert(MusicGeneration), rows)
+            except Exception as e:
+                print(f"[database] batch of {len(rows)} failed, keeping for retry:", e)
+                with self._lock:
+                    self._buffer[:0] = rows
+                return 0
+            self.rows_written += len(rows)
+            self.batches_written += 1
+            return len(rows)
+
+    def recent(self, limit: int = 50, user_id: str | None = None, file_format: str | None = None):
+        self.flush()
+        stmt = select(MusicGeneration).order_by(MusicGeneration.created_at.desc()).limit(limit)
+        if user_id:
+            stmt = stmt.where(MusicGeneration.user_id == user_id)
+        if file_format:
+            stmt = stmt.where(MusicGeneration.file_format == file_format)
+        with Session(self.engine) as session:
+            return [g.to_dict() for g in session.scalars(stmt)]
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> GenerationStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = GenerationStore()
+        return _STORE
+
+
+# ============================================================
+#   BACKFILL FROM generation_log.txt
+# ============================================================
+_LOG_FIELDS = {
+    "USER": "user_id",
+    "TITLE": "title",
+    "FORMAT": "file_format",
+    "FILE": "file_path",
+    "PIC": "instrument_pic",
+    "VIDEO": "instrument_video",
+    "LYRICS_LEN": "lyrics_len",
+}
+_LOG_LINE = re.compile(r"^([A-Z_]+): ?(.*)$")
+
+
+def parse_generation_log(path: str):
+    """Yield one dict per block of the old free-text log."""
+    row = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("---"):
+                if row.get("user_id"):
+                    yield row
+                row = {}
+                continue
+            m = _LOG_LINE.match(line)
+            if m and m.group(1) in _LOG_FIELDS:
+                key, value = _LOG_FIELDS[m.group(1)], m.group(2).strip()
+                if key == "lyrics_len":
+                    value = int(value) if value.isdigit() else None
+                elif value in ("None", "none", ""):
+                    value = None
+                row[key] = value
+    if row.get("user_id"):
+        yield row
+
+
+def import_generation_log(path: str = "generation_log.txt", store: GenerationStore | None = None) -> int:
+    """
+    Backfill the table from the old log. The log has no timestamps, so rows get
+    the log file's mtime, in log order.
+    """
+    store = store or get_store()
+    created = datetime.utcfromtimestamp(os.path.getmtime(path))
+    n = 0
+    for row in parse_generation_log(path):
+        store.record(created_at=created, **row)
+        n += 1
+    store.flush()
+    return n
+
+
+if __name__ == "__main__":
+    # python database.py import-log [generation_log.txt]
+    if len(sys.argv) >= 2 and sys.argv[1] == "import-log":
+        t0 = time.perf_counter()
+        count = import_generation_log(sys.argv[2] if len(sys.argv) > 2 else "generation_log.txt")
+        print(f"imported {count} generations in {time.perf_counter() - t0:.2f}s")
+    else:
+        print("usage: python database.py import-log [generation_log.txt]")
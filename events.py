@@ -0,0 +1,126 @@
+# events.py
+import time
+import queue
+import threading
+from collections import OrderedDict
+
+# per job: how many events are replayed to late subscribers
+HISTORY_PER_JOB = 200
+MAX_JOBS = 500
+
+TERMINAL = ("done", "failed")
+
+
+class _Channel:
+    def __init__(self):
+        self.history = []
+        self.subscribers = []
+        self.closed = False
+
+
+class EventBus:
+    """
+    In-process publish/subscribe of job progress events.
+    Subscribers get the job's past events first, then live ones, and the
+    stream ends after the job's terminal event. Because it is in-process, a
+    subscriber only sees jobs that run in the same web worker.
+    """
+
+    def __init__(self, history: int = HISTORY_PER_JOB, max_jobs: int = MAX_JOBS):
+        self.history = history
+        self.max_jobs = max_jobs
+        self._channels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _channel(self, job_id: str) -> _Channel:
+        ch = self._channels.get(job_id)
+        if ch is None:
+            ch = self._channels[job_id] = _Channel()
+            while len(self._channels) > self.max_jobs:
+                self._channels.popitem(last=False)
+        return ch
+
+    def publish(self, job_id: str, event: dict):
+        event = dict(event, job_id=job_id, ts=time.time())
+        with self._lock:
+            ch = self._channel(job_id)
+            ch.history.append(event)
+            del ch.history[:-self.history]
+            if event.get("type") == "job" and event.get("status") in TERMINAL:
+                ch.closed = True
+            subscribers = list(ch.subscribers)
+        for q in subscribers:
+            q.put(event)
+
+    def subscribe(self, job_id: str, keepalive: float = 15.0):
+        """
+        Generator of events for job_id. Yields None every `keepalive` seconds
+        of silence so the caller can send a heartbeat.
+        """
+        q = queue.Queue()
+        with self._lock:
+            ch = self._channel(job_id)
+            backlog = list(ch.history)
+            closed = ch.closed
+            if not closed:
+                ch.subscribers.append(q)
+
+        try:
+            for event in backlog:
+                yield event
+            if closed:
+                return
+            while True:
+                try:
+                    event = q.get(timeout=keepalive)
+                except queue.Empty:
+                    yield None
+                    continue
+                yield event
+                if event.get("type") == "job" and event.get("status") in TERMINAL:
+                    return
+        finally:
+            with self._lock:
+                if q in ch.subscribers:
+                    ch.subscribers.remove(q)
+
+
+BUS = EventBus()
+
+
+class JobProgress:
+    """
+    Turns stage start/finish callbacks into 'stage' events with an overall
+    percent (weighted by each stage's expected share of the job) and an ETA
+    extrapolated from the elapsed time.
+    """
+
+    def __init__(self, job_id: str | None, weights: dict, bus: EventBus = BUS):
+        self.job_id = job_id
+        self.weights = weights
+        self.total = float(sum(weights.values())) or 1.0
+        self.bus = bus
+        self.started = time.monotonic()
+        self._done = 0.0
+        self._lock = threading.Lock()
+
+    def on_stage(self, stage: str, state: str, error: Exception | None = None):
+        with self._lock:
+            if state == "done":
+                self._done += self.weights.get(stage, 0)
+            fraction = min(1.0, self._done / self.total)
+        elapsed = time.monotonic() - self.started
+        eta = elapsed / fraction * (1.0 - fraction) if fraction > 0 else None
+        if self.job_id is None:
+            return
+        event = {
+            "type": "stage",
+            "stage": stage,
+            "state": state,
+            "percent": round(100 * fraction, 1),
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+        if error is not None:
+            event["error"] = str(error)
+        self.bus.publish(self.job_id, event)
@@ -0,0 +1,137 @@
+# ffmpeg_render.py
+import os
+import shutil
+import tempfile
+import subprocess
+
+from assets import is_prepared
+
+OUTPUT_DIR = "output"
+
+# -----------------------------------
+# Tunables
+# -----------------------------------
+X264_PRESET = os.getenv("X264_PRESET", "veryfast")
+X264_CRF = os.getenv("X264_CRF", "23")
+X264_THREADS = os.getenv("X264_THREADS", "0")   # 0 = let x264 decide
+VIDEO_FPS = int(os.getenv("VIDEO_FPS", 24))
+VIDEO_SIZE = (1280, 720)
+# drawtext needs a font file when ffmpeg is built without fontconfig
+DRAWTEXT_FONT = os.getenv("DRAWTEXT_FONT")
+
+VARIANTS = ("simple_mp4", "high_mp4")
+
+
+def _drawtext(textfile: str, size: int, color: str, y: str) -> str:
+    font = f":fontfile='{DRAWTEXT_FONT}'" if DRAWTEXT_FONT else ""
+    # textfile content is still expanded by drawtext: '%' starts a function
+    # ("100% real" fails the render) and '\' escapes, so turn expansion off
+    return (
+        f"drawtext=textfile='{textfile}'{font}:expansion=none:fontsize={size}:fontcolor={color}"
+        f":x=(w-text_w)/2:y={y}"
+    )
+
+
+def _has_asset(src: str | None) -> bool:
+    return bool(src) and src != "none"
+
+
+def build_command(audio_path, outputs: dict, title_file, footer_file, lyrics_file,
+                  pic=None, video=None, preset=X264_PRESET, threads=X264_THREADS,
+                  crf=X264_CRF, fps=VIDEO_FPS):
+    """
+    One ffmpeg invocation: the audio is decoded once and split, each requested
+    variant gets its own background + text chain, and every variant is written
+    as a separate output of the same process.
+    outputs: {"simple_mp4": path, "high_mp4": path} (either may be omitted)
+    """
+    w, h = VIDEO_SIZE
+    scale = f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},fps={fps},format=yuv420p"
+    # assets from the asset cache are already w x h; skip the per-frame scale
+    presized = f"fps={fps},format=yuv420p"
+    cmd = ["ffmpeg", "-v", "error", "-y", "-i", audio_path]
+    inputs = 1
+    chains = []
+
+    def background(src, kind):
+        nonlocal inputs
+        if kind == "image" and _has_asset(src):
+            cmd.extend(["-loop", "1", "-framerate", str(fps), "-i", src])
+        elif kind == "video" and _has_asset(src):
+            cmd.extend(["-stream_loop", "-1", "-i", src])
+        else:
+            cmd.extend(["-f", "lavfi", "-i", f"color=c=black:s={w}x{h}:r={fps}"])
+        idx = inputs
+        inputs += 1
+        return f"[{idx}:v]{presized if is_prepared(src) else scale}"
+
+    names = [v for v in VARIANTS if v in outputs]
+    if len(names) > 1:
+        chains.append(f"[0:a]asplit={len(names)}" + "".join(f"[a{i}]" for i in range(len(names))))
+    audio_labels = [f"[a{i}]" for i in range(len(names))] if len(names) > 1 else ["[0:a]"]
+
+    for name in names:
+        if name == "simple_mp4":
+            chains.append(
+                background(pic, "image") + ","
+                + _drawtext(title_file, 60, "white", "(h-text_h)/2") + ","
+                + _drawtext(footer_file, 32, "yellow", "h-text_h-20")
+                + "[vsimple]"
+            )
+        else:
+            chains.append(
+                background(video, "video") + ","
+                + _drawtext(title_file, 60, "white", "(h-text_h)/2") + ","
+                + _drawtext(lyrics_file, 28, "yellow", "h-text_h-20")
+                + "[vhigh]"
+            )
+
+    cmd.extend(["-filter_complex", ";".join(chains)])
+    for name, alabel in zip(names, audio_labels):
+        vlabel = "[vsimple]" if name == "simple_mp4" else "[vhigh]"
+        cmd.extend([
+            "-map", vlabel, "-map", alabel,
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-threads", str(threads),
+            "-c:a", "aac", "-b:a", "192k", "-shortest", "-movflags", "+faststart",
+            outputs[name],
+        ])
+    return cmd
+
+
+def render_videos(audio_path: str, title: str, lyrics: list[str], user_id: str,
+                  pic: str | None = None, video: str | None = None,
+                  variants=VARIANTS, **x264) -> dict:
+    """
+    Render the simple and/or high MP4 for one song in a single ffmpeg pass.
+    Returns {variant: path}. If a background asset can't be read, the render
+    is retried once on plain black, like the moviepy path.
+    """
+    outputs = {v: os.path.join(OUTPUT_DIR, f"{v.split('_')[0]}_{user_id}.mp4") for v in variants}
+    tmp = tempfile.mkdtemp(prefix="render_")
+    try:
+        files = {}
+        for key, text in (
+            ("title", title),
+            ("footer", "   |   ".join(lyrics[:3])),
+            ("lyrics", "\n".join(lyrics[:40])),
+        ):
+            files[key] = os.path.join(tmp, f"{key}.txt")
+            with open(files[key], "w", encoding="utf-8") as f:
+                f.write(text)
+
+        def run(p, v):
+            cmd = build_command(audio_path, outputs, files["title"], files["footer"],
+                                files["lyrics"], pic=p, video=v, **x264)
+            subprocess.run(cmd, check=True)
+
+        try:
+            run(pic, video)
+        except subprocess.CalledProcessError:
+            if not (_has_asset(pic) or _has_asset(video)):
+                raise
+            print("[ffmpeg_render] background asset failed, retrying on black")
+            run(None, None)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return outputs
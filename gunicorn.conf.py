@@ -0,0 +1,11 @@
+# gunicorn.conf.py
+# Read automatically by `gunicorn wsgi:app` started from the app directory;
+# command-line flags still override it.
+import os
+
+# /jobs/<id>/events keeps a request open while a job runs. Under the default
+# sync worker every open page would pin a whole worker, so each worker gets a
+# thread pool instead (GUNICORN_WORKER_CLASS=gevent also works). Keep
+# SSE_MAX_STREAMS below the thread count so plain requests always get a thread.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", 16))
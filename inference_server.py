@@ -0,0 +1,334 @@
+# inference_server.py
+import os
+import gc
+import sys
+import json
+import time
+import errno
+import signal
+import socket
+import struct
+import threading
+
+# -----------------------------------
+# Config
+# -----------------------------------
+# set in the web app to send model work to the server instead of loading
+# models in every web worker; the server binds the same path
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET")
+DEFAULT_SOCKET = "/tmp/lyricbeats-inference.sock"
+# 0 = serve in-process, no fork; > 1 trades cross-request MusicGen batching
+# (one batcher per worker) for parallel generations
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+INFERENCE_PRELOAD = [m.strip() for m in os.getenv("INFERENCE_PRELOAD", "musicgen,openvoice").split(",")
+                     if m.strip()]
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 1800))  # seconds per call
+
+MAX_MESSAGE = 16 * 2**20
+_HEADER = struct.Struct("!I")
+
+
+# ============================================================
+#   WIRE FORMAT: 4-byte big-endian length + UTF-8 JSON
+# ============================================================
+def send_msg(sock, obj):
+    data = json.dumps(obj).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, n: int):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            if not buf:
+                return None
+            raise ConnectionError("connection closed mid-message")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_msg(sock):
+    """Next message, or None on a clean EOF."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (n,) = _HEADER.unpack(header)
+    if n > MAX_MESSAGE:
+        raise ValueError(f"message of {n} bytes exceeds {MAX_MESSAGE}")
+    body = _recv_exact(sock, n)
+    if body is None:
+        raise ConnectionError("connection closed mid-message")
+    return json.loads(body)
+
+
+# ============================================================
+#   CLIENT (used by the web workers)
+# ============================================================
+class RemoteError(RuntimeError):
+    pass
+
+
+class InferenceClient:
+    """
+    One short-lived connection per call; Unix sockets make that cheap and
+    it keeps worker threads from sharing a socket. Paths are sent absolute
+    since the server may run from another directory.
+    """
+
+    def __init__(self, path: str | None = None, timeout: float = INFERENCE_TIMEOUT):
+        self.path = path or INFERENCE_SOCKET or DEFAULT_SOCKET
+        self.timeout = timeout
+
+    def call(self, op: str, **args):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(self.timeout)
+            s.connect(self.path)
+            send_msg(s, {"op": op, "args": args})
+            resp = recv_msg(s)
+        if resp is None:
+            raise ConnectionError("inference server closed the connection")
+        if not resp.get("ok"):
+            raise RemoteError(f"{resp.get('type', 'Error')}: {resp.get('error')}")
+        return resp.get("result")
+
+    def ping(self) -> dict:
+        return self.call("ping")
+
+    def musicgen(self, prompt: str, duration: int, out_path: str, seed: int | None = None) -> str:
+        """Same signature as MusicGenGenerator.generate."""
+        self.call("musicgen", prompt=prompt, duration=duration,
+                  out_path=os.path.abspath(out_path), seed=seed)
+        return out_path
+
+    def tts(self, lyrics: str, user_id: str, voice_clone_sample: str | None = None) -> str:
+        """Same arguments as tools.generate_voice_openvoice; returns an absolute path."""
+        sample = os.path.abspath(voice_clone_sample) if voice_clone_sample else None
+        return self.call("tts", lyrics=lyrics, user_id=user_id, voice_clone_sample=sample)
+
+    def speaker_prefetch(self, path: str):
+        return self.call("speaker_prefetch", path=os.path.abspath(path))
+
+
+def inference_enabled() -> bool:
+    return bool(INFERENCE_SOCKET)
+
+
+_CLIENT = None
+
+
+def get_client() -> InferenceClient:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = InferenceClient()
+    return _CLIENT
+
+
+# ============================================================
+#   SERVER OPERATIONS
+# ============================================================
+def _op_ping():
+    from model_registry import REGISTRY
+    return {"pid": os.getpid(), "models": REGISTRY.stats()}
+
+
+def _op_musicgen(prompt, duration, out_path, seed=None):
+    from musicgen_generator import MusicGenGenerator
+    return MusicGenGenerator().generate(prompt=prompt, duration=duration, out_path=out_path, seed=seed)
+
+
+def _op_tts(lyrics, user_id, voice_clone_sample=None):
+    from tools import generate_voice_openvoice
+    fn = getattr(generate_voice_openvoice, "func", generate_voice_openvoice)   # unwrap @tool
+    return os.path.abspath(fn(lyrics=lyrics, user_id=user_id, voice_clone_sample=voice_clone_sample))
+
+
+def _op_speaker_prefetch(path):
+    from speaker_cache import get_speaker_cache
+    get_speaker_cache().prefetch(path)
+
+
+OPERATIONS = {
+    "ping": _op_ping,
+    "musicgen": _op_musicgen,
+    "tts": _op_tts,
+    "speaker_prefetch": _op_speaker_prefetch,
+}
+
+
+def dispatch(request, operations=OPERATIONS) -> dict:
+    # anything but {"op": "<name>", ...} is reported, not raised, so one bad
+    # client message can't take down the connection thread
+    name = request.get("op") if isinstance(request, dict) else request
+    op = operations.get(name) if isinstance(request, dict) and isinstance(name, str) else None
+    if op is None:
+        return {"ok": False, "type": "ValueError", "error": f"unknown op {name!r}"}
+    try:
+        return {"ok": True, "result": op(**(request.get("args") or {}))}
+    except Exception as e:
+        return {"ok": False, "type": type(e).__name__, "error": str(e)}
+
+
+# ============================================================
+#   SERVER PROCESS
+# ============================================================
+class InferenceServer:
+    """
+    Loads the models once, then forks `workers` processes that accept on
+    the same Unix socket. Weights are shared copy-on-write: gc.freeze()
+    before the fork keeps the collector from touching (and so copying) the
+    preloaded objects. Each worker serves connections on threads and has
+    its own MusicGen batcher, so calls only batch together when they reach
+    the same worker: with the default INFERENCE_WORKERS=1 that is every
+    call from every web worker; with more, batches form per worker.
+    The parent only supervises, restarting any worker that dies, and the
+    restart is a fork again, not a reload.
+    Subclasses swap in their own OPERATIONS table and preload.
+    """
+    name = "inference"
+    operations = OPERATIONS
+
+    def __init__(self, path: str | None = None, workers: int = INFERENCE_WORKERS,
+                 preload=INFERENCE_PRELOAD):
+        self.path = path or INFERENCE_SOCKET or DEFAULT_SOCKET
+        self.workers = workers
+        self.preload_names = list(preload)
+        self.sock = None
+        self._children = set()
+        self._stopping = False
+
+    def bind(self):
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                raise RuntimeError(f"an inference server is already listening on {self.path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)   # stale socket from a crashed server
+            finally:
+                probe.close()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        os.chmod(self.path, 0o660)
+        self.sock.listen(128)
+
+    def preload(self):
+        from model_registry import REGISTRY
+
+        t0 = time.perf_counter()
+        REGISTRY.warmup(self.preload_names)
+        gc.collect()
+        gc.freeze()
+        print(f"[{self.name}] preloaded {', '.join(self.preload_names) or 'nothing'} "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    def serve_forever(self):
+        self.bind()
+        self.preload()
+        print(f"[{self.name}] listening on {self.path} with {self.workers or 'no'} forked worker(s)")
+        try:
+            if self.workers <= 0:
+                self._accept_loop()
+                return
+            signal.signal(signal.SIGTERM, self._stop)
+            signal.signal(signal.SIGINT, self._stop)
+            for _ in range(self.workers):
+                self._spawn()
+            self._supervise()
+        finally:
+            self._shutdown()
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self._accept_loop()
+            except BaseException as e:
+                print(f"[{self.name}] worker {os.getpid()} died:", e)
+                code = 1
+            finally:
+                os._exit(code)
+        self._children.add(pid)
+        print(f"[{self.name}] worker {pid} started")
+
+    def _supervise(self):
+        while not self._stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                return
+            except InterruptedError:
+                continue
+            self._children.discard(pid)
+            if not self._stopping:
+                print(f"[{self.name}] worker {pid} exited ({status}); restarting")
+                time.sleep(1.0)
+                self._spawn()
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _shutdown(self):
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        if self.sock is not None:
+            self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            threading.Thread(target=self._handle, args=(conn,), name=f"{self.name}-conn", daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = recv_msg(conn)
+                except (ValueError, ConnectionError) as e:
+                    print(f"[{self.name}] bad request:", e)
+                    return
+                if request is None:
+                    return
+                try:
+                    send_msg(conn, dispatch(request, self.operations))
+                except OSError:
+                    return   # client went away
+
+
+# -----------------------------------
+# CLI: python inference_server.py [--ping]
+# Run from the app directory so relative output paths line up.
+# -----------------------------------
+if __name__ == "__main__":
+    if "--ping" in sys.argv:
+        print(json.dumps(InferenceClient().ping(), indent=2))
+        sys.exit(0)
+
+    # chunked TTS would spawn processes with their own model copies; the
+    # forked workers here already provide the parallelism
+    os.environ.setdefault("OPENVOICE_WORKERS", "1")
+    # every web worker's jobs submit here, so waiting for a batch can pay off
+    os.environ.setdefault("MUSICGEN_BATCH_WINDOW", "0.5")
+    InferenceServer().serve_forever()
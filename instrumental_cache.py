@@ -0,0 +1,153 @@
+# instrumental_cache.py
+import os
+import glob
+import random
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+# -----------------------------------
+# Config
+# -----------------------------------
+CACHE_DIR = os.getenv("INSTRUMENTAL_CACHE_DIR", os.path.join("cache", "instrumentals"))
+CACHE_MAX_BYTES = int(float(os.getenv("INSTRUMENTAL_CACHE_MAX_MB", 1024)) * 2**20)
+# how many different takes to keep per key before we start reusing them
+CACHE_VARIANTS = int(os.getenv("INSTRUMENTAL_CACHE_VARIANTS", 3))
+CACHE_ENABLED = os.getenv("INSTRUMENTAL_CACHE", "1") == "1"
+
+
+def cache_key(model_name: str, prompt: str, duration, seed=None) -> str:
+    raw = f"{model_name}\x00{prompt.strip().lower()}\x00{duration}\x00{seed}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class InstrumentalCache:
+    """
+    On-disk cache of generated instrumentals, addressed by cache_key().
+    Each key holds up to `variants` WAV files (<key>_<n>.wav); a lookup only
+    hits once all variants exist, then returns one of them at random.
+    Files are evicted least-recently-used once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 variants: int = CACHE_VARIANTS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.variants = max(1, variants)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._files = OrderedDict()   # path -> size, oldest use first
+        self._bytes = 0
+        self._writing = set()         # slots a put() is filling right now
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    def get(self, key: str, out_path: str, seeded: bool = False) -> str | None:
+        """Copy a cached take for key to out_path; None on a miss."""
+        with self._lock:
+            takes = self._takes(key)
+            wanted = 1 if seeded else self.variants
+            if len(takes) < wanted:
+                self.misses += 1
+                return None
+            path = random.choice(takes)
+            self._touch(path)
+            self.hits += 1
+
+        shutil.copyfile(path, out_path)
+        return out_path
+
+    def put(self, key: str, wav_path: str):
+        with self._lock:
+            # lowest free slot: eviction can leave gaps (e.g. _0 gone, _1 and _2 kept)
+            taken = set(self._takes(key)) | self._writing
+            slots = (os.path.join(self.root, f"{key}_{i}.wav") for i in range(self.variants))
+            dest = next((p for p in slots if p not in taken), None)
+            if dest is None:
+                return
+            self._writing.add(dest)
+
+        try:
+            tmp = dest + ".tmp"
+            shutil.copyfile(wav_path, tmp)
+            os.replace(tmp, dest)
+            size = os.path.getsize(dest)
+        finally:
+            with self._lock:
+                self._writing.discard(dest)
+
+        with self._lock:
+            self._bytes -= self._files.pop(dest, 0)
+            self._files[dest] = size
+            self._bytes += size
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "evictions": self.evictions,
+                "files": len(self._files),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _scan(self):
+        entries = []
+        for p in glob.glob(os.path.join(self.root, "*.wav")):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p, st.st_size))
+        for _, p, size in sorted(entries):
+            self._files[p] = size
+            self._bytes += size
+
+    def _takes(self, key: str):
+        prefix = os.path.join(self.root, f"{key}_")
+        return [p for p in self._files if p.startswith(prefix)]
+
+    def _touch(self, path: str):
+        self._files.move_to_end(path)
+        try:
+            # mtime doubles as the LRU order after a restart
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            path, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> InstrumentalCache | None:
+    global _CACHE
+    if not CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = InstrumentalCache()
+        return _CACHE
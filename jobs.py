@@ -0,0 +1,269 @@
+# jobs.py
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+# -----------------------------------
+# Config
+# -----------------------------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 16))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", 500))
+# shared by every gunicorn worker, so a status poll that lands on another
+# worker still finds the job
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, data: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.data = data
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        def iso(t):
+            return t.isoformat() if t else None
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+        }
+
+
+def process_token(pid: int) -> str | None:
+    """
+    pid plus its start time (Linux), so a recycled pid doesn't pass for the
+    process that used it before. None if no such process is running.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # starttime is field 22; fields are counted after the "(comm)" one
+            return f"{pid}:{f.read().rsplit(')', 1)[1].split()[19]}"
+    except (OSError, IndexError):
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return str(pid)
+
+
+class JobStore:
+    """
+    Last known status of every job in a SQLite file. Job state otherwise
+    lives in the memory of the worker that accepted the job, so each row
+    records its owner process; queued/running rows whose owner is gone
+    (crash, restart) are marked failed when a store is first opened.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB, history: int = JOB_HISTORY):
+        self.db_path = db_path
+        self.history = history
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS jobs ("
+                        " id TEXT PRIMARY KEY, status TEXT NOT NULL,"
+                        " state TEXT NOT NULL, updated_at REAL NOT NULL, owner TEXT)"
+                    )
+                    try:
+                        conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")   # pre-owner files
+                    except sqlite3.OperationalError:
+                        pass
+                    conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_updated ON jobs (updated_at)")
+                    conn.commit()
+                    self._reclaim(conn)
+                    self._ready = True
+        return conn
+
+    def _reclaim(self, conn):
+        rows = conn.execute(
+            "SELECT id, state, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchall()
+        now = datetime.utcnow().isoformat()
+        with conn:
+            for job_id, state, owner in rows:
+                if owner and process_token(int(owner.split(":")[0])) == owner:
+                    continue
+                state = json.loads(state)
+                state.update(status=FAILED, finished_at=now,
+                             error="interrupted: the process running it exited")
+                conn.execute(
+                    "UPDATE jobs SET status = ?, state = ?, updated_at = ? WHERE id = ?",
+                    (FAILED, json.dumps(state), time.time(), job_id),
+                )
+                print(f"[jobs] {job_id} was left unfinished by a dead process; marked failed")
+
+    def save(self, job: "Job"):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO jobs (id, status, state, updated_at, owner) VALUES (?, ?, ?, ?, ?)",
+                    (job.id, job.status, json.dumps(job.to_dict(), default=str), time.time(),
+                     process_token(os.getpid())),
+                )
+                if job.status in (DONE, FAILED):
+                    conn.execute(
+                        "DELETE FROM jobs WHERE id NOT IN "
+                        "(SELECT id FROM jobs ORDER BY updated_at DESC LIMIT ?)",
+                        (self.history,),
+                    )
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> dict | None:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+
+class JobQueue:
+    """
+    Bounded FIFO of generation jobs drained by a fixed pool of worker threads.
+    Workers are started lazily on the first submit, so a gunicorn master that
+    imports the app never owns threads that would be lost on fork.
+    """
+
+    def __init__(self, handler, workers: int = JOB_WORKERS,
+                 maxsize: int = JOB_QUEUE_SIZE, history: int = JOB_HISTORY,
+                 listener=None, store: JobStore | None = None):
+        self.handler = handler
+        # optional JobStore that mirrors every status change
+        self.store = store
+        # optional callback(job) on every status change
+        self.listener = listener
+        self.workers = max(1, workers)
+        self.history = history
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    def submit(self, data: dict) -> Job:
+        self._ensure_workers()
+        job = Job(data)
+        with self._lock:
+            # only submitters put, under this lock, so the check can't go stale
+            if self._queue.full():
+                raise QueueFull(f"job queue is full ({self._queue.maxsize} pending)")
+            self._jobs[job.id] = job
+            self._trim()
+            # announce 'queued' before a worker can announce 'running'
+            self._notify(job)
+            self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> dict | None:
+        """Job dict from this process, else from the shared store."""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is not None:
+            try:
+                return self.store.get(job_id)
+            except sqlite3.Error as e:
+                print(f"[jobs] store lookup failed for {job_id}:", e)
+        return None
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def running(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status == RUNNING)
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _ensure_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _notify(self, job: Job):
+        if self.store is not None:
+            try:
+                self.store.save(job)
+            except sqlite3.Error as e:
+                print(f"[jobs] could not store {job.id}:", e)
+        if self.listener is not None:
+            try:
+                self.listener(job)
+            except Exception as e:
+                print(f"[jobs] listener failed for {job.id}:", e)
+
+    def _trim(self):
+        # drop the oldest finished jobs once the history cap is reached
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history:
+                break
+            if self._jobs[job_id].status in (DONE, FAILED):
+                del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            job.status = RUNNING
+            job.started_at = datetime.utcnow()
+            print(f"[jobs] {job.id} started")
+            self._notify(job)
+            try:
+                job.result = self.handler(job)
+                job.status = DONE
+                print(f"[jobs] {job.id} done")
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+                print(f"[jobs] {job.id} FAILED:", e)
+            finally:
+                job.finished_at = datetime.utcnow()
+                self._queue.task_done()
+                self._notify(job)
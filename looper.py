@@ -0,0 +1,198 @@
+# looper.py
+import os
+
+# -----------------------------------
+# Config
+# -----------------------------------
+LOOP_CLIP_SECONDS = int(os.getenv("LOOP_CLIP_SECONDS", 15))      # what MusicGen generates
+LOOP_BARS = int(os.getenv("LOOP_BARS", 4))
+BEATS_PER_BAR = 4
+LOOP_CROSSFADE_MS = float(os.getenv("LOOP_CROSSFADE_MS", 30))
+LOOP_FADE_OUT_SECONDS = float(os.getenv("LOOP_FADE_OUT_SECONDS", 1.5))
+# skip MusicGen's soft attack when choosing the loop start
+LOOP_MIN_START_SECONDS = 0.5
+TEMPO_RANGE = (60.0, 200.0)
+
+_HOP = 512
+_N_FFT = 2048
+# onset_envelope()[k] is frame k + 1 minus frame k: it peaks when a sound
+# enters the newer frame, whose window ends _N_FFT samples after frame k
+# starts (the log compression picks up even the window's tapered edge)
+_ONSET_DELAY = _N_FFT
+
+
+def _mono(x):
+    return x if x.ndim == 1 else x.mean(axis=1)
+
+
+# ============================================================
+#   TEMPO / BEAT GRID
+# ============================================================
+def onset_envelope(x, sr: int):
+    """
+    Spectral flux per hop (half-wave rectified log-magnitude increase).
+    Entry k describes the audio around k * _HOP + _ONSET_DELAY.
+    """
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    y = _mono(x).astype(np.float32)
+    if len(y) < _N_FFT * 2:
+        raise ValueError("clip too short for tempo detection")
+    frames = sliding_window_view(y, _N_FFT)[::_HOP]
+    spec = np.abs(np.fft.rfft(frames * np.hanning(_N_FFT).astype(np.float32), axis=1))
+    logspec = np.log1p(100.0 * spec)
+    flux = np.maximum(0.0, np.diff(logspec, axis=0)).sum(axis=1)
+    flux -= flux.mean()
+    return flux, sr / _HOP
+
+
+def detect_tempo(x, sr: int):
+    """
+    (bpm, first_beat_seconds, confidence) from the onset envelope's
+    autocorrelation, with a log-normal prior around 120 BPM against octave
+    errors. The beat phase is the offset whose beat grid collects the most
+    onset energy.
+    """
+    import numpy as np
+
+    env, fps = onset_envelope(x, sr)
+    n = len(env)
+    spectrum = np.fft.rfft(env, 2 * n)
+    ac = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    if ac[0] <= 0:
+        raise ValueError("no onsets")
+    ac /= ac[0]
+
+    lags = np.arange(n)
+    lo = int(np.floor(60.0 * fps / TEMPO_RANGE[1]))
+    hi = min(n - 2, int(np.ceil(60.0 * fps / TEMPO_RANGE[0])))
+    if hi <= lo + 2:
+        raise ValueError("clip too short for the tempo range")
+    bpm_at = 60.0 * fps / np.maximum(lags[lo:hi], 1)
+    prior = np.exp(-0.5 * (np.log2(bpm_at / 120.0) / 1.0) ** 2)
+    score = ac[lo:hi] * prior
+    i = int(np.argmax(score))
+    lag = lo + i
+    # parabolic refinement of the peak
+    if 0 < i < len(score) - 1:
+        a, b, c = score[i - 1], score[i], score[i + 1]
+        denom = a - 2 * b + c
+        if denom != 0:
+            lag = lag + 0.5 * (a - c) / denom
+    period = float(lag)            # frames per beat
+    confidence = float(ac[int(round(period))])
+
+    offsets = np.arange(int(np.ceil(period)))
+    beats = np.arange(int((n - 1) / period))
+    idx = np.rint(offsets[:, None] + beats[None, :] * period).astype(int)
+    idx = np.minimum(idx, n - 1)
+    phase = int(offsets[np.argmax(np.maximum(env, 0)[idx].sum(axis=1))])
+    # frame index -> seconds; later beats are on the grid too, so wrap into the first period
+    first_beat = (phase / fps + _ONSET_DELAY / sr) % (period / fps)
+    return 60.0 * fps / period, first_beat, confidence
+
+
+# ============================================================
+#   LOOP POINTS
+# ============================================================
+def _window_similarity(a, b):
+    import numpy as np
+
+    den = np.sqrt((a * a).sum(axis=-1) * (b * b).sum(axis=-1)) + 1e-9
+    return (a * b).sum(axis=-1) / den
+
+
+def find_loop(x, sr: int, bpm: float, first_beat: float, bars: int = LOOP_BARS):
+    """
+    (start, end, score) in samples for a loop of a whole number of bars that
+    starts on the beat grid. Every grid-aligned start is scored at once: how
+    well the audio right after the candidate end continues like the audio
+    at its start (the seam). The end is then nudged by up to ~10 ms to the
+    best-matching sample. Tries `bars`, then shorter loops, if the clip is
+    too short. Bars are counted from the strongest beat phase; the true
+    downbeat is not estimated.
+    """
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    y = _mono(x).astype(np.float32)
+    beat = 60.0 * sr / bpm
+    win = max(256, int(min(beat, 0.25 * sr)))
+    nudge = int(0.01 * sr)
+    min_start = int(LOOP_MIN_START_SECONDS * sr)
+
+    while bars >= 1:
+        length = int(round(bars * BEATS_PER_BAR * beat))
+        grid = first_beat * sr + np.arange(int(len(y) / beat) + 1) * beat
+        starts = np.rint(grid).astype(int)
+        starts = starts[(starts >= min_start) & (starts + length + win + nudge <= len(y))]
+        if len(starts):
+            break
+        bars //= 2
+    else:
+        raise ValueError("clip shorter than one bar")
+
+    heads = y[starts[:, None] + np.arange(win)]
+    tails = y[(starts + length)[:, None] + np.arange(win)]
+    scores = _window_similarity(heads, tails)
+    best = int(np.argmax(scores))
+    start = int(starts[best])
+
+    # refine the end: compare the start window against every nearby offset
+    end0 = start + length
+    region = y[end0 - nudge:end0 + nudge + win]
+    cands = sliding_window_view(region, win)
+    sims = _window_similarity(cands, y[start:start + win][None, :])
+    end = end0 - nudge + int(np.argmax(sims))
+    return start, end, float(sims.max())
+
+
+# ============================================================
+#   LOOP CELL
+# ============================================================
+def loop_cell(x, sr: int, start: int, end: int, crossfade_ms: float = LOOP_CROSSFADE_MS):
+    """
+    x[start:end] with its head replaced by an equal-power crossfade from the
+    audio that followed the loop end into the loop head. Played back to back,
+    every seam then falls on the beat the loop starts on. The mixer repeats
+    the cell by frame index, so no full-length track is ever built.
+    """
+    import numpy as np
+
+    xf = int(sr * crossfade_ms / 1000.0)
+    xf = max(0, min(xf, end - start, len(x) - end))
+    cell = x[start:end].astype(np.float32, copy=True)
+    if xf:
+        t = np.linspace(0.0, np.pi / 2, xf, dtype=np.float32)
+        fade_in, fade_out_curve = np.sin(t), np.cos(t)
+        if cell.ndim > 1:
+            fade_in, fade_out_curve = fade_in[:, None], fade_out_curve[:, None]
+        cell[:xf] = x[start:start + xf] * fade_in + x[end:end + xf] * fade_out_curve
+    return cell
+
+
+def build_loop_cell(clip_path: str, out_path: str, bars: int = LOOP_BARS) -> dict:
+    """
+    Cut the loop out of a short generated clip and write it as one cell for
+    the mixer to repeat (with LOOP_FADE_OUT_SECONDS at the end of the song).
+    If no tempo can be found, the whole clip is used as the loop, still with
+    a crossfaded seam.
+    """
+    import soundfile as sf
+
+    x, sr = sf.read(clip_path, dtype="float32")
+    info = {"bpm": None, "loop_seconds": None, "seam_score": None}
+    try:
+        bpm, first_beat, confidence = detect_tempo(x, sr)
+        start, end, score = find_loop(x, sr, bpm, first_beat, bars)
+        info.update(bpm=round(bpm, 1), tempo_confidence=round(confidence, 3), seam_score=round(score, 3))
+    except ValueError as e:
+        print(f"[looper] no beat grid ({e}); looping the whole clip")
+        xf = int(sr * LOOP_CROSSFADE_MS / 1000.0)
+        start, end = 0, max(1, len(x) - xf)
+
+    info["loop_seconds"] = round((end - start) / sr, 3)
+    sf.write(out_path, loop_cell(x, sr, start, end), sr, subtype="PCM_16")
+    print(f"[looper] {info['loop_seconds']}s loop @ {info['bpm']} BPM -> {out_path}")
+    return info
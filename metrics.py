@@ -0,0 +1,294 @@
+# metrics.py
+import os
+import time
+import threading
+
+from model_registry import current_rss_bytes
+
+# -----------------------------------
+# Config
+# -----------------------------------
+# debug switch: dump a cProfile of every job's stages to PROFILE_DIR/<job>.prof
+PROFILE_JOBS = os.getenv("PROFILE_JOBS", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+RSS_SAMPLE_INTERVAL = float(os.getenv("METRICS_RSS_INTERVAL", 0.5))   # seconds
+
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + inner + "}"
+
+
+def _num(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+# ============================================================
+#   METRIC TYPES (Prometheus text exposition, no client lib)
+# ============================================================
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_num(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A gauge set directly, or read from fn() at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> list:
+        if self.fn is not None:
+            try:
+                self.set(self.fn())
+            except Exception as e:
+                print(f"[metrics] gauge {self.name} failed:", e)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                le = _labels(self.label_names, key, [("le", _num(bound))])
+                lines.append(f"{self.name}_bucket{le} {count}")
+            labels = _labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_num(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # re-registering (e.g. a module reload) keeps the first instance
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()) -> Counter:
+        return self.add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=(), fn=None) -> Gauge:
+        return self.add(Gauge(name, help, labels, fn))
+
+    def histogram(self, name, help, labels=(), buckets=DURATION_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+STAGE_SECONDS = METRICS.histogram(
+    "lyricbeats_stage_seconds", "Wall time of one pipeline stage.", ("stage", "status"))
+STAGE_PEAK_RSS = METRICS.gauge(
+    "lyricbeats_stage_peak_rss_bytes", "Peak process RSS while the stage last ran.", ("stage",))
+JOB_SECONDS = METRICS.histogram(
+    "lyricbeats_job_seconds", "Wall time of a generation job, queue wait excluded.", ("status",))
+JOB_QUEUE_WAIT_SECONDS = METRICS.histogram(
+    "lyricbeats_job_queue_wait_seconds", "Time a job waited in the queue before a worker took it.")
+MODEL_LOAD_SECONDS = METRICS.histogram(
+    "lyricbeats_model_load_seconds", "Time to load a model into this process.", ("model",))
+MODEL_LOAD_FAILURES = METRICS.counter(
+    "lyricbeats_model_load_failures_total", "Model loads that raised.", ("model",))
+METRICS.gauge("lyricbeats_process_rss_bytes", "Resident set size of this process.",
+              fn=current_rss_bytes)
+
+
+# ============================================================
+#   PEAK RSS SAMPLING
+# ============================================================
+class _RssSampler:
+    """
+    One daemon thread samples RSS while any stage is running and raises the
+    peak of every active stage. RSS is process-wide, so stages that overlap
+    share the same peak.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, token):
+        rss = current_rss_bytes()
+        with self._lock:
+            self._active[token] = rss
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="rss-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, token) -> int:
+        rss = current_rss_bytes()
+        with self._lock:
+            return max(self._active.pop(token, 0), rss)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            rss = current_rss_bytes()
+            with self._lock:
+                for token, peak in self._active.items():
+                    if rss > peak:
+                        self._active[token] = rss
+
+
+_SAMPLER = _RssSampler()
+
+
+# ============================================================
+#   PER-JOB STAGE TIMER
+# ============================================================
+class StageTimer:
+    """
+    on_stage callback for pipeline.run_graph: records each stage's wall time
+    and peak RSS, and with profile=True runs a cProfile in the stage's thread.
+    finish() merges the stage profiles into PROFILE_DIR/<job_id>.prof.
+    """
+
+    def __init__(self, job_id: str | None = None, profile: bool = PROFILE_JOBS):
+        self.job_id = job_id
+        self.profile = profile
+        self.timings = {}
+        self._started = {}
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def on_stage(self, stage: str, state: str, error: Exception | None = None):
+        token = (id(self), stage)
+        if state == "running":
+            with self._lock:
+                self._started[stage] = time.perf_counter()
+            _SAMPLER.start(token)
+            if self.profile:
+                self._start_profile()
+            return
+
+        if self.profile:
+            self._stop_profile()
+        peak = _SAMPLER.stop(token)
+        with self._lock:
+            t0 = self._started.pop(stage, None)
+        if t0 is None:
+            return
+        seconds = time.perf_counter() - t0
+        self.timings[stage] = round(seconds, 3)
+        STAGE_SECONDS.observe(seconds, stage=stage, status="failed" if error else "ok")
+        STAGE_PEAK_RSS.set(peak, stage=stage)
+
+    def finish(self):
+        """Log the per-stage breakdown and write the merged profile, if any."""
+        if self.timings:
+            slowest = sorted(self.timings.items(), key=lambda kv: -kv[1])
+            print(f"[metrics] job {self.job_id}: " + ", ".join(f"{k} {v:.1f}s" for k, v in slowest))
+        if not self.profile:
+            return None
+        self.profile = False
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        if not profiles:
+            return None
+        import pstats
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.job_id or int(time.time())}.prof")
+        pstats.Stats(*profiles).dump_stats(path)
+        print(f"[metrics] profile written to {path}")
+        return path
+
+    def _start_profile(self):
+        import cProfile
+
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError as e:
+            # Python 3.12+ allows a single active profiler per process
+            print("[metrics] stage not profiled:", e)
+            return
+        self._local.prof = prof
+
+    def _stop_profile(self):
+        prof = getattr(self._local, "prof", None)
+        if prof is None:
+            return
+        prof.disable()
+        self._local.prof = None
+        with self._lock:
+            self._profiles.append(prof)
+
+
+def render() -> str:
+    return METRICS.render()
@@ -1,8 +1,23 @@
 # mixer.py
-import os, subprocess
+import os, subprocess, tempfile
 from pydub import AudioSegment
 
-def mix_vocals_and_beat(beat_path, vocals_path, out_mp3, vocals_gain_dB=0.0):
+# "numpy" = block-streaming mixer, "pydub" = original whole-file path
+MIXER_ENGINE = os.getenv("MIXER_ENGINE", "numpy")
+MIX_SAMPLE_RATE = 44100
+MIX_CHANNELS = 2
+MIX_BLOCK_FRAMES = int(os.getenv("MIX_BLOCK_FRAMES", 65536))
+
+def mix_vocals_and_beat(beat_path, vocals_path, out_mp3, vocals_gain_dB=0.0, limiter=False,
+                        beat_fade_out=0.0):
+    # beat_fade_out: seconds to fade the beat out at the end of the vocals
+    # (a short loop cell is repeated up to then, so it needs an ending)
+    if MIXER_ENGINE == "pydub":
+        return mix_vocals_and_beat_pydub(beat_path, vocals_path, out_mp3, vocals_gain_dB, beat_fade_out)
+    return mix_vocals_and_beat_streaming(beat_path, vocals_path, out_mp3, vocals_gain_dB, limiter,
+                                         beat_fade_out=beat_fade_out)
+
+def mix_vocals_and_beat_pydub(beat_path, vocals_path, out_mp3, vocals_gain_dB=0.0, beat_fade_out=0.0):
     beat = AudioSegment.from_file(beat_path)
     vocals = AudioSegment.from_file(vocals_path)
 
@@ -12,6 +27,8 @@ def mix_vocals_and_beat(beat_path, vocals_path, out_mp3, vocals_gain_dB=0.0):
         beat = beat * times
     beat = beat[:len(vocals)]
     vocals = vocals[:len(beat)]
+    if beat_fade_out:
+        beat = beat.fade_out(int(beat_fade_out * 1000))
 
     vocals = vocals + vocals_gain_dB
 
@@ -19,6 +36,136 @@ def mix_vocals_and_beat(beat_path, vocals_path, out_mp3, vocals_gain_dB=0.0):
     mixed.export(out_mp3, format="mp3", bitrate="192k")
     return out_mp3
 
+def _decode_cmd(path, dest="-"):
+    # any input -> interleaved float32 PCM at the mix rate/layout (stdout by default)
+    return ["ffmpeg", "-v", "error", "-y", "-i", path, "-f", "f32le",
+            "-ac", str(MIX_CHANNELS), "-ar", str(MIX_SAMPLE_RATE), dest]
+
+def _read_looped(f, total_frames, pos, n):
+    """n frames of the raw float32 file f starting at frame pos, wrapping at its end."""
+    import numpy as np
+
+    frame_bytes = 4 * MIX_CHANNELS
+    parts = []
+    while n > 0:
+        start = pos % total_frames
+        take = min(n, total_frames - start)
+        f.seek(start * frame_bytes)
+        parts.append(np.frombuffer(f.read(take * frame_bytes), dtype=np.float32))
+        pos += take
+        n -= take
+    return np.concatenate(parts).reshape(-1, MIX_CHANNELS)
+
+def _mix_blocks(read, beat, beat_frames, gain, fade_frames=0, limiter=False):
+    """
+    Yield mixed float32 blocks: each chunk of raw float32 vocals from read()
+    (b"" at EOF) plus the looped beat from the raw file beat. With
+    fade_frames, that many frames of vocals are held back until EOF and the
+    beat under them is ramped down to silence.
+    """
+    import numpy as np
+
+    frame_bytes = 4 * MIX_CHANNELS
+    held = np.empty((0, MIX_CHANNELS), dtype=np.float32)
+    pos = 0
+    while True:
+        raw = read()
+        ramp = None
+        if raw:
+            raw = raw[:len(raw) - len(raw) % frame_bytes]
+            vocals = np.frombuffer(raw, dtype=np.float32).reshape(-1, MIX_CHANNELS)
+            if fade_frames:
+                vocals = np.concatenate([held, vocals])
+                cut = max(0, len(vocals) - fade_frames)
+                vocals, held = vocals[:cut], vocals[cut:]
+                if not len(vocals):
+                    continue
+        elif len(held):
+            # EOF: the held-back tail is the end of the song
+            vocals, held = held, held[:0]
+            ramp = np.linspace(1.0, 0.0, len(vocals), dtype=np.float32)[:, None]
+        else:
+            return
+
+        beat_block = _read_looped(beat, beat_frames, pos, len(vocals))
+        if ramp is not None:
+            beat_block *= ramp
+        mixed = beat_block + vocals * gain
+        if limiter:
+            np.tanh(mixed, out=mixed)
+        else:
+            np.clip(mixed, -1.0, 1.0, out=mixed)
+        pos += len(vocals)
+        yield mixed
+
+def mix_vocals_and_beat_streaming(beat_path, vocals_path, out_mp3, vocals_gain_dB=0.0,
+                                  limiter=False, block_frames=MIX_BLOCK_FRAMES, beat_fade_out=0.0):
+    """
+    Same result as the pydub mixer (beat looped/trimmed to the vocal length,
+    vocals boosted by vocals_gain_dB, overlaid, 192k MP3), but decoded, mixed
+    and encoded one block at a time. The beat is decoded once to a raw temp
+    file and read back per block, looping by frame index, so
+    memory stays flat for any song or beat length. For beat_fade_out the last
+    that-many seconds of vocals are held back until the decoder reaches EOF,
+    since the song length isn't known before then.
+    limiter: soft-limit peaks (tanh) instead of hard clipping.
+    """
+    import numpy as np
+
+    fd, beat_raw = tempfile.mkstemp(prefix="beat_", suffix=".f32")
+    os.close(fd)
+    frame_bytes = 4 * MIX_CHANNELS
+    gain = np.float32(10 ** (vocals_gain_dB / 20.0))
+    fade_frames = int(beat_fade_out * MIX_SAMPLE_RATE)
+    dec = enc = None
+    dec_rc = enc_rc = None
+    broken_pipe = False
+    try:
+        subprocess.run(_decode_cmd(beat_path, beat_raw), check=True)
+        beat_frames = os.path.getsize(beat_raw) // frame_bytes
+        if not beat_frames:
+            raise ValueError(f"beat has no audio: {beat_path}")
+
+        dec = subprocess.Popen(_decode_cmd(vocals_path), stdout=subprocess.PIPE)
+        enc = subprocess.Popen(
+            ["ffmpeg", "-v", "error", "-y", "-f", "s16le", "-ac", str(MIX_CHANNELS),
+             "-ar", str(MIX_SAMPLE_RATE), "-i", "-", "-b:a", "192k", out_mp3],
+            stdin=subprocess.PIPE,
+        )
+        with open(beat_raw, "rb") as beat:
+            blocks = _mix_blocks(lambda: dec.stdout.read(block_frames * frame_bytes),
+                                 beat, beat_frames, gain, fade_frames, limiter)
+            for mixed in blocks:
+                try:
+                    enc.stdin.write((mixed * 32767.0).astype("<i2").tobytes())
+                except BrokenPipeError:
+                    broken_pipe = True   # encoder died; its exit code is reported below
+                    break
+        if not broken_pipe:
+            dec_rc = dec.wait()   # at EOF; after a broken pipe it may be blocked, so it is killed below
+    finally:
+        if dec is not None:
+            if dec.poll() is None:
+                dec.kill()
+            dec.stdout.close()
+            dec.wait()
+        if enc is not None:
+            try:
+                enc.stdin.close()
+            except BrokenPipeError:
+                broken_pipe = True
+            enc_rc = enc.wait()
+        try:
+            os.remove(beat_raw)
+        except OSError:
+            pass
+
+    if enc_rc != 0 or broken_pipe:
+        raise RuntimeError(f"ffmpeg failed to encode {out_mp3} (exit {enc_rc})")
+    if dec_rc != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {vocals_path} (exit {dec_rc})")
+    return out_mp3
+
 def create_simple_mp4(audio_path, out_mp4, title=None, lyrics_file=None):
     # lyrics_file optional; create simple black bg video and burn title + lyrics via textfile
     title_escaped = (title or "").replace("'", "\\'")
@@ -0,0 +1,150 @@
+# model_registry.py
+import os
+import importlib
+import threading
+import time
+
+# -----------------------------------
+# Config
+# -----------------------------------
+# comma separated names, e.g. "musicgen,openvoice"
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "").split(",") if m.strip()]
+
+# module that registers each model; imported on demand so nothing heavy is
+# loaded until a model is actually asked for
+MODEL_MODULES = {
+    "musicgen": "musicgen_generator",
+    "openvoice": "tools",
+    "bark": "bark_generator",
+}
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (0 if it can't be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        pass
+    try:
+        import resource
+        # ru_maxrss is a peak in KiB on Linux; best we have elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+class ModelEntry:
+    def __init__(self, name: str):
+        self.name = name
+        self.model = None
+        self.loaded = False
+        self.load_seconds = None
+        self.rss_delta_bytes = None
+        self.param_bytes = None
+        self.loaded_at = None
+        self.uses = 0
+        # held while loading, and by callers while they use a model that is
+        # not safe to drive from two threads at once
+        self.lock = threading.RLock()
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "loaded": self.loaded,
+            "load_seconds": self.load_seconds,
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "param_bytes": self.param_bytes,
+            "loaded_at": self.loaded_at,
+            "uses": self.uses,
+        }
+
+
+class ModelRegistry:
+    """
+    Loads each named model once per process and hands the same instance to
+    every caller. Modules register a loader at import time; nothing is loaded
+    until the first get() or an explicit warmup().
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader, size_fn=None):
+        with self._lock:
+            self._loaders[name] = (loader, size_fn)
+            self._entries.setdefault(name, ModelEntry(name))
+
+    def entry(self, name: str) -> ModelEntry:
+        if name not in self._loaders and name in MODEL_MODULES:
+            importlib.import_module(MODEL_MODULES[name])
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"no model registered as '{name}'")
+            entry = self._entries[name]
+
+        if not entry.loaded:
+            with entry.lock:
+                if not entry.loaded:
+                    self._load(name, entry)
+        entry.uses += 1
+        return entry
+
+    def get(self, name: str):
+        return self.entry(name).model
+
+    def warmup(self, names=None):
+        names = WARMUP_MODELS if names is None else names
+        for name in names:
+            try:
+                self.entry(name)
+            except Exception as e:
+                print(f"[model_registry] warm-up of {name} failed:", e)
+
+    def stats(self):
+        with self._lock:
+            return [e.to_dict() for e in self._entries.values()]
+
+    def _load(self, name: str, entry: ModelEntry):
+        from metrics import MODEL_LOAD_SECONDS, MODEL_LOAD_FAILURES
+
+        loader, size_fn = self._loaders[name]
+        rss_before = current_rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            model = loader()
+        except Exception:
+            MODEL_LOAD_FAILURES.inc(model=name)
+            raise
+        seconds = time.perf_counter() - t0
+        MODEL_LOAD_SECONDS.observe(seconds, model=name)
+        entry.load_seconds = round(seconds, 3)
+        entry.rss_delta_bytes = max(0, current_rss_bytes() - rss_before)
+        if size_fn is not None:
+            try:
+                entry.param_bytes = size_fn(model)
+            except Exception:
+                entry.param_bytes = None
+        entry.model = model
+        entry.loaded_at = time.time()
+        entry.loaded = True
+        print(
+            f"[model_registry] loaded {name} in {entry.load_seconds}s "
+            f"(rss +{entry.rss_delta_bytes / 2**20:.1f} MiB)"
+        )
+
+
+def torch_param_bytes(*modules) -> int:
+    total = 0
+    for m in modules:
+        if m is None:
+            continue
+        for p in m.parameters():
+            total += p.numel() * p.element_size()
+    return total
+
+
+REGISTRY = ModelRegistry()
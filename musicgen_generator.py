@@ -1,5 +1,8 @@
 # musicgen_generator.py
 import os
+import threading
+import time
+import contextlib
 import torch
 
 # Compatibility fix for PyTorch 2.1.0 pytree registration (MusicGen check fails without this)
@@ -16,24 +19,275 @@ except Exception as e:
     audio_write = None
     print("[musicgen_generator] WARNING: MusicGen not installed:", e)
 
+from model_registry import REGISTRY, torch_param_bytes
+from instrumental_cache import get_cache, cache_key
+
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+# small (300M) / medium (1.5B) / large (3.3B); MUSICGEN_MODEL overrides with a full name
+MUSICGEN_SIZE = os.getenv("MUSICGEN_SIZE", "small")
+DEFAULT_MODEL = os.getenv("MUSICGEN_MODEL", f"facebook/musicgen-{MUSICGEN_SIZE}")
+
+# CPU performance profile (see benchmarks/bench_musicgen_cpu.py).
+# Thread counts are process-wide torch settings, so they also apply to
+# OpenVoice running in the same process. 0 = torch's default.
+MUSICGEN_THREADS = int(os.getenv("MUSICGEN_THREADS", 0))
+MUSICGEN_INTEROP_THREADS = int(os.getenv("MUSICGEN_INTEROP_THREADS", 0))
+MUSICGEN_INFERENCE_MODE = os.getenv("MUSICGEN_INFERENCE_MODE", "1") == "1"
+# "int8" = dynamic int8 quantization of the LM's Linear layers (CPU only)
+MUSICGEN_QUANTIZE = os.getenv("MUSICGEN_QUANTIZE", "").lower()
+# "1" = bf16 autocast on CPU, "auto" = only if the CPU has native bf16, "0" = off
+MUSICGEN_BF16 = os.getenv("MUSICGEN_BF16", "0").lower()
+
+# micro-batching of instrumental requests from concurrent jobs. Requests
+# queued behind a running batch are always merged; the window is how long a
+# lone request waits for company, which only pays off when several jobs can
+# submit at once (the inference server sets it too)
+MUSICGEN_BATCHING = os.getenv("MUSICGEN_BATCHING", "1") == "1"
+_CONCURRENT_JOBS = int(os.getenv("JOB_WORKERS", 1)) > 1
+MUSICGEN_BATCH_WINDOW = float(os.getenv("MUSICGEN_BATCH_WINDOW", 0.5 if _CONCURRENT_JOBS else 0.0))   # seconds
+MUSICGEN_MAX_BATCH = int(os.getenv("MUSICGEN_MAX_BATCH", 4))
+
+
+def cpu_supports_bf16() -> bool:
+    """Native bf16 math (AVX512-BF16 or AMX); elsewhere bf16 autocast is slower."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = set()
+            for line in f:
+                if line.startswith("flags"):
+                    flags.update(line.split(":", 1)[1].split())
+                    break
+    except OSError:
+        return False
+    return bool(flags & {"avx512_bf16", "amx_bf16"})
+
+
+def _apply_thread_settings():
+    if MUSICGEN_THREADS > 0:
+        torch.set_num_threads(MUSICGEN_THREADS)
+    if MUSICGEN_INTEROP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(MUSICGEN_INTEROP_THREADS)
+        except RuntimeError as e:
+            # only allowed before the first inter-op parallel work
+            print("[musicgen_generator] inter-op threads not applied:", e)
+
+
+_apply_thread_settings()
+
+USE_INT8 = DEVICE == "cpu" and MUSICGEN_QUANTIZE == "int8"
+USE_BF16 = DEVICE == "cpu" and (
+    MUSICGEN_BF16 == "1" or (MUSICGEN_BF16 == "auto" and cpu_supports_bf16())
+)
+
+
+def cpu_profile() -> dict:
+    return {
+        "device": DEVICE,
+        "model": DEFAULT_MODEL,
+        "threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "inference_mode": MUSICGEN_INFERENCE_MODE,
+        "int8": USE_INT8,
+        "bf16": USE_BF16,
+    }
+
+
+def _inference_context():
+    """inference_mode and (optionally) bf16 autocast around model.generate."""
+    stack = contextlib.ExitStack()
+    if MUSICGEN_INFERENCE_MODE:
+        stack.enter_context(torch.inference_mode())
+    if USE_BF16:
+        stack.enter_context(torch.autocast("cpu", dtype=torch.bfloat16))
+    return stack
+
+
+def _registry_name(model_name: str) -> str:
+    return "musicgen" if model_name == DEFAULT_MODEL else f"musicgen:{model_name}"
+
+
+def _variant(model_name: str) -> str:
+    # precision changes the output, so it is part of the instrumental cache key
+    return model_name + ("+int8" if USE_INT8 else "") + ("+bf16" if USE_BF16 else "")
+
+
+def _register_musicgen(model_name: str):
+    def load():
+        if not MUSICGEN_AVAILABLE:
+            raise RuntimeError("MusicGen not available. Install audiocraft.")
+        model = MusicGen.get_pretrained(model_name).to(DEVICE)
+        if USE_INT8:
+            model.lm = torch.ao.quantization.quantize_dynamic(
+                model.lm, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        print(f"[MusicGen] loaded {model_name} with {cpu_profile()}")
+        return model
+
+    def size(model):
+        return torch_param_bytes(
+            getattr(model, "lm", None),
+            getattr(model, "compression_model", None),
+        )
+
+    REGISTRY.register(_registry_name(model_name), load, size_fn=size)
+
+
+_register_musicgen(DEFAULT_MODEL)
+
+
+def musicgen_entry(model_name: str = DEFAULT_MODEL):
+    """Shared, once-per-process MusicGen instance (plus its lock) for model_name."""
+    name = _registry_name(model_name)
+    try:
+        return REGISTRY.entry(name)
+    except KeyError:
+        _register_musicgen(model_name)
+        return REGISTRY.entry(name)
+
+
+class _PendingRequest:
+    def __init__(self, prompt: str, duration: int):
+        self.prompt = prompt
+        self.duration = duration
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.wav = None
+        self.error = None
+
+
+class MusicGenBatcher:
+    """
+    Collects prompts with the same duration for up to `window` seconds (or
+    until `max_batch` are waiting) and runs them as one model.generate call.
+    Each caller blocks in submit() until its own waveform is ready.
+    """
+
+    def __init__(self, entry, window: float = MUSICGEN_BATCH_WINDOW,
+                 max_batch: int = MUSICGEN_MAX_BATCH):
+        self.entry = entry
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.batches_run = 0
+        self.requests_run = 0
+        self._pending = {}   # duration -> [_PendingRequest]
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, prompt: str, duration: int):
+        req = _PendingRequest(prompt, duration)
+        with self._cond:
+            self._pending.setdefault(duration, []).append(req)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name="musicgen-batcher", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.wav
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # serve the duration whose oldest request has waited longest
+            duration = min(self._pending, key=lambda d: self._pending[d][0].submitted)
+            deadline = self._pending[duration][0].submitted + self.window
+            while len(self._pending[duration]) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            queue = self._pending[duration]
+            batch, rest = queue[:self.max_batch], queue[self.max_batch:]
+            if rest:
+                self._pending[duration] = rest
+            else:
+                del self._pending[duration]
+            return duration, batch
+
+    def _loop(self):
+        while True:
+            duration, batch = self._next_batch()
+            try:
+                with self.entry.lock, _inference_context():
+                    model = self.entry.model
+                    model.set_generation_params(duration=duration)
+                    wavs = model.generate(descriptions=[r.prompt for r in batch])
+                for req, wav in zip(batch, wavs):
+                    req.wav = wav.float().cpu()   # bf16 autocast output -> fp32 for writing
+                self.batches_run += 1
+                self.requests_run += len(batch)
+                print(f"[MusicGen] batch of {len(batch)} x {duration}s done")
+            except Exception as e:
+                for req in batch:
+                    req.error = e
+            finally:
+                for req in batch:
+                    req.done.set()
+
+
+_BATCHERS = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def musicgen_batcher(model_name: str = DEFAULT_MODEL) -> MusicGenBatcher:
+    with _BATCHERS_LOCK:
+        if model_name not in _BATCHERS:
+            _BATCHERS[model_name] = MusicGenBatcher(musicgen_entry(model_name))
+        return _BATCHERS[model_name]
+
 
 class MusicGenGenerator:
-    def __init__(self, model_name="facebook/musicgen-small"):
+    def __init__(self, model_name=DEFAULT_MODEL):
         if not MUSICGEN_AVAILABLE:
             raise RuntimeError("MusicGen not available. Install audiocraft.")
-        self.model = MusicGen.get_pretrained(model_name).to(DEVICE)
+        self.model_name = model_name
+        self._entry = None
+
+    @property
+    def model(self):
+        # resolved on first use so cache hits never load the weights
+        if self._entry is None:
+            self._entry = musicgen_entry(self.model_name)
+        return self._entry.model
 
-    def generate(self, prompt: str, duration: int, out_path: str):
+    def generate(self, prompt: str, duration: int, out_path: str, seed: int | None = None):
         """
         prompt: style/description
         duration: seconds (e.g., 30, 60)
         out_path: output wav path
+        seed: optional RNG seed for a reproducible take
         """
+        cache = get_cache()
+        key = cache_key(_variant(self.model_name), prompt, duration, seed)
+        if cache is not None and cache.get(key, out_path, seeded=seed is not None):
+            print(f"[MusicGen] cache hit prompt={prompt} duration={duration}s -> {out_path}")
+            return out_path
+
         print(f"[MusicGen] prompt={prompt} duration={duration}s -> {out_path}")
-        self.model.set_generation_params(duration=duration)
-        wavs = self.model.generate(descriptions=[prompt])
-        # write wav
-        audio_write(out_path, wavs[0].cpu(), self.model.sample_rate)
+        model = self.model
+        if MUSICGEN_BATCHING and seed is None:
+            wav = musicgen_batcher(self.model_name).submit(prompt, duration)
+        else:
+            # generation params live on the shared model, so hold its lock
+            with self._entry.lock, _inference_context():
+                if seed is not None:
+                    torch.manual_seed(seed)
+                model.set_generation_params(duration=duration)
+                wav = model.generate(descriptions=[prompt])[0].float().cpu()
+        # write wav (audio_write appends the suffix itself)
+        audio_write(os.path.splitext(out_path)[0], wav, model.sample_rate)
+
+        if cache is not None:
+            try:
+                cache.put(key, out_path)
+            except Exception as e:
+                print("[MusicGen] cache store failed:", e)
 
         return out_path
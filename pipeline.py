@@ -0,0 +1,125 @@
+# pipeline.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# -----------------------------------
+# Resource limits (process-wide, shared by all jobs)
+# -----------------------------------
+RESOURCE_LIMITS = {
+    "cpu": int(os.getenv("PIPELINE_CPU_SLOTS", 2)),        # model inference
+    # MusicGen callers mostly wait on the shared batcher, so let several in
+    "musicgen": int(os.getenv("PIPELINE_MUSICGEN_SLOTS", 4)),
+    "ffmpeg": int(os.getenv("PIPELINE_FFMPEG_SLOTS", 2)),  # mixing / encodes
+    "net": int(os.getenv("PIPELINE_NET_SLOTS", 4)),        # searches / uploads
+    "io": int(os.getenv("PIPELINE_IO_SLOTS", 4)),          # local file work
+}
+
+_SEMAPHORES = {name: threading.BoundedSemaphore(max(1, n)) for name, n in RESOURCE_LIMITS.items()}
+
+
+class StageFailed(Exception):
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    """
+    One node of the job graph. `fn` receives a dict with the results of the
+    stages it depends on (keyed by stage name) and returns its own result.
+    """
+
+    def __init__(self, name: str, fn, deps=(), resource: str = "cpu"):
+        if resource not in _SEMAPHORES:
+            raise ValueError(f"unknown resource '{resource}'")
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.resource = resource
+
+
+def run_graph(stages, max_workers: int | None = None, initial: dict | None = None,
+              on_stage=None) -> dict:
+    """
+    Run every stage as soon as its dependencies are done, bounded by the
+    per-resource semaphores. Returns {stage name: result}. The first failure
+    stops scheduling and is raised as StageFailed once running stages finish.
+    initial: results of stages that already ran; they can be used as deps.
+    on_stage: optional callback(stage_name, "running" | "done" | "failed", error)
+    """
+    results = dict(initial or {})
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        for d in s.deps:
+            if d not in by_name and d not in results:
+                raise ValueError(f"stage '{s.name}' depends on unknown stage '{d}'")
+
+    remaining = dict(by_name)
+    running = {}
+    failure = None
+
+    def notify(name, state, error=None):
+        if on_stage is not None:
+            try:
+                on_stage(name, state, error)
+            except Exception as e:
+                print(f"[pipeline] on_stage callback failed: {e}")
+
+    def call(stage):
+        with _SEMAPHORES[stage.resource]:
+            notify(stage.name, "running")
+            try:
+                out = stage.fn({d: results[d] for d in stage.deps})
+            except Exception as e:
+                notify(stage.name, "failed", e)
+                raise
+            notify(stage.name, "done")
+            return out
+
+    if not stages:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages)) as pool:
+        while remaining or running:
+            if failure is None:
+                ready = [s for s in remaining.values() if all(d in results for d in s.deps)]
+                for s in ready:
+                    del remaining[s.name]
+                    running[pool.submit(call, s)] = s
+
+            if not running:
+                if remaining and failure is None:
+                    raise ValueError(f"dependency cycle among {sorted(remaining)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage = running.pop(fut)
+                try:
+                    results[stage.name] = fut.result()
+                except Exception as e:
+                    if failure is None:
+                        failure = StageFailed(stage.name, e)
+
+    if failure is not None:
+        raise failure
+    return results
+
+
+def run_graph_background(stages, initial: dict, name: str = "pipeline-tail",
+                         on_stage=None) -> threading.Thread:
+    """
+    Run follow-up stages (uploads, bookkeeping) after the caller already has
+    its result. Failures are logged, not raised.
+    """
+    def target():
+        try:
+            run_graph(stages, initial=initial, on_stage=on_stage)
+        except Exception as e:
+            print(f"[pipeline] background stages failed: {e}")
+
+    t = threading.Thread(target=target, name=name, daemon=True)
+    t.start()
+    return t
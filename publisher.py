@@ -0,0 +1,98 @@
+# publisher.py
+import os
+import uuid
+import errno
+import shutil
+import hashlib
+
+PUBLIC_DIR = "public_downloads"
+# content-addressed objects; a dot-dir so /list, /public and globbing skip it
+OBJECT_DIR = os.getenv("PUBLISH_OBJECT_DIR", os.path.join(PUBLIC_DIR, ".objects"))
+
+FICLONE = 0x40049409   # linux ioctl: share extents (btrfs, xfs, ...)
+# os.link errors that mean "can't hardlink here", not "something is wrong"
+_NO_LINK = (errno.EXDEV, errno.EPERM, errno.EMLINK)
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _temp_name(dst: str) -> str:
+    # unique per call, so concurrent publishes never share (or truncate) a temp
+    return os.path.join(os.path.dirname(dst) or ".", f".{os.path.basename(dst)}.{uuid.uuid4().hex}.tmp")
+
+
+def _clone_or_copy(src: str, tmp: str) -> str:
+    """Write src's bytes to the new file tmp by reflink if possible, else a copy."""
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    with os.fdopen(fd, "wb") as d, open(src, "rb") as s:
+        try:
+            import fcntl
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return "reflink"
+        except (ImportError, OSError):
+            shutil.copyfileobj(s, d, 1 << 20)
+            return "copy"
+
+
+def place(src: str, dst: str, link: bool = True) -> str:
+    """
+    Make dst have src's content as cheaply as the filesystem allows:
+    hardlink (if link), then reflink, then a real copy (e.g. across
+    filesystems). Returns the method used. dst is replaced atomically.
+    Only hardlink files nobody rewrites in place: the link shares them.
+    """
+    tmp = _temp_name(dst)
+    try:
+        method = None
+        if link:
+            try:
+                os.link(src, tmp)
+                method = "hardlink"
+            except OSError as e:
+                if e.errno not in _NO_LINK:
+                    raise
+        if method is None:
+            method = _clone_or_copy(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return method
+
+
+def publish_file(src: str, name: str | None = None, public_dir: str = PUBLIC_DIR) -> str:
+    """
+    Publish src under public_dir/<name> (default: its basename). The bytes are
+    stored once under OBJECT_DIR by SHA-256: the finished output itself
+    becomes the (read-only) object, and src and the public name are hardlinks
+    to it, so identical files share one inode. Bytes are copied only when
+    OBJECT_DIR is on another filesystem. Returns the public path.
+    """
+    name = os.path.basename(name or src)
+    digest = file_sha256(src)
+    obj = os.path.join(OBJECT_DIR, digest[:2], digest)
+    os.makedirs(os.path.dirname(obj), exist_ok=True)
+
+    if os.path.exists(obj):
+        print(f"[publisher] {name}: content already stored ({digest[:12]})")
+    else:
+        # linked rather than renamed, so src never disappears from output/
+        # while later stages (uploads) read it
+        print(f"[publisher] {name}: stored by {place(src, obj)} ({digest[:12]})")
+        os.chmod(obj, 0o444)
+
+    # a duplicate output is swapped for a link too, unless the store is elsewhere
+    if os.stat(src).st_dev == os.stat(obj).st_dev and not os.path.samefile(src, obj):
+        place(obj, src)
+    dest = os.path.join(public_dir, name)
+    place(obj, dest)
+    return dest
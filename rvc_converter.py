@@ -1,18 +1,27 @@
 # rvc_converter.py
-import os, subprocess
+import os, sys, subprocess
 
 def convert_with_rvc(input_wav: str, output_wav: str, rvc_model_path: str = None):
     """
     Scaffold to convert 'input_wav' (Bark vocals) into a cloned voice using RVC or so-vits-svc.
     You must provide a working RVC installation or API endpoint.
+    With RVC_WORKER_SOCKET set, the conversion goes to a running rvc_worker.py, which keeps
+    the voice models loaded; if the worker can't be reached or fails, this falls back to
+    the one-shot script below.
     This function assumes you have a script `rvc_infer.py` that accepts input and outputs converted wav.
     Example command (you must adapt):
     python rvc_infer.py --model path/to/model.pth --in input.wav --out output.wav
     """
     if rvc_model_path is None:
         raise RuntimeError("RVC model path not configured. Set path in env or pass param.")
+    from rvc_worker import worker_enabled, get_client
+    if worker_enabled():
+        try:
+            return get_client().convert(input_wav, output_wav, rvc_model_path)
+        except Exception as e:
+            print("[rvc_converter] worker failed, running rvc_infer.py instead:", e)
     # Example call - you must replace with your own RVC inference call
-    cmd = f"python rvc_infer.py --model \"{rvc_model_path}\" --in \"{input_wav}\" --out \"{output_wav}\""
-    print("[rvc_converter] running:", cmd)
-    subprocess.run(cmd, shell=True, check=True)
+    cmd = [sys.executable, "rvc_infer.py", "--model", rvc_model_path, "--in", input_wav, "--out", output_wav]
+    print("[rvc_converter] running:", subprocess.list2cmdline(cmd))
+    subprocess.run(cmd, check=True)
     return output_wav
\ No newline at end of file
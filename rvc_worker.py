@@ -0,0 +1,264 @@
+# rvc_worker.py
+import os
+import sys
+import json
+import time
+import inspect
+import importlib
+import threading
+from collections import OrderedDict
+
+from inference_server import InferenceClient, InferenceServer
+
+# -----------------------------------
+# Config
+# -----------------------------------
+# set in the app to send conversions to a running worker; unset keeps the
+# one-shot `python rvc_infer.py` call
+RVC_WORKER_SOCKET = os.getenv("RVC_WORKER_SOCKET")
+DEFAULT_SOCKET = "/tmp/lyricbeats-rvc.sock"
+RVC_MAX_MODELS = int(os.getenv("RVC_MAX_MODELS", 3))           # voice models kept loaded
+RVC_MAX_BATCH = int(os.getenv("RVC_MAX_BATCH", 8))
+# 0 = only batch what is already queued; > 0 waits that long for company
+RVC_BATCH_WINDOW = float(os.getenv("RVC_BATCH_WINDOW", 0.0))
+RVC_TIMEOUT = float(os.getenv("RVC_TIMEOUT", 900))
+# "module" or "module:attr" providing load_model(path) and convert(model, in, out),
+# optionally convert_batch(model, [(in, out), ...]); a class is instantiated
+RVC_CONVERTER = os.getenv("RVC_CONVERTER", "rvc_infer")
+# model paths to load before accepting requests
+RVC_PRELOAD = [p.strip() for p in os.getenv("RVC_PRELOAD", "").split(",") if p.strip()]
+
+
+def load_converter(spec: str = RVC_CONVERTER):
+    module_name, _, attr = spec.partition(":")
+    obj = importlib.import_module(module_name)
+    if attr:
+        obj = getattr(obj, attr)
+    if inspect.isclass(obj):
+        obj = obj()
+    for fn in ("load_model", "convert"):
+        if not callable(getattr(obj, fn, None)):
+            raise TypeError(f"RVC converter {spec!r} has no {fn}()")
+    return obj
+
+
+# ============================================================
+#   MODEL LRU
+# ============================================================
+class ModelCache:
+    """
+    Loaded voice models by path, least recently used evicted past
+    max_models. Keyed on the file's mtime too, so a retrained model that
+    replaces the old file is picked up.
+    """
+
+    def __init__(self, converter, max_models: int = RVC_MAX_MODELS):
+        self.converter = converter
+        self.max_models = max(1, max_models)
+        self.loads = 0
+        self.evictions = 0
+        self._models = OrderedDict()   # (path, mtime) -> model
+        self._lock = threading.Lock()
+
+    def get(self, path: str):
+        path = os.path.abspath(path)
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            for old in [k for k in self._models if k[0] == path]:
+                del self._models[old]   # stale version of the same file
+
+            t0 = time.perf_counter()
+            model = self.converter.load_model(path)
+            self.loads += 1
+            print(f"[rvc_worker] loaded {path} in {time.perf_counter() - t0:.1f}s")
+            self._models[key] = model
+            while len(self._models) > self.max_models:
+                (evicted, _), _ = self._models.popitem(last=False)
+                self.evictions += 1
+                print(f"[rvc_worker] evicted {evicted}")
+            return model
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": [k[0] for k in self._models],
+                "max_models": self.max_models,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+# ============================================================
+#   BATCHER
+# ============================================================
+class _PendingConversion:
+    def __init__(self, input_wav: str, output_wav: str, model_path: str):
+        self.input_wav = input_wav
+        self.output_wav = output_wav
+        self.model_path = model_path
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.error = None
+
+
+class RvcBatcher:
+    """
+    One thread drives the converter, which is rarely safe to share. Requests
+    queue per model path; the oldest path is served next, with every request
+    for it that is waiting (up to max_batch) handed over together, so the
+    model is looked up once and a converter with convert_batch() can run
+    them as one batch. Each caller blocks in submit() until its file is
+    written.
+    """
+
+    def __init__(self, converter, cache: ModelCache, window: float = RVC_BATCH_WINDOW,
+                 max_batch: int = RVC_MAX_BATCH):
+        self.converter = converter
+        self.cache = cache
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.batches_run = 0
+        self.requests_run = 0
+        self._pending = {}   # model path -> [_PendingConversion]
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, input_wav: str, output_wav: str, model_path: str) -> str:
+        req = _PendingConversion(input_wav, output_wav, os.path.abspath(model_path))
+        with self._cond:
+            self._pending.setdefault(req.model_path, []).append(req)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="rvc-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return output_wav
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            path = min(self._pending, key=lambda p: self._pending[p][0].submitted)
+            deadline = self._pending[path][0].submitted + self.window
+            while len(self._pending[path]) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            queue = self._pending[path]
+            batch, rest = queue[:self.max_batch], queue[self.max_batch:]
+            if rest:
+                self._pending[path] = rest
+            else:
+                del self._pending[path]
+            return path, batch
+
+    def _run(self, path: str, batch):
+        model = self.cache.get(path)
+        convert_batch = getattr(self.converter, "convert_batch", None)
+        if len(batch) > 1 and callable(convert_batch):
+            convert_batch(model, [(r.input_wav, r.output_wav) for r in batch])
+            return
+        for req in batch:
+            try:
+                self.converter.convert(model, req.input_wav, req.output_wav)
+            except Exception as e:
+                req.error = e
+
+    def _loop(self):
+        while True:
+            path, batch = self._next_batch()
+            try:
+                self._run(path, batch)
+                self.batches_run += 1
+                self.requests_run += len(batch)
+                if len(batch) > 1:
+                    print(f"[rvc_worker] batch of {len(batch)} with {os.path.basename(path)} done")
+            except Exception as e:
+                for req in batch:
+                    req.error = req.error or e
+            finally:
+                for req in batch:
+                    req.done.set()
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = sum(len(q) for q in self._pending.values())
+        return {"batches_run": self.batches_run, "requests_run": self.requests_run, "queued": queued}
+
+
+# ============================================================
+#   SERVER
+# ============================================================
+class RvcServer(InferenceServer):
+    """
+    The inference server's socket, framing and shutdown with RVC
+    operations. Serves in one process (workers=0): the LRU and the batch
+    queue only help if every request reaches the same process.
+    """
+    name = "rvc_worker"
+
+    def __init__(self, converter=None, path: str | None = None, preload=RVC_PRELOAD,
+                 max_models: int = RVC_MAX_MODELS, window: float = RVC_BATCH_WINDOW,
+                 max_batch: int = RVC_MAX_BATCH):
+        super().__init__(path=path or RVC_WORKER_SOCKET or DEFAULT_SOCKET, workers=0, preload=preload)
+        self.converter = converter if converter is not None else load_converter()
+        self.cache = ModelCache(self.converter, max_models)
+        self.batcher = RvcBatcher(self.converter, self.cache, window, max_batch)
+        self.operations = {"ping": self._op_ping, "convert": self._op_convert}
+
+    def preload(self):
+        for path in self.preload_names:
+            try:
+                self.cache.get(path)
+            except Exception as e:
+                print(f"[rvc_worker] preload of {path} failed:", e)
+
+    def _op_ping(self):
+        return {"pid": os.getpid(), "models": self.cache.stats(), **self.batcher.stats()}
+
+    def _op_convert(self, input_wav, output_wav, model_path):
+        return self.batcher.submit(input_wav, output_wav, model_path)
+
+
+class RvcClient(InferenceClient):
+    def __init__(self, path: str | None = None, timeout: float = RVC_TIMEOUT):
+        super().__init__(path or RVC_WORKER_SOCKET or DEFAULT_SOCKET, timeout)
+
+    def convert(self, input_wav: str, output_wav: str, model_path: str) -> str:
+        """Same arguments as rvc_converter.convert_with_rvc."""
+        self.call("convert", input_wav=os.path.abspath(input_wav),
+                  output_wav=os.path.abspath(output_wav), model_path=os.path.abspath(model_path))
+        return output_wav
+
+
+def worker_enabled() -> bool:
+    return bool(RVC_WORKER_SOCKET)
+
+
+_CLIENT = None
+
+
+def get_client() -> RvcClient:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = RvcClient()
+    return _CLIENT
+
+
+# -----------------------------------
+# CLI: python rvc_worker.py [--ping]
+# RVC_CONVERTER=benchmarks.stubs:StubRVC runs it without RVC installed.
+# -----------------------------------
+if __name__ == "__main__":
+    if "--ping" in sys.argv:
+        print(json.dumps(RvcClient().ping(), indent=2))
+        sys.exit(0)
+    RvcServer().serve_forever()
@@ -0,0 +1,189 @@
+# speaker_cache.py
+import os
+import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------
+# Config
+# -----------------------------------
+SPEAKER_CACHE_DIR = os.getenv("SPEAKER_CACHE_DIR", os.path.join("cache", "speakers"))
+SPEAKER_CACHE_SIZE = int(os.getenv("SPEAKER_CACHE_SIZE", 32))   # in-memory entries
+
+
+def _extract(path: str):
+    from openvoice import se_extractor
+    return se_extractor.get_se(path)
+
+
+class SpeakerEmbeddingCache:
+    """
+    Speaker embeddings keyed by the sample's content hash: an in-memory LRU in
+    front of one pickle per hash on disk (shared by every worker process).
+    The sample is copied to <hash>.wav as it is hashed and only that copy is
+    read for extraction, so a later upload over the same path can't be
+    stored under this hash. prefetch() computes an embedding in the
+    background right after upload, and get() waits for that work instead of
+    starting a second extraction.
+    """
+
+    def __init__(self, root: str = SPEAKER_CACHE_DIR, capacity: int = SPEAKER_CACHE_SIZE,
+                 extractor=_extract):
+        self.root = root
+        self.capacity = max(1, capacity)
+        self.extractor = extractor
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._mem = OrderedDict()
+        self._inflight = {}
+        self._digests = {}   # (path, size, mtime) -> digest
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speaker-se")
+        os.makedirs(root, exist_ok=True)
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    def prefetch(self, path: str):
+        """Start computing the embedding for path without waiting for it."""
+        key, sample = self._snapshot(path)
+        with self._lock:
+            if key in self._mem or key in self._inflight:
+                return
+            if os.path.exists(self._disk_path(key)):
+                return
+            self._inflight[key] = self._pool.submit(self._compute, key, sample)
+
+    def get(self, path: str):
+        key, sample = self._snapshot(path)
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key]
+            fut = self._inflight.get(key)
+
+        if fut is not None:
+            self.hits += 1
+            return fut.result()
+
+        se = self._load(key)
+        if se is not None:
+            self.disk_hits += 1
+            self._remember(key, se)
+            return se
+
+        self.misses += 1
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = self._inflight[key] = self._pool.submit(self._compute, key, sample)
+        return fut.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "in_memory": len(self._mem),
+                "in_flight": len(self._inflight),
+            }
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _snapshot(self, path: str):
+        """(hash, copy) for the sample's current content."""
+        st = os.stat(path)
+        memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            key = self._digests.get(memo)
+        if key is not None and (os.path.exists(self._sample_path(key))
+                                or os.path.exists(self._disk_path(key))):
+            return key, self._sample_path(key)
+
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".wav.tmp")
+        h = hashlib.sha256()
+        try:
+            with open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for block in iter(lambda: src.read(1 << 20), b""):
+                    h.update(block)
+                    dst.write(block)
+            key = h.hexdigest()
+            if os.path.exists(self._disk_path(key)):
+                os.remove(tmp)   # already extracted; no copy needed
+            else:
+                os.replace(tmp, self._sample_path(key))
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        # only memoize if the file didn't change while it was copied
+        st2 = os.stat(path)
+        if (st2.st_size, st2.st_mtime_ns) == (st.st_size, st.st_mtime_ns):
+            with self._lock:
+                self._digests[memo] = key
+        return key, self._sample_path(key)
+
+    def _sample_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.wav")
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def _load(self, key: str):
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[speaker_cache] unreadable entry {key}: {e}")
+            return None
+
+    def _remember(self, key: str, se):
+        with self._lock:
+            self._mem[key] = se
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.capacity:
+                self._mem.popitem(last=False)
+
+    def _compute(self, key: str, path: str):
+        try:
+            print(f"[speaker_cache] extracting embedding for {os.path.basename(path)}")
+            se = self.extractor(path)
+            tmp = self._disk_path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(se, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._disk_path(key))
+            self._remember(key, se)
+            return se
+        finally:
+            # the hash-named copy: the pickle replaces it, and after a failed
+            # extraction the next get() snapshots the sample again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_speaker_cache() -> SpeakerEmbeddingCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SpeakerEmbeddingCache()
+        return _CACHE
@@ -0,0 +1,60 @@
+# startup.py
+import sys
+import time
+import importlib
+
+# modules that should NOT be in sys.modules before the first job runs
+HEAVY_MODULES = ("torch", "audiocraft", "openvoice", "moviepy", "bark", "langchain")
+
+_IMPORTS = {}   # module -> seconds
+_MARKS = {}     # phase -> seconds
+
+
+def timed_import(module: str):
+    t0 = time.perf_counter()
+    mod = importlib.import_module(module)
+    _IMPORTS.setdefault(module, round(time.perf_counter() - t0, 3))
+    return mod
+
+
+def mark(phase: str, seconds: float):
+    _MARKS[phase] = round(seconds, 3)
+
+
+def report() -> dict:
+    from model_registry import REGISTRY
+
+    return {
+        "phases": dict(_MARKS),
+        "imports": dict(_IMPORTS),
+        "models": REGISTRY.stats(),
+        "heavy_modules_loaded": sorted(m for m in HEAVY_MODULES if m in sys.modules),
+    }
+
+
+# -----------------------------------
+# CLI: python startup.py [model ...]
+# Times a cold import of the web app, then the pipeline and each model load.
+# -----------------------------------
+if __name__ == "__main__":
+    from model_registry import REGISTRY
+
+    timed_import("app")
+    heavy_at_app = sorted(m for m in HEAVY_MODULES if m in sys.modules)
+    for module in ("agent", "musicgen_generator", "tools"):
+        try:
+            timed_import(module)
+        except Exception as e:
+            print(f"[startup] import {module} failed:", e)
+
+    REGISTRY.warmup(sys.argv[1:] or ["musicgen", "openvoice"])
+
+    r = report()
+    print("\nIMPORTS (cumulative, in order)")
+    for name, secs in r["imports"].items():
+        print(f"  {name:<22} {secs:8.3f}s")
+    print("\nMODELS")
+    for m in r["models"]:
+        if m["loaded"]:
+            print(f"  {m['name']:<22} {m['load_seconds']:8.3f}s  rss +{(m['rss_delta_bytes'] or 0) / 2**20:.1f} MiB")
+    print("\nheavy modules after importing app:", heavy_at_app or "none")
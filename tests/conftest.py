@@ -0,0 +1,25 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# the app is a flat set of top-level modules run from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """app.py imported with its databases and folders under a temp dir."""
+    root = tmp_path_factory.mktemp("app")
+    mp = pytest.MonkeyPatch()
+    mp.setenv("WARMUP_MODELS", "")
+    mp.chdir(root)
+    try:
+        import app
+    finally:
+        mp.undo()
+    from jobs import JobStore
+    app.job_queue.store = JobStore(str(root / "jobs.db"))
+    app.app.config["TESTING"] = True
+    return app
@@ -0,0 +1,196 @@
+# tests/test_assets.py
+"""AssetSearch and AssetCache against a stub HTTP server (no network, no ffmpeg)."""
+import json
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from assets import AssetCache, AssetSearch
+
+
+class StubWeb:
+    """Serves scripted (content type, body) per path; records every request."""
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stub.requests.append((self.command, self.path, body))
+                if self.path not in stub.routes:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                ctype, payload = stub.routes[self.path]
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def route(self, path, ctype, body):
+        self.routes[path] = (ctype, body if isinstance(body, bytes) else body.encode("utf-8"))
+
+    def hits(self, path):
+        return sum(1 for _, p, _ in self.requests if p == path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def web():
+    stub = StubWeb()
+    yield stub
+    stub.close()
+
+
+# -----------------------------------
+# Search
+# -----------------------------------
+def serp(web, endpoint, items):
+    web.route(f"/{endpoint}", "application/json", json.dumps({endpoint: items}))
+
+
+def test_search_keeps_allowed_hosts_only(web):
+    serp(web, "images", [
+        {"link": "https://www.pexels.com/photo/1", "imageUrl": "https://images.pexels.com/1.jpg"},
+        {"link": "https://spam.example/p", "imageUrl": "https://spam.example/2.jpg"},
+        {"link": "https://spam.example/p", "imageUrl": "https://cdn.pixabay.com/3.jpg"},
+        {"link": "https://www.pexels.com/photo/1", "imageUrl": "https://images.pexels.com/1.jpg"},
+    ])
+    search = AssetSearch(base_url=web.url, api_key="k", hosts=("pexels.com", "pixabay.com"))
+    assert search.search("image", "Night Drive") == [
+        "https://images.pexels.com/1.jpg", "https://cdn.pixabay.com/3.jpg"]
+    method, path, body = web.requests[0]
+    assert (method, path) == ("POST", "/images")
+    assert json.loads(body)["q"] == "Night Drive free stock image"
+
+
+def test_video_results_are_their_pages(web):
+    serp(web, "videos", [{"link": "https://www.pexels.com/video/city-123/"}])
+    search = AssetSearch(base_url=web.url, api_key="k", hosts=("pexels.com",))
+    assert search.search("video", "city") == ["https://www.pexels.com/video/city-123/"]
+
+
+def test_search_results_are_cached_until_the_ttl(web):
+    serp(web, "images", [{"link": "https://pexels.com/a", "imageUrl": "https://pexels.com/a.jpg"}])
+    search = AssetSearch(base_url=web.url, api_key="k", ttl=0.2, hosts=("pexels.com",))
+    first = search.search("image", "Neon  City")
+    assert search.search("image", "neon city") == first      # same normalised query
+    assert web.hits("/images") == 1 and search.hits == 1
+    time.sleep(0.3)
+    search.search("image", "neon city")
+    assert web.hits("/images") == 2
+
+
+def test_search_errors_are_empty_and_not_cached(web):
+    search = AssetSearch(base_url=web.url, api_key="k")
+    assert search.search("image", "x") == []                 # 404
+    serp(web, "images", [{"link": "https://pexels.com/a", "imageUrl": "https://pexels.com/a.jpg"}])
+    assert search.search("image", "x") == ["https://pexels.com/a.jpg"]
+
+
+# -----------------------------------
+# Cache
+# -----------------------------------
+class CopyCache(AssetCache):
+    """prepare() without ffmpeg: the 'prepared' file is the download itself."""
+
+    def prepare(self, src, dest, asset_type):
+        shutil.copyfile(src, dest)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CopyCache(str(tmp_path / "assets"), max_bytes=10**6, hosts=("127.0.0.1",))
+
+
+def test_fetch_downloads_once_per_url_and_once_per_content(web, cache):
+    web.route("/a.jpg", "image/jpeg", b"A" * 100)
+    web.route("/same-as-a.jpg", "image/jpeg", b"A" * 100)
+    path = cache.fetch(f"{web.url}/a.jpg", "image")
+    assert open(path, "rb").read() == b"A" * 100
+    assert path.endswith("_1280x720.jpg")
+
+    assert cache.fetch(f"{web.url}/a.jpg", "image") == path   # index hit, no request
+    assert web.hits("/a.jpg") == 1
+    assert cache.fetch(f"{web.url}/same-as-a.jpg", "image") == path
+    assert cache.stats()["files"] == 1 and cache.stats()["downloads"] == 2
+
+
+def test_fetch_rejects_the_wrong_media_type(web, cache):
+    web.route("/clip.mp4", "video/mp4", b"V" * 10)
+    with pytest.raises(ValueError, match="not image"):
+        cache.fetch(f"{web.url}/clip.mp4", "image")
+
+
+def test_page_is_resolved_to_its_og_media(web, cache):
+    web.route("/photo/1", "text/html",
+              '<html><head><meta property="og:image" content="/files/1.jpg"></head></html>')
+    web.route("/files/1.jpg", "image/jpeg", b"P" * 50)
+    path = cache.fetch(f"{web.url}/photo/1", "image")
+    assert open(path, "rb").read() == b"P" * 50
+
+
+def test_og_media_outside_the_allowed_hosts_is_refused(web, cache):
+    web.route("/photo/2", "text/html",
+              f'<meta property="og:image" content="http://localhost:{web.port}/files/2.jpg">')
+    web.route("/files/2.jpg", "image/jpeg", b"Q")
+    with pytest.raises(ValueError, match="outside ASSET_HOSTS"):
+        cache.fetch(f"{web.url}/photo/2", "image")
+    assert web.hits("/files/2.jpg") == 0
+
+
+def test_page_without_media_and_page_to_page_fail(web, cache):
+    web.route("/empty", "text/html", "<html></html>")
+    web.route("/hop", "text/html", '<meta property="og:image" content="/empty">')
+    with pytest.raises(ValueError, match="no image found"):
+        cache.fetch(f"{web.url}/empty", "image")
+    with pytest.raises(ValueError, match="is a page"):
+        cache.fetch(f"{web.url}/hop", "image")
+
+
+def test_lru_evicts_least_recently_fetched(web, tmp_path):
+    cache = CopyCache(str(tmp_path / "assets"), max_bytes=250, hosts=("127.0.0.1",))
+    for name in "abc":
+        web.route(f"/{name}.jpg", "image/jpeg", name.encode() * 100)
+    a = cache.fetch(f"{web.url}/a.jpg", "image")
+    b = cache.fetch(f"{web.url}/b.jpg", "image")
+    cache.fetch(f"{web.url}/a.jpg", "image")                  # a is now the most recent
+    c = cache.fetch(f"{web.url}/c.jpg", "image")              # evicts b
+    assert cache.stats()["evictions"] == 1
+    assert open(a, "rb").read(1) == b"a" and open(c, "rb").read(1) == b"c"
+    with pytest.raises(FileNotFoundError):
+        open(b, "rb")
+
+    cache.fetch(f"{web.url}/b.jpg", "image")                  # evicted: downloaded again
+    assert web.hits("/b.jpg") == 2
+
+
+def test_restart_keeps_the_index(web, tmp_path):
+    web.route("/a.jpg", "image/jpeg", b"A" * 10)
+    root = str(tmp_path / "assets")
+    path = CopyCache(root, hosts=("127.0.0.1",)).fetch(f"{web.url}/a.jpg", "image")
+    again = CopyCache(root, hosts=("127.0.0.1",))
+    assert again.fetch(f"{web.url}/a.jpg", "image") == path
+    assert web.hits("/a.jpg") == 1
@@ -0,0 +1,144 @@
+# tests/test_catalog.py
+"""FileCatalog paging and filters, and /list's cursor, ETag and limit handling."""
+import pytest
+
+from catalog import FileCatalog, guess_format
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    public = tmp_path / "public"
+    public.mkdir()
+    cat = FileCatalog(str(tmp_path / "catalog.db"), public_dir=str(public))
+
+    def publish(name, job_id=None):
+        path = public / name
+        path.write_bytes(b"x" * 10)
+        cat.add(str(path), job_id=job_id)
+        return path
+
+    cat.publish = publish
+    return cat
+
+
+def names(rows):
+    return [r["name"] for r in rows]
+
+
+def test_guess_format():
+    assert guess_format("song.MP3") == "mp3"
+    assert guess_format("simple_song.mp4") == "simple_mp4"
+    assert guess_format("high_song.mp4") == "high_mp4"
+    assert guess_format("clip.mp4") == "mp4"
+    assert guess_format("notes.txt") is None
+
+
+def test_cursor_pages_walk_newest_first_without_gaps(catalog):
+    for i in range(7):
+        catalog.publish(f"s{i}.mp3")
+    seen, cursor = [], None
+    while True:
+        rows, cursor = catalog.list(limit=3, cursor=cursor)
+        seen += names(rows)
+        if cursor is None:
+            break
+    assert seen == [f"s{i}.mp3" for i in reversed(range(7))]
+
+
+def test_exact_page_has_no_next_cursor(catalog):
+    for i in range(3):
+        catalog.publish(f"s{i}.mp3")
+    rows, cursor = catalog.list(limit=3)
+    assert len(rows) == 3 and cursor is None
+
+
+def test_filters_and_version(catalog):
+    v0 = catalog.version()
+    catalog.publish("a.mp3", job_id="j1")
+    catalog.publish("high_a.mp4", job_id="j1")
+    catalog.publish("b.mp3", job_id="j2")
+    assert catalog.version() == v0 + 3
+    assert names(catalog.list(job_id="j1")[0]) == ["high_a.mp4", "a.mp3"]
+    assert names(catalog.list(file_format="mp3")[0]) == ["b.mp3", "a.mp3"]
+    assert catalog.latest("high_mp4")["name"] == "high_a.mp4"
+
+    catalog.remove("b.mp3")
+    catalog.remove("b.mp3")               # no change, no bump
+    assert catalog.version() == v0 + 4
+
+
+def test_nonpositive_limit_returns_one_row(catalog):
+    for i in range(3):
+        catalog.publish(f"s{i}.mp3")
+    for limit in (0, -1):
+        rows, cursor = catalog.list(limit=limit)
+        assert names(rows) == ["s2.mp3"] and cursor == rows[0]["id"]
+
+
+def test_backfill_imports_existing_files(tmp_path):
+    public = tmp_path / "public"
+    public.mkdir()
+    (public / "old.wav").write_bytes(b"RIFF")
+    (public / "lyrics.txt").write_text("la")
+    cat = FileCatalog(str(tmp_path / "c.db"), public_dir=str(public))
+    assert names(cat.list()[0]) == ["old.wav"]
+
+
+# -----------------------------------
+# /list
+# -----------------------------------
+@pytest.fixture
+def client(app_module, catalog, monkeypatch):
+    monkeypatch.setattr(app_module, "get_catalog", lambda: catalog)
+    return app_module.app.test_client()
+
+
+def test_list_follows_next_cursor_header(client, catalog):
+    for i in range(5):
+        catalog.publish(f"s{i}.mp3")
+    first = client.get("/list?limit=2")
+    assert [i["name"] for i in first.json] == ["s4.mp3", "s3.mp3"]
+    second = client.get(f"/list?limit=2&cursor={first.headers['X-Next-Cursor']}")
+    assert [i["name"] for i in second.json] == ["s2.mp3", "s1.mp3"]
+    third = client.get(f"/list?limit=2&cursor={second.headers['X-Next-Cursor']}")
+    assert [i["name"] for i in third.json] == ["s0.mp3"]
+    assert "X-Next-Cursor" not in third.headers
+
+
+def test_list_etag_revalidates_until_something_is_published(client, catalog):
+    catalog.publish("a.mp3")
+    resp = client.get("/list")
+    etag = resp.headers["ETag"]
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/list", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag
+    assert client.get("/list?limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+    catalog.publish("b.mp3")
+    fresh = client.get("/list", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-1"])
+def test_list_clamps_small_limits_to_one(client, catalog, query):
+    for i in range(3):
+        catalog.publish(f"s{i}.mp3")
+    resp = client.get(f"/list?{query}")
+    assert resp.status_code == 200 and [i["name"] for i in resp.json] == ["s2.mp3"]
+    cursor = resp.headers["X-Next-Cursor"]
+    assert [i["name"] for i in client.get(f"/list?limit=1&cursor={cursor}").json] == ["s1.mp3"]
+
+
+def test_list_clamps_large_limits(client, catalog, monkeypatch):
+    seen = []
+    real = catalog.list
+    monkeypatch.setattr(catalog, "list", lambda **kw: seen.append(kw["limit"]) or real(**kw))
+    assert client.get("/list?limit=100000").status_code == 200
+    assert seen == [500]
+
+
+@pytest.mark.parametrize("query", ["limit=ten", "limit=2.5", "cursor=abc"])
+def test_list_rejects_non_integer_paging(client, query):
+    resp = client.get(f"/list?{query}")
+    assert resp.status_code == 400 and "error" in resp.json
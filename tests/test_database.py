@@ -0,0 +1,58 @@
+# tests/test_database.py
+"""GenerationStore writes, format filtering and the alembic stamp on create."""
+import sqlite3
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from database import GenerationStore, create_schema, make_engine  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'gen.db'}")
+    create_schema(engine)
+    return GenerationStore(engine=engine, flush_interval=60)
+
+
+def test_rows_are_buffered_until_flushed(store):
+    store.record(user_id="u1", job_id="j", lyrics="la la", file_format="mp3")
+    assert store.rows_written == 0
+    rows = store.recent()                # reads flush first
+    assert store.rows_written == 1
+    assert rows[0]["lyrics_len"] == 5
+
+
+def test_one_row_per_format_filters_on_the_index(store):
+    for fmt in ("mp3", "wav", "high_mp4"):
+        store.record(user_id="u1", job_id="j1", file_format=fmt, file_path=f"song.{fmt}")
+    store.record(user_id="u2", job_id="j2", file_format="mp3")
+    assert {r["job_id"] for r in store.recent(file_format="mp3")} == {"j1", "j2"}
+    assert [r["file_path"] for r in store.recent(file_format="wav")] == ["song.wav"]
+    assert len(store.recent(user_id="u1")) == 3
+
+
+def test_new_database_is_stamped_at_the_alembic_head(tmp_path):
+    pytest.importorskip("alembic")
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    import database
+
+    cfg = Config()
+    cfg.set_main_option("script_location", database.ALEMBIC_DIR)
+    head = ScriptDirectory.from_config(cfg).get_current_head()
+
+    path = tmp_path / "fresh.db"
+    create_schema(make_engine(f"sqlite:///{path}"))
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT version_num FROM alembic_version").fetchall() == [(head,)]
+
+
+def test_existing_table_is_not_stamped(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE music_generations (id INTEGER PRIMARY KEY, user_id TEXT)")
+    create_schema(make_engine(f"sqlite:///{path}"))
+    with sqlite3.connect(path) as conn:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert "alembic_version" not in tables
@@ -0,0 +1,104 @@
+# tests/test_events.py
+"""EventBus publish/subscribe and the /jobs/<id>/events stream limits."""
+import threading
+
+import pytest
+
+from events import EventBus
+from jobs import Job
+
+
+def job_event(status):
+    return {"type": "job", "status": status}
+
+
+def test_late_subscriber_gets_history_then_live_events():
+    bus = EventBus()
+    bus.publish("j", job_event("queued"))
+    events = bus.subscribe("j", keepalive=5)
+    assert next(events)["status"] == "queued"
+
+    threading.Timer(0.05, bus.publish, ("j", {"type": "stage", "stage": "vocals"})).start()
+    threading.Timer(0.1, bus.publish, ("j", job_event("done"))).start()
+    rest = list(events)
+    assert [e.get("stage") or e["status"] for e in rest] == ["vocals", "done"]
+    assert all(e["job_id"] == "j" and "ts" in e for e in rest)
+
+
+def test_finished_job_replays_and_ends():
+    bus = EventBus()
+    bus.publish("j", job_event("running"))
+    bus.publish("j", job_event("failed"))
+    assert [e["status"] for e in bus.subscribe("j")] == ["running", "failed"]
+    assert not bus._channels["j"].subscribers
+
+
+def test_silence_yields_keepalives_and_unsubscribes_on_close():
+    bus = EventBus()
+    events = bus.subscribe("j", keepalive=0.01)
+    assert next(events) is None
+    assert len(bus._channels["j"].subscribers) == 1
+    events.close()
+    assert not bus._channels["j"].subscribers
+
+
+def test_history_and_job_count_are_bounded():
+    bus = EventBus(history=3, max_jobs=2)
+    for i in range(5):
+        bus.publish("a", {"type": "stage", "n": i})
+    assert [e["n"] for e in bus._channels["a"].history] == [2, 3, 4]
+    bus.publish("b", job_event("queued"))
+    bus.publish("c", job_event("queued"))
+    assert list(bus._channels) == ["b", "c"]
+
+
+# -----------------------------------
+# SSE route
+# -----------------------------------
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def job(app_module):
+    gate = threading.Event()
+    q = app_module.job_queue
+    handler, q.handler = q.handler, lambda job: gate.wait(5)
+    try:
+        yield q.submit({})
+    finally:
+        gate.set()
+        q.handler = handler
+
+
+def test_unknown_job_is_404_and_other_workers_job_is_409(app_module, client):
+    assert client.get("/jobs/nope/events").status_code == 404
+    other = Job({})                       # saved by another worker, not in this queue
+    other.id, other.status = "elsewhere", "running"
+    app_module.job_queue.store.save(other)
+    resp = client.get("/jobs/elsewhere/events")
+    assert resp.status_code == 409 and resp.json["status_url"] == "/jobs/elsewhere"
+
+
+def test_stream_cap_sends_clients_back_to_polling(app_module, client, job, monkeypatch):
+    monkeypatch.setattr(app_module, "SSE_MAX_STREAMS", 1)
+    first = client.get(f"/jobs/{job.id}/events")
+    assert first.status_code == 200
+    busy = client.get(f"/jobs/{job.id}/events")
+    assert busy.status_code == 503 and busy.json["status_url"] == f"/jobs/{job.id}"
+    first.close()                                  # frees the slot
+    assert app_module._sse_streams == 0
+    again = client.get(f"/jobs/{job.id}/events")
+    assert again.status_code == 200
+    again.close()
+
+
+def test_stream_ends_with_poll_event_after_max_seconds(app_module, client, job, monkeypatch):
+    monkeypatch.setattr(app_module, "SSE_MAX_SECONDS", 0)
+    resp = client.get(f"/jobs/{job.id}/events")
+    body = resp.get_data(as_text=True)
+    resp.close()
+    assert body.startswith("retry: 5000")
+    assert "event: poll" in body and f'"status_url": "/jobs/{job.id}"' in body
+    assert app_module._sse_streams == 0
@@ -0,0 +1,49 @@
+# tests/test_inference_server.py
+"""dispatch() on good and malformed requests, and the wire framing."""
+import socket
+
+import pytest
+
+from inference_server import dispatch, recv_msg, send_msg
+
+OPS = {
+    "add": lambda a, b=0: a + b,
+    "boom": lambda: 1 / 0,
+}
+
+
+def test_dispatch_calls_the_op_with_its_args():
+    assert dispatch({"op": "add", "args": {"a": 2, "b": 3}}, OPS) == {"ok": True, "result": 5}
+    assert dispatch({"op": "add", "args": {"a": 2}}, OPS)["result"] == 2
+
+
+def test_op_errors_come_back_typed():
+    assert dispatch({"op": "boom"}, OPS) == {
+        "ok": False, "type": "ZeroDivisionError", "error": "division by zero"}
+    bad_args = dispatch({"op": "add", "args": {"c": 1}}, OPS)
+    assert bad_args["ok"] is False and bad_args["type"] == "TypeError"
+
+
+@pytest.mark.parametrize("request_, shown", [
+    ({"op": "nope"}, "'nope'"),
+    ({}, "None"),
+    ({"op": ["add"]}, "['add']"),            # unhashable, must not raise
+    (["add"], "['add']"),
+    ("add", "'add'"),
+    (None, "None"),
+    (42, "42"),
+])
+def test_malformed_requests_are_value_errors(request_, shown):
+    resp = dispatch(request_, OPS)
+    assert resp == {"ok": False, "type": "ValueError", "error": f"unknown op {shown}"}
+
+
+def test_framing_round_trip_and_clean_eof():
+    a, b = socket.socketpair()
+    with a, b:
+        send_msg(a, {"op": "ping", "args": {}})
+        send_msg(a, ["not", "a", "dict"])
+        assert recv_msg(b) == {"op": "ping", "args": {}}
+        assert dispatch(recv_msg(b))["type"] == "ValueError"
+        a.shutdown(socket.SHUT_WR)
+        assert recv_msg(b) is None
@@ -0,0 +1,87 @@
+# tests/test_instrumental_cache.py
+"""InstrumentalCache: variants per key, lowest free slot, LRU by size."""
+import os
+import time
+
+import pytest
+
+from instrumental_cache import InstrumentalCache, cache_key
+
+
+@pytest.fixture
+def wav(tmp_path):
+    def make(name, size=100, fill=b"x"):
+        path = tmp_path / name
+        path.write_bytes(fill * size)
+        return str(path)
+    return make
+
+
+def slots(cache, key):
+    return sorted(os.path.basename(p) for p in cache._takes(key))
+
+
+def test_key_ignores_prompt_case_and_whitespace():
+    assert cache_key("small", " Lo-Fi Beat ", 15) == cache_key("small", "lo-fi beat", 15)
+    assert cache_key("small", "lo-fi beat", 15) != cache_key("small", "lo-fi beat", 30)
+    assert cache_key("small", "lo-fi beat", 15, seed=1) != cache_key("small", "lo-fi beat", 15)
+
+
+def test_unseeded_lookups_hit_only_once_all_variants_exist(tmp_path, wav):
+    cache = InstrumentalCache(str(tmp_path / "c"), max_bytes=10**6, variants=3)
+    out = str(tmp_path / "out.wav")
+    for i in range(3):
+        assert cache.get("k", out) is None
+        cache.put("k", wav(f"take{i}.wav", fill=bytes([65 + i])))
+    assert cache.get("k", out) == out
+    assert open(out, "rb").read(1) in (b"A", b"B", b"C")
+    assert slots(cache, "k") == ["k_0.wav", "k_1.wav", "k_2.wav"]
+    cache.put("k", wav("extra.wav"))            # full: ignored
+    assert len(slots(cache, "k")) == 3
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_seeded_lookup_needs_one_take(tmp_path, wav):
+    cache = InstrumentalCache(str(tmp_path / "c"), max_bytes=10**6, variants=3)
+    cache.put("s", wav("a.wav"))
+    assert cache.get("s", str(tmp_path / "o.wav"), seeded=True)
+
+
+def test_evicted_slot_is_refilled_first(tmp_path, wav):
+    # room for exactly three 100-byte takes
+    cache = InstrumentalCache(str(tmp_path / "c"), max_bytes=300, variants=3)
+    for i in range(3):
+        cache.put("k", wav(f"t{i}.wav"))
+    cache.put("other", wav("o.wav"))            # evicts k_0, the oldest
+    assert slots(cache, "k") == ["k_1.wav", "k_2.wav"]
+    assert cache.stats()["evictions"] == 1
+
+    cache.max_bytes = 400                       # room for the refill
+    cache.put("k", wav("again.wav"))
+    assert slots(cache, "k") == ["k_0.wav", "k_1.wav", "k_2.wav"]
+    assert cache.get("k", str(tmp_path / "out.wav"))
+
+
+def test_lru_keeps_recently_read_takes(tmp_path, wav):
+    cache = InstrumentalCache(str(tmp_path / "c"), max_bytes=300, variants=1)
+    for key in "abc":
+        cache.put(key, wav(f"{key}.wav"))
+    cache.get("a", str(tmp_path / "out.wav"))   # a becomes most recent
+    cache.put("d", wav("d.wav"))                # evicts b, not a
+    assert os.listdir(str(tmp_path / "c")) and not cache._takes("b")
+    assert cache._takes("a") and cache._takes("c") and cache._takes("d")
+    assert cache.stats()["bytes"] == 300
+
+
+def test_lru_order_survives_a_restart(tmp_path, wav):
+    root = str(tmp_path / "c")
+    cache = InstrumentalCache(root, max_bytes=300, variants=1)
+    for key in "abc":
+        cache.put(key, wav(f"{key}.wav"))
+        time.sleep(0.01)
+    now = time.time()
+    os.utime(cache._takes("a")[0], (now + 10, now + 10))   # a read last
+
+    reopened = InstrumentalCache(root, max_bytes=300, variants=1)
+    reopened.put("d", wav("d.wav"))
+    assert not reopened._takes("b") and reopened._takes("a")
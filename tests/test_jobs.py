@@ -0,0 +1,104 @@
+# tests/test_jobs.py
+"""JobQueue bounds and lifecycle, and the shared JobStore."""
+import json
+import time
+import sqlite3
+import threading
+import subprocess
+import sys
+
+import pytest
+
+from jobs import JobQueue, JobStore, QueueFull, QUEUED, RUNNING, DONE, FAILED
+
+
+def wait_until(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while not cond():
+        if time.time() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def test_full_queue_rejects_new_jobs():
+    gate = threading.Event()
+    q = JobQueue(lambda job: gate.wait(5), workers=1, maxsize=1)
+    try:
+        running = q.submit({})
+        wait_until(lambda: running.status == RUNNING)
+        q.submit({})                      # fills the one queue slot
+        with pytest.raises(QueueFull):
+            q.submit({})
+        assert q.pending() == 1 and q.running() == 1
+    finally:
+        gate.set()
+
+
+def test_status_lifecycle_is_reported_in_order():
+    seen = []
+    q = JobQueue(lambda job: {"echo": job.data["x"]},
+                 listener=lambda job: seen.append((job.id, job.status)))
+    job = q.submit({"x": 1})
+    wait_until(lambda: job.status == DONE)
+
+    assert [s for _, s in seen] == [QUEUED, RUNNING, DONE]
+    d = q.get(job.id).to_dict()
+    assert d["result"] == {"echo": 1} and d["error"] is None
+    assert d["created_at"] <= d["started_at"] <= d["finished_at"]
+
+
+def test_failed_job_keeps_its_error():
+    def boom(job):
+        raise ValueError("no lyrics")
+
+    q = JobQueue(boom)
+    job = q.submit({})
+    wait_until(lambda: job.status == FAILED)
+    assert q.status(job.id)["error"] == "no lyrics"
+
+
+def test_other_processes_see_status_through_the_store(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    q = JobQueue(lambda job: {"audio": "song.mp3"}, store=JobStore(db))
+    job = q.submit({})
+    wait_until(lambda: job.status == DONE)
+
+    other = JobQueue(lambda job: None, store=JobStore(db))   # e.g. another gunicorn worker
+    assert other.get(job.id) is None
+    assert other.status(job.id)["status"] == DONE
+    assert other.status(job.id)["result"] == {"audio": "song.mp3"}
+    assert other.status("unknown") is None
+
+
+def test_store_keeps_only_recent_history(tmp_path):
+    q = JobQueue(lambda job: None, store=JobStore(str(tmp_path / "jobs.db"), history=3))
+    jobs = [q.submit({}) for _ in range(6)]
+    wait_until(lambda: all(j.status == DONE for j in jobs))
+    n = sqlite3.connect(str(tmp_path / "jobs.db")).execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    assert n == 3
+
+
+def test_jobs_of_a_dead_process_are_marked_failed(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    # a process that stores a running job and exits without finishing it
+    code = (
+        "import sys; sys.path[:0] = %r\n"
+        "from jobs import Job, JobStore, RUNNING\n"
+        "job = Job({}); job.status = RUNNING\n"
+        "JobStore(%r).save(job); print(job.id)\n" % (sys.path, db)
+    )
+    job_id = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True).stdout.split()[-1]
+
+    live = JobQueue(lambda job: time.sleep(0.5), store=JobStore(db))
+    mine = live.submit({})
+    wait_until(lambda: mine.status == RUNNING)
+
+    state = JobStore(db).get(job_id)         # a fresh store reclaims on open
+    assert state["status"] == FAILED
+    assert "interrupted" in state["error"]
+    assert JobStore(db).get(mine.id)["status"] == RUNNING   # owner still alive
+    raw = sqlite3.connect(db).execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    assert raw[0] == FAILED
+    assert json.loads(sqlite3.connect(db).execute(
+        "SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])["finished_at"]
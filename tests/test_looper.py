@@ -0,0 +1,106 @@
+# tests/test_looper.py
+"""Tempo, beat phase and loop cutting on synthetic click tracks."""
+import numpy as np
+import pytest
+
+import looper
+from looper import build_loop_cell, detect_tempo, find_loop, loop_cell
+
+
+def click_track(bpm, first_beat, sr, seconds=15.0, seed=0):
+    """Decaying noise bursts on every beat, starting at first_beat seconds."""
+    rng = np.random.default_rng(seed)
+    y = np.zeros(int(seconds * sr), dtype=np.float32)
+    n = int(0.01 * sr)
+    burst = (rng.normal(0.0, 0.5, n) * np.exp(-np.arange(n) / (0.002 * sr))).astype(np.float32)
+    t = first_beat
+    while int(round(t * sr)) + n < len(y):
+        i = int(round(t * sr))
+        y[i:i + n] += burst
+        t += 60.0 / bpm
+    return y
+
+
+def phase_error(found, expected, bpm):
+    period = 60.0 / bpm
+    return (found - expected + period / 2) % period - period / 2
+
+
+@pytest.mark.parametrize("bpm, first_beat, sr", [
+    (90, 0.30, 32000),
+    (90, 0.60, 44100),
+    (120, 0.25, 32000),
+    (140, 0.10, 32000),
+    (75, 0.50, 24000),
+])
+def test_tempo_and_first_beat(bpm, first_beat, sr):
+    found_bpm, found_beat, confidence = detect_tempo(click_track(bpm, first_beat, sr), sr)
+    assert found_bpm == pytest.approx(bpm, rel=0.015)
+    assert 0.0 <= found_beat < 60.0 / found_bpm
+    # within a couple of hops, not the ~64 ms a window-start frame time gives
+    assert abs(phase_error(found_beat, first_beat, bpm)) < 0.035
+    assert confidence > 0.5
+
+
+def test_stereo_input_is_mixed_down():
+    mono = click_track(100, 0.2, 32000)
+    bpm, beat, _ = detect_tempo(np.stack([mono, mono], axis=1), 32000)
+    assert bpm == pytest.approx(100, rel=0.015)
+    assert abs(phase_error(beat, 0.2, 100)) < 0.035
+
+
+def test_short_or_silent_clips_are_rejected():
+    with pytest.raises(ValueError, match="too short"):
+        detect_tempo(np.zeros(1000, np.float32), 32000)
+    with pytest.raises(ValueError):
+        detect_tempo(np.zeros(32000 * 5, np.float32), 32000)
+
+
+def test_loop_is_whole_bars_on_the_beat_grid():
+    sr, bpm, first = 32000, 120, 0.25
+    x = click_track(bpm, first, sr)
+    found_bpm, found_beat, _ = detect_tempo(x, sr)
+    start, end, _ = find_loop(x, sr, found_bpm, found_beat, bars=4)
+    beat = 60.0 / bpm
+    assert (end - start) / sr == pytest.approx(16 * beat, rel=0.01)
+    assert start >= looper.LOOP_MIN_START_SECONDS * sr
+    assert abs(phase_error(start / sr, first, bpm)) < 0.035
+
+
+def test_bars_are_halved_when_the_clip_is_short():
+    sr, bpm = 32000, 90
+    x = click_track(bpm, 0.3, sr, seconds=8.0)         # room for 2 bars, not 4
+    start, end, _ = find_loop(x, sr, bpm, 0.3, bars=4)
+    assert (end - start) / sr == pytest.approx(8 * 60.0 / bpm, rel=0.01)
+
+
+def test_loop_cell_crossfades_the_seam():
+    sr = 1000
+    x = np.concatenate([np.zeros(100), np.ones(100), np.full(100, 2.0)]).astype(np.float32)
+    cell = loop_cell(x, sr, 100, 200, crossfade_ms=10)
+    assert len(cell) == 100
+    # head blends from the audio after the end (2.0) into the loop start (1.0)
+    assert cell[0] == pytest.approx(2.0)
+    assert cell[9] == pytest.approx(np.sin(np.pi / 2) * 1.0 + np.cos(np.pi / 2) * 2.0, abs=1e-6)
+    assert np.all(cell[10:] == 1.0)
+    assert np.array_equal(loop_cell(x, sr, 200, 300, crossfade_ms=10), x[200:300])  # nothing after
+
+
+def test_build_loop_cell_writes_the_cell(tmp_path):
+    sf = pytest.importorskip("soundfile")
+    sr = 32000
+    clip = tmp_path / "clip.wav"
+    sf.write(str(clip), click_track(100, 0.4, sr), sr)
+    info = build_loop_cell(str(clip), str(tmp_path / "cell.wav"), bars=2)
+    assert info["bpm"] == pytest.approx(100, rel=0.015)
+    assert info["loop_seconds"] == pytest.approx(8 * 0.6, rel=0.01)
+    assert sf.info(str(tmp_path / "cell.wav")).frames == pytest.approx(info["loop_seconds"] * sr, abs=1)
+
+
+def test_build_loop_cell_falls_back_to_the_whole_clip(tmp_path):
+    sf = pytest.importorskip("soundfile")
+    sr = 32000
+    sf.write(str(tmp_path / "flat.wav"), np.zeros(sr * 3, np.float32), sr)
+    info = build_loop_cell(str(tmp_path / "flat.wav"), str(tmp_path / "cell.wav"))
+    assert info["bpm"] is None
+    assert info["loop_seconds"] == pytest.approx(3.0 - looper.LOOP_CROSSFADE_MS / 1000, abs=1e-3)
@@ -0,0 +1,86 @@
+# tests/test_mixer.py
+"""The streaming mixer's block loop on synthetic float32 audio (no ffmpeg)."""
+import io
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pydub")
+from mixer import MIX_CHANNELS, _mix_blocks, _read_looped  # noqa: E402
+
+
+def stereo(values):
+    x = np.asarray(values, dtype=np.float32)
+    return np.repeat(x[:, None], MIX_CHANNELS, axis=1)
+
+
+def raw_file(frames):
+    return io.BytesIO(np.ascontiguousarray(frames, dtype=np.float32).tobytes())
+
+
+def reader(frames, block):
+    data = np.ascontiguousarray(frames, dtype=np.float32).tobytes()
+    step = block * 4 * MIX_CHANNELS
+    chunks = iter([data[i:i + step] for i in range(0, len(data), step)])
+    return lambda: next(chunks, b"")
+
+
+def mix(vocals, beat, block=4, gain=1.0, fade_frames=0, limiter=False):
+    blocks = list(_mix_blocks(reader(vocals, block), raw_file(beat), len(beat),
+                              np.float32(gain), fade_frames, limiter))
+    return np.concatenate(blocks) if blocks else np.empty((0, MIX_CHANNELS), np.float32)
+
+
+def test_read_looped_wraps_at_the_end():
+    beat = raw_file(stereo([0, 1, 2, 3, 4]))
+    assert _read_looped(beat, 5, 3, 6)[:, 0].tolist() == [3, 4, 0, 1, 2, 3]
+    assert _read_looped(beat, 5, 12, 2)[:, 0].tolist() == [2, 3]
+    assert _read_looped(beat, 5, 0, 11)[:, 1].tolist() == [0, 1, 2, 3, 4] * 2 + [0]
+
+
+def test_beat_loops_under_the_vocals_across_blocks():
+    beat = stereo([0.1, 0.2, 0.3])
+    out = mix(stereo(np.zeros(10)), beat, block=4)
+    assert out.shape == (10, MIX_CHANNELS)
+    np.testing.assert_allclose(out[:, 0], [0.1, 0.2, 0.3] * 3 + [0.1], rtol=1e-6)
+
+
+def test_vocal_gain_and_clipping():
+    out = mix(stereo([0.25, 0.5, 0.9]), stereo([0.0, 0.0, 0.5]), gain=2.0)
+    np.testing.assert_allclose(out[:, 0], [0.5, 1.0, 1.0])
+    soft = mix(stereo([0.9]), stereo([0.5]), limiter=True)
+    assert soft[0, 0] == pytest.approx(np.tanh(1.4), rel=1e-6)
+
+
+def test_fade_holds_back_the_tail_and_ramps_the_beat():
+    n, fade = 20, 5
+    out = mix(stereo(np.zeros(n)), stereo(np.full(7, 0.5)), block=3, fade_frames=fade)
+    assert len(out) == n
+    np.testing.assert_allclose(out[:n - fade, 0], 0.5)
+    np.testing.assert_allclose(out[n - fade:, 0], 0.5 * np.linspace(1.0, 0.0, fade), atol=1e-7)
+
+
+def test_fade_longer_than_the_song_fades_all_of_it():
+    out = mix(stereo(np.zeros(4)), stereo([1.0]), block=2, fade_frames=100)
+    np.testing.assert_allclose(out[:, 0], np.linspace(1.0, 0.0, 4), atol=1e-7)
+
+
+def test_partial_frames_and_empty_input():
+    vocals = np.ascontiguousarray(stereo([0.1, 0.2]), dtype=np.float32).tobytes()
+    chunks = iter([vocals + b"\x00\x00", b""])     # trailing half sample is dropped
+    out = list(_mix_blocks(lambda: next(chunks), raw_file(stereo([0.0])), 1, np.float32(1.0)))
+    assert np.concatenate(out).shape == (2, MIX_CHANNELS)
+    assert mix(np.empty((0, MIX_CHANNELS)), stereo([0.5]), fade_frames=3).shape == (0, MIX_CHANNELS)
+
+
+def test_stops_at_the_first_block_when_the_consumer_does():
+    reads = []
+
+    def read():
+        reads.append(1)
+        return np.zeros((4, MIX_CHANNELS), np.float32).tobytes()
+
+    blocks = _mix_blocks(read, raw_file(stereo([0.5])), 1, np.float32(1.0))
+    next(blocks)
+    blocks.close()          # what a BrokenPipeError break does
+    assert len(reads) == 1
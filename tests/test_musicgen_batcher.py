@@ -0,0 +1,180 @@
+# tests/test_musicgen_batcher.py
+"""MusicGenBatcher with a dummy model entry; no weights needed."""
+import sys
+import time
+import types
+import threading
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def mg():
+    """musicgen_generator, importable without torch (only the batcher is used)."""
+    saved = {k: sys.modules.get(k) for k in ("torch", "musicgen_generator")}
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        fake = types.ModuleType("torch")
+        fake.utils = SimpleNamespace(_pytree=SimpleNamespace(register_pytree_node=None))
+        fake.cuda = SimpleNamespace(is_available=lambda: False)
+        fake.inference_mode = contextlib.nullcontext
+        fake.autocast = lambda *a, **k: contextlib.nullcontext()
+        sys.modules["torch"] = fake
+    sys.modules.pop("musicgen_generator", None)
+    import musicgen_generator
+    yield musicgen_generator
+    for k, v in saved.items():
+        if v is None:
+            sys.modules.pop(k, None)
+        else:
+            sys.modules[k] = v
+
+
+class Wav:
+    def __init__(self, prompt, duration):
+        self.prompt, self.duration = prompt, duration
+
+    def float(self):
+        return self
+
+    def cpu(self):
+        return self
+
+
+class DummyModel:
+    """Records every generate() call; can block the first one or fail."""
+
+    def __init__(self, block_first=False, fail=None):
+        self.calls = []
+        self.duration = None
+        self.fail = fail
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        if not block_first:
+            self.gate.set()
+
+    def set_generation_params(self, duration):
+        self.duration = duration
+
+    def generate(self, descriptions):
+        self.started.set()
+        self.gate.wait(5)
+        self.calls.append((self.duration, list(descriptions)))
+        if self.fail and any(self.fail in d for d in descriptions):
+            raise RuntimeError("CUDA out of memory")
+        return [Wav(d, self.duration) for d in descriptions]
+
+
+def make_batcher(mg, model, **kw):
+    entry = SimpleNamespace(model=model, lock=threading.RLock())
+    return mg.MusicGenBatcher(entry, **kw)
+
+
+def submit_all(batcher, requests):
+    """Submit (prompt, duration) pairs from threads; returns {prompt: wav or exception}."""
+    out = {}
+
+    def one(prompt, duration):
+        try:
+            out[prompt] = batcher.submit(prompt, duration)
+        except Exception as e:
+            out[prompt] = e
+
+    threads = [threading.Thread(target=one, args=r) for r in requests]
+    for t in threads:
+        t.start()
+        time.sleep(0.01)   # keep submission order deterministic
+    return threads, out
+
+
+def queued(batcher):
+    with batcher._cond:
+        return sum(len(q) for q in batcher._pending.values())
+
+
+def wait_queued(batcher, n):
+    deadline = time.time() + 5
+    while queued(batcher) < n:
+        assert time.time() < deadline, "requests never queued"
+        time.sleep(0.01)
+
+
+def test_requests_inside_the_window_share_one_generate(mg):
+    model = DummyModel()
+    batcher = make_batcher(mg, model, window=0.5, max_batch=4)
+    threads, out = submit_all(batcher, [("rock", 10), ("jazz", 10), ("lofi", 10)])
+    for t in threads:
+        t.join(5)
+
+    assert model.calls == [(10, ["rock", "jazz", "lofi"])]
+    assert {p: w.prompt for p, w in out.items()} == {"rock": "rock", "jazz": "jazz", "lofi": "lofi"}
+    assert batcher.batches_run == 1 and batcher.requests_run == 3
+
+
+def test_zero_window_does_not_wait_for_company(mg):
+    model = DummyModel()
+    batcher = make_batcher(mg, model, window=0.0)
+    t0 = time.monotonic()
+    batcher.submit("rock", 10)
+    assert time.monotonic() - t0 < 0.2
+    assert model.calls == [(10, ["rock"])]
+
+
+def test_full_batch_starts_before_the_window_ends(mg):
+    model = DummyModel()
+    batcher = make_batcher(mg, model, window=5.0, max_batch=2)
+    t0 = time.monotonic()
+    threads, _ = submit_all(batcher, [("a", 10), ("b", 10)])
+    for t in threads:
+        t.join(5)
+    assert time.monotonic() - t0 < 2.0
+    assert model.calls == [(10, ["a", "b"])]
+
+
+def test_max_batch_splits_a_long_queue(mg):
+    model = DummyModel(block_first=True)
+    batcher = make_batcher(mg, model, window=0.0, max_batch=2)
+    threads, out = submit_all(batcher, [("p0", 10)])
+    assert model.started.wait(5)
+    more, _ = submit_all(batcher, [(f"p{i}", 10) for i in range(1, 6)])
+    wait_queued(batcher, 5)
+    model.gate.set()
+    for t in threads + more:
+        t.join(5)
+
+    assert [len(prompts) for _, prompts in model.calls] == [1, 2, 2, 1]
+
+
+def test_each_batch_has_a_single_duration_oldest_first(mg):
+    model = DummyModel(block_first=True)
+    batcher = make_batcher(mg, model, window=0.0, max_batch=4)
+    threads, _ = submit_all(batcher, [("first", 30)])
+    assert model.started.wait(5)
+    more, out = submit_all(batcher, [("a", 10), ("b", 20), ("c", 10), ("d", 20)])
+    wait_queued(batcher, 4)
+    model.gate.set()
+    for t in threads + more:
+        t.join(5)
+
+    assert model.calls == [(30, ["first"]), (10, ["a", "c"]), (20, ["b", "d"])]
+    assert all(out[p].duration == d for p, d in (("a", 10), ("b", 20), ("c", 10), ("d", 20)))
+
+
+def test_a_failed_batch_fails_every_caller_in_it_only(mg):
+    model = DummyModel(block_first=True, fail="bad")
+    batcher = make_batcher(mg, model, window=0.0, max_batch=4)
+    threads, out = submit_all(batcher, [("first", 10)])
+    assert model.started.wait(5)
+    more, out2 = submit_all(batcher, [("bad", 20), ("fine", 20), ("other", 30)])
+    wait_queued(batcher, 3)
+    model.gate.set()
+    for t in threads + more:
+        t.join(5)
+
+    assert isinstance(out2["bad"], RuntimeError) and isinstance(out2["fine"], RuntimeError)
+    assert str(out2["fine"]) == "CUDA out of memory"
+    assert out2["other"].prompt == "other"            # next batch still runs
+    assert out["first"].prompt == "first"
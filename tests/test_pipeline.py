@@ -0,0 +1,107 @@
+# tests/test_pipeline.py
+"""run_graph with plain callables: ordering, resource limits, failures."""
+import threading
+import time
+
+import pytest
+
+import pipeline
+from pipeline import Stage, StageFailed, run_graph
+
+
+def test_stages_see_their_dependencies_results():
+    order = []
+
+    def step(name, value):
+        def fn(deps):
+            order.append(name)
+            return value + sum(deps.values())
+        return fn
+
+    results = run_graph([
+        Stage("c", step("c", 100), deps=["a", "b"]),
+        Stage("a", step("a", 1)),
+        Stage("b", step("b", 10), deps=["a"]),
+    ])
+    assert results == {"a": 1, "b": 11, "c": 112}
+    assert order == ["a", "b", "c"]
+
+
+def test_initial_results_count_as_done():
+    results = run_graph([Stage("mix", lambda d: d["vocals"] + "+beat", deps=["vocals"])],
+                        initial={"vocals": "v"})
+    assert results == {"vocals": "v", "mix": "v+beat"}
+
+
+def test_unknown_dependency_and_cycles_are_rejected():
+    with pytest.raises(ValueError, match="unknown stage"):
+        run_graph([Stage("a", lambda d: 1, deps=["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        run_graph([Stage("a", lambda d: 1, deps=["b"]), Stage("b", lambda d: 1, deps=["a"])])
+    with pytest.raises(ValueError, match="unknown resource"):
+        Stage("a", lambda d: 1, resource="gpu")
+
+
+def test_resource_semaphore_bounds_concurrency(monkeypatch):
+    monkeypatch.setitem(pipeline._SEMAPHORES, "io", threading.BoundedSemaphore(2))
+    lock = threading.Lock()
+    active = peak = 0
+
+    def work(deps):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+
+    stages = [Stage(f"s{i}", work, resource="io") for i in range(6)]
+    stages.append(Stage("other", work, resource="net"))   # separate pool
+    run_graph(stages)
+    assert peak == 3
+
+
+def test_failure_is_raised_and_downstream_stages_skipped():
+    ran, events = [], []
+    release = threading.Event()
+
+    def boom(deps):
+        raise RuntimeError("no GPU")
+
+    def slow(deps):
+        release.wait(5)
+        ran.append("slow")
+        return "ok"
+
+    def after_fail(deps):
+        ran.append("after_fail")
+
+    def after_slow(deps):
+        ran.append("after_slow")
+
+    stages = [
+        Stage("boom", boom),
+        Stage("slow", slow, resource="io"),
+        Stage("after_fail", after_fail, deps=["boom"]),
+        Stage("after_slow", after_slow, deps=["slow"]),
+    ]
+    threading.Timer(0.1, release.set).start()
+    with pytest.raises(StageFailed) as err:
+        run_graph(stages, on_stage=lambda *e: events.append(e[:2]))
+
+    assert err.value.stage == "boom"
+    assert isinstance(err.value.error, RuntimeError)
+    assert ran == ["slow"]                   # running stages finish, nothing new starts
+    assert ("boom", "failed") in events
+    assert not any(name.startswith("after") for name, _ in events)
+
+
+def test_background_failures_are_logged_not_raised(capsys):
+    def boom(deps):
+        raise RuntimeError("upload refused")
+
+    t = pipeline.run_graph_background([Stage("upload", boom, resource="net")], initial={})
+    t.join(5)
+    assert not t.is_alive()
+    assert "upload refused" in capsys.readouterr().out
@@ -0,0 +1,218 @@
+# tests/test_rvc_worker.py
+"""RVC worker protocol, batching and model LRU with dummy converters."""
+import os
+import time
+import socket
+import threading
+
+import pytest
+
+import rvc_worker
+import rvc_converter
+from benchmarks.stubs import StubRVC, synth_wav
+from inference_server import RemoteError
+from rvc_worker import ModelCache, RvcBatcher, RvcClient, RvcServer
+
+
+class RecordingConverter:
+    """Writes the model path into each output; optionally blocks the first call."""
+
+    def __init__(self, block_first=False):
+        self.loaded = []
+        self.calls = []            # (kind, model, [inputs])
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        if not block_first:
+            self.gate.set()
+
+    def load_model(self, path):
+        self.loaded.append(path)
+        return {"path": path}
+
+    def convert(self, model, input_wav, output_wav):
+        self._wait()
+        self.calls.append(("single", model["path"], [input_wav]))
+        if input_wav.endswith("bad.wav"):
+            raise ValueError("unreadable input")
+        with open(output_wav, "w") as f:
+            f.write(model["path"])
+
+    def convert_batch(self, model, pairs):
+        self._wait()
+        self.calls.append(("batch", model["path"], [i for i, _ in pairs]))
+        for _, out in pairs:
+            with open(out, "w") as f:
+                f.write(model["path"])
+
+    def _wait(self):
+        self.started.set()
+        self.gate.wait(5)
+
+
+@pytest.fixture
+def models(tmp_path):
+    paths = {}
+    for name in "abc":
+        p = tmp_path / f"{name}.pth"
+        p.write_bytes(name.encode())
+        paths[name] = str(p)
+    return paths
+
+
+# --------------------------
+# Model LRU
+# --------------------------
+def test_models_load_once_and_evict_least_recently_used(models):
+    conv = RecordingConverter()
+    cache = ModelCache(conv, max_models=2)
+
+    cache.get(models["a"])
+    cache.get(models["b"])
+    cache.get(models["a"])            # a is now the most recent
+    cache.get(models["c"])            # evicts b
+    assert conv.loaded == [models["a"], models["b"], models["c"]]
+    assert cache.stats()["loaded"] == [models["a"], models["c"]]
+    assert cache.stats()["evictions"] == 1
+
+    cache.get(models["b"])            # reloaded, evicts a
+    assert conv.loaded[-1] == models["b"]
+    assert cache.stats()["loaded"] == [models["c"], models["b"]]
+
+
+def test_replaced_model_file_is_reloaded(models):
+    conv = RecordingConverter()
+    cache = ModelCache(conv, max_models=2)
+    cache.get(models["a"])
+    st = os.stat(models["a"])
+    os.utime(models["a"], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    cache.get(models["a"])
+    assert conv.loaded == [models["a"], models["a"]]
+    assert cache.stats()["loaded"] == [models["a"]]
+
+
+# --------------------------
+# Batching
+# --------------------------
+def test_queued_requests_for_one_model_run_as_a_batch(tmp_path, models):
+    conv = RecordingConverter(block_first=True)
+    batcher = RvcBatcher(conv, ModelCache(conv), window=0.0, max_batch=8)
+
+    def submit(i, model):
+        batcher.submit(str(tmp_path / f"in{i}.wav"), str(tmp_path / f"out{i}.wav"), models[model])
+
+    first = threading.Thread(target=submit, args=(0, "a"))
+    first.start()
+    assert conv.started.wait(5)       # request 0 is converting; the rest queue up
+    rest = [threading.Thread(target=submit, args=(i, m))
+            for i, m in ((1, "a"), (2, "a"), (3, "b"), (4, "a"))]
+    for t in rest:
+        t.start()
+    deadline = time.time() + 5
+    while batcher.stats()["queued"] < 4 and time.time() < deadline:
+        time.sleep(0.01)
+    conv.gate.set()
+    for t in [first] + rest:
+        t.join(5)
+
+    assert conv.calls[0] == ("single", models["a"], [str(tmp_path / "in0.wav")])
+    kind, model, inputs = conv.calls[1]
+    assert (kind, model) == ("batch", models["a"])
+    assert sorted(inputs) == sorted(str(tmp_path / f"in{i}.wav") for i in (1, 2, 4))
+    assert conv.calls[2] == ("single", models["b"], [str(tmp_path / "in3.wav")])
+    assert conv.loaded == [models["a"], models["b"]]
+    assert batcher.stats()["requests_run"] == 5
+    for i, m in ((0, "a"), (1, "a"), (2, "a"), (3, "b"), (4, "a")):
+        assert (tmp_path / f"out{i}.wav").read_text() == models[m]
+
+
+def test_max_batch_splits_the_queue(tmp_path, models):
+    conv = RecordingConverter(block_first=True)
+    batcher = RvcBatcher(conv, ModelCache(conv), window=0.0, max_batch=2)
+    threads = [threading.Thread(target=batcher.submit,
+                                args=(str(tmp_path / f"in{i}.wav"), str(tmp_path / f"o{i}.wav"), models["a"]))
+               for i in range(5)]
+    threads[0].start()
+    assert conv.started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    while batcher.stats()["queued"] < 4:
+        time.sleep(0.01)
+    conv.gate.set()
+    for t in threads:
+        t.join(5)
+    assert [len(inputs) for _, _, inputs in conv.calls] == [1, 2, 2]
+
+
+def test_errors_reach_only_the_failing_caller(tmp_path, models):
+    conv = RecordingConverter()
+    batcher = RvcBatcher(conv, ModelCache(conv))
+    with pytest.raises(ValueError, match="unreadable"):
+        batcher.submit(str(tmp_path / "bad.wav"), str(tmp_path / "x.wav"), models["a"])
+    assert batcher.submit(str(tmp_path / "ok.wav"), str(tmp_path / "y.wav"), models["a"])
+
+
+# --------------------------
+# Protocol (Unix socket)
+# --------------------------
+@pytest.fixture
+def server(tmp_path):
+    srv = RvcServer(converter=StubRVC(), path=str(tmp_path / "rvc.sock"), max_models=2)
+
+    def run():
+        try:
+            srv.serve_forever()
+        except OSError:
+            pass   # listening socket closed by the fixture
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    deadline = time.time() + 5
+    while not os.path.exists(srv.path) and time.time() < deadline:
+        time.sleep(0.01)
+    yield srv
+    srv.sock.shutdown(socket.SHUT_RDWR)   # wakes accept(); close() alone does not
+    t.join(5)
+    assert not t.is_alive()
+
+
+def test_convert_over_the_socket(tmp_path, models, server):
+    client = RvcClient(server.path, timeout=10)
+    src = synth_wav(str(tmp_path / "vocals.wav"), 1.0, 24000, "v")
+    out = str(tmp_path / "converted.wav")
+
+    assert client.convert(src, out, models["a"]) == out
+    assert os.path.getsize(out) == os.path.getsize(src)
+    ping = client.ping()
+    assert ping["pid"] == os.getpid()
+    assert ping["models"]["loaded"] == [models["a"]]
+    assert ping["requests_run"] == 1
+
+
+def test_remote_errors_are_raised_to_the_client(tmp_path, models, server):
+    client = RvcClient(server.path, timeout=10)
+    with pytest.raises(RemoteError, match="FileNotFoundError"):
+        client.convert(str(tmp_path / "missing.wav"), str(tmp_path / "o.wav"), models["a"])
+    with pytest.raises(RemoteError, match="unknown op"):
+        client.call("transcode")
+
+
+def test_convert_with_rvc_uses_the_worker(tmp_path, models, server, monkeypatch):
+    monkeypatch.setattr(rvc_worker, "RVC_WORKER_SOCKET", server.path)
+    monkeypatch.setattr(rvc_worker, "_CLIENT", RvcClient(server.path, timeout=10))
+    monkeypatch.setattr(rvc_converter.subprocess, "run", lambda *a, **k: pytest.fail("CLI used"))
+    src = synth_wav(str(tmp_path / "vocals.wav"), 0.5, 24000, "v")
+    out = str(tmp_path / "converted.wav")
+    assert rvc_converter.convert_with_rvc(src, out, models["a"]) == out
+    assert os.path.exists(out)
+
+
+def test_convert_with_rvc_falls_back_to_the_cli(tmp_path, models, monkeypatch):
+    dead = str(tmp_path / "nobody.sock")
+    monkeypatch.setattr(rvc_worker, "RVC_WORKER_SOCKET", dead)
+    monkeypatch.setattr(rvc_worker, "_CLIENT", RvcClient(dead, timeout=1))
+    calls = []
+    monkeypatch.setattr(rvc_converter.subprocess, "run", lambda cmd, **k: calls.append(cmd))
+
+    out = str(tmp_path / "o.wav")
+    assert rvc_converter.convert_with_rvc("in.wav", out, models["a"]) == out
+    assert calls and calls[0][1:] == ["rvc_infer.py", "--model", models["a"], "--in", "in.wav", "--out", out]
@@ -0,0 +1,158 @@
+# tests/test_uploader.py
+"""Uploader against a stub GitHub contents API (no network)."""
+import json
+import time
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from uploader import Uploader, DONE, FAILED, TOO_LARGE
+
+
+class StubGitHub:
+    """Answers PUTs with the scripted status codes, then 201s."""
+
+    def __init__(self, script=(), headers=None):
+        self.script = list(script)
+        self.headers = headers or {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_PUT(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append((self.path, self.headers.get("Authorization"), body))
+                status = stub.script.pop(0) if stub.script else 201
+                self.send_response(status)
+                for k, v in stub.headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def sample(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(bytes(range(256)) * 1000)
+    return path
+
+
+def make_uploader(tmp_path, stub, **kw):
+    kw.setdefault("backoff_base", 0.01)
+    return Uploader(db_path=str(tmp_path / "uploads.db"), concurrency=1, api_url=stub.url,
+                    user="me", repo="songs", token="t0ken", poll=0.02, **kw)
+
+
+def wait_for(uploader, row_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        row = uploader.status(row_id)
+        if row["status"] in (DONE, FAILED, TOO_LARGE):
+            return row
+        time.sleep(0.02)
+    raise AssertionError(f"upload still {row['status']} after {timeout}s")
+
+
+def test_upload_sends_base64_json(tmp_path, sample):
+    stub = StubGitHub()
+    try:
+        up = make_uploader(tmp_path, stub)
+        row = wait_for(up, up.enqueue(str(sample), "d-output"))
+    finally:
+        stub.close()
+
+    assert row["status"] == DONE and row["attempts"] == 1
+    path, auth, body = stub.requests[0]
+    assert path == "/repos/me/songs/contents/d-output/song.mp3"
+    assert auth == "token t0ken"
+    payload = json.loads(body)
+    assert payload["message"] == "Add song.mp3"
+    assert base64.b64decode(payload["content"]) == sample.read_bytes()
+
+
+def test_transient_errors_are_retried(tmp_path, sample):
+    stub = StubGitHub(script=[503, 429, 502])
+    try:
+        up = make_uploader(tmp_path, stub)
+        row = wait_for(up, up.enqueue(str(sample)))
+    finally:
+        stub.close()
+
+    assert row["status"] == DONE
+    assert row["attempts"] == 4
+    assert len(stub.requests) == 4
+
+
+def test_gives_up_after_max_attempts(tmp_path, sample):
+    stub = StubGitHub(script=[500] * 10)
+    try:
+        up = make_uploader(tmp_path, stub, max_attempts=3)
+        row = wait_for(up, up.enqueue(str(sample)))
+    finally:
+        stub.close()
+
+    assert row["status"] == FAILED
+    assert row["attempts"] == 3
+    assert row["last_error"] == "HTTP 500"
+
+
+def test_client_errors_are_not_retried(tmp_path, sample):
+    stub = StubGitHub(script=[422])
+    try:
+        up = make_uploader(tmp_path, stub)
+        row = wait_for(up, up.enqueue(str(sample)))
+    finally:
+        stub.close()
+
+    assert row["status"] == FAILED
+    assert row["attempts"] == 1
+    assert len(stub.requests) == 1
+
+
+def test_retry_after_header_sets_the_delay(tmp_path, sample):
+    stub = StubGitHub(script=[429], headers={"Retry-After": "1"})
+    try:
+        up = make_uploader(tmp_path, stub)
+        t0 = time.time()
+        row = wait_for(up, up.enqueue(str(sample)))
+        elapsed = time.time() - t0
+    finally:
+        stub.close()
+
+    assert row["status"] == DONE
+    assert elapsed >= 1.0
+
+
+def test_oversized_files_are_skipped(tmp_path, sample):
+    stub = StubGitHub()
+    try:
+        up = make_uploader(tmp_path, stub, max_bytes=1000)
+        row = wait_for(up, up.enqueue(str(sample)))
+    finally:
+        stub.close()
+
+    assert row["status"] == TOO_LARGE
+    assert stub.requests == []
+
+
+def test_backoff_is_exponential_with_jitter(tmp_path):
+    up = Uploader(db_path=str(tmp_path / "uploads.db"), backoff_base=2.0)
+    for attempt in range(1, 6):
+        full = 2.0 * 2 ** (attempt - 1)
+        for _ in range(20):
+            assert full * 0.5 <= up._backoff(attempt, None) <= full
+    assert up._backoff(3, 7.0) == 7.0
@@ -2,23 +2,24 @@
 import os
 import random
 import time
-from moviepy.editor import (
-    VideoFileClip, AudioFileClip, TextClip,
-    CompositeVideoClip, ColorClip, ImageClip
-)
-from pydub import AudioSegment
 from langchain.tools import tool
-from langchain_community.utilities import GoogleSerperAPIWrapper
 
-# ==========================
-# NEW: OPENVOICE IMPORTS
-# ==========================
-from openvoice import se_extractor
-from openvoice.api import TTS
+# moviepy, pydub, serper and openvoice are imported inside the functions
+# that need them, so importing this module stays cheap.
 
-# --- initialize TTS model ---
-OPENVOICE_MODEL = TTS(language="en")
+from model_registry import REGISTRY
+from chunked_tts import CHUNKED_TTS, CHUNKED_MIN_CHARS, synthesize_chunked
+from speaker_cache import get_speaker_cache
+
+
+# --- TTS model is loaded once per process, on first use ---
 # models auto-download to ~/.cache/openvoice
+def _load_openvoice():
+    from openvoice.api import TTS
+    return TTS(language="en")
+
+
+REGISTRY.register("openvoice", _load_openvoice)
 
 OUTPUT_DIR = "output"
 PUBLIC_DIR = "public_downloads"
@@ -34,20 +35,13 @@ def search_online_asset(asset_type: str, query: str) -> str:
     """
     Search online images/videos using Google Serper API.
     Returns ONE usable URL or 'none'.
+    Lookups are cached (assets.AssetSearch); use assets.fetch_asset for a
+    local, pre-sized copy instead of a URL.
     """
-    try:
-        search = GoogleSerperAPIWrapper()
-        results = search.results(f"{query} {asset_type} free image")
-        urls = []
-
-        for r in results.get("organic", []):
-            link = r.get("link", "")
-            if any(x in link for x in ["pexels.com", "unsplash.com", "pixabay.com"]):
-                urls.append(link)
+    from assets import get_search
 
-        return random.choice(urls) if urls else "none"
-    except:
-        return "none"
+    urls = get_search().search(asset_type, query)
+    return random.choice(urls) if urls else "none"
 
 
 # ============================================================
@@ -74,7 +68,8 @@ def generate_voice_openvoice(
     if voice_clone_sample and os.path.exists(voice_clone_sample):
         try:
             print("Extracting voice embedding...")
-            reference_se = se_extractor.get_se(voice_clone_sample)
+            # cached by sample content; usually precomputed at upload time
+            reference_se = get_speaker_cache().get(voice_clone_sample)
         except:
             reference_se = None
     else:
@@ -85,13 +80,19 @@ def generate_voice_openvoice(
     # --------------------------
     out_path = f"{OUTPUT_DIR}/voice_{user_id}.wav"
 
+    if CHUNKED_TTS and len(lyrics) >= CHUNKED_MIN_CHARS:
+        # long lyrics: split on line/sentence ends and synthesize in parallel
+        return synthesize_chunked(lyrics, reference_se, out_path)
+
     print("Generating audio with OpenVoice...")
-    OPENVOICE_MODEL.tts(
-        text=lyrics,
-        output_path=out_path,
-        speaker_embedding=reference_se,   # None = default voice
-        speed=1.0
-    )
+    ov = REGISTRY.entry("openvoice")
+    with ov.lock:
+        ov.model.tts(
+            text=lyrics,
+            output_path=out_path,
+            speaker_embedding=reference_se,   # None = default voice
+            speed=1.0
+        )
 
     return out_path
 
@@ -115,6 +116,11 @@ def generate_visual_mp4(
       - simple_mp4 (black + title + lyrics)
       - high_mp4 (merged video + audio)
     """
+    from moviepy.editor import (
+        VideoFileClip, AudioFileClip, TextClip,
+        CompositeVideoClip, ColorClip, ImageClip
+    )
+    from pydub import AudioSegment
 
     audio = AudioFileClip(audio_path)
 
@@ -127,7 +133,10 @@ def generate_visual_mp4(
 
         if pic and pic != "none":
             try:
-                img = ImageClip(pic).resize((1280, 720)).set_duration(audio.duration)
+                img = ImageClip(pic)
+                if tuple(img.size) != (1280, 720):   # assets.fetch_asset files already are
+                    img = img.resize((1280, 720))
+                img = img.set_duration(audio.duration)
                 bg_clip = CompositeVideoClip([img])
             except:
                 pass
@@ -158,7 +167,13 @@ def generate_visual_mp4(
 
         if video and video != "none":
             try:
-                vid = VideoFileClip(video).subclip(0, audio.duration).resize((1280, 720))
+                vid = VideoFileClip(video, audio=False)
+                if vid.duration < audio.duration:
+                    vid = vid.loop(duration=audio.duration)
+                else:
+                    vid = vid.subclip(0, audio.duration)
+                if tuple(vid.size) != (1280, 720):
+                    vid = vid.resize((1280, 720))
             except:
                 vid = ColorClip(size=(1280,720), color=(0,0,0), duration=audio.duration)
         else:
@@ -207,22 +222,24 @@ def store_generation(
     file_path: str,
     file_format: str,
     pic_url: str | None,
-    video_url: str | None
+    video_url: str | None,
+    job_id: str | None = None
 ):
     """
-    Store generation metadata in simple log.
+    Store generation metadata in the music_generations table.
+    Writes are buffered and committed in batches (see database.GenerationStore).
     """
-
-    with open("generation_log.txt", "a") as f:
-        f.write(
-            f"\nUSER: {user_id}\n"
-            f"TITLE: {title}\n"
-            f"FORMAT: {file_format}\n"
-            f"FILE: {file_path}\n"
-            f"PIC: {pic_url}\n"
-            f"VIDEO: {video_url}\n"
-            f"LYRICS_LEN: {len(lyrics)}\n"
-            f"---------------------------\n"
-        )
+    from database import get_store
+
+    get_store().record(
+        user_id=user_id,
+        job_id=job_id,
+        title=title,
+        lyrics=lyrics,
+        file_path=file_path,
+        file_format=file_format,
+        instrument_pic=pic_url,
+        instrument_video=video_url
+    )
 
     return "stored"
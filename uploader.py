@@ -0,0 +1,295 @@
+# uploader.py
+import os
+import json
+import time
+import base64
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# -----------------------------------
+# Config
+# -----------------------------------
+GITHUB_USER = os.getenv("GITHUB_USER")
+GITHUB_REPO = os.getenv("GITHUB_REPO")
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")   # point at a stub in tests
+
+UPLOAD_QUEUE_DB = os.getenv("UPLOAD_QUEUE_DB", "uploads.db")
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", 2))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", 6))
+UPLOAD_BACKOFF_BASE = float(os.getenv("UPLOAD_BACKOFF_BASE", 2.0))    # seconds
+UPLOAD_BACKOFF_MAX = float(os.getenv("UPLOAD_BACKOFF_MAX", 300.0))
+UPLOAD_TIMEOUT = (10, float(os.getenv("UPLOAD_READ_TIMEOUT", 300)))     # connect, read
+# the contents API rejects files over 100 MB; anything bigger is not attempted
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", 100)) * 2**20)
+UPLOAD_LEASE = 30 * 60        # a claimed row older than this is retried (crashed worker)
+UPLOAD_POLL = 2.0
+
+PENDING = "pending"
+UPLOADING = "uploading"
+DONE = "done"
+FAILED = "failed"
+TOO_LARGE = "too_large"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    path        TEXT NOT NULL,
+    folder      TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    next_at     REAL NOT NULL,
+    claimed_at  REAL,
+    last_error  TEXT,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_uploads_status ON uploads (status, next_at);
+"""
+
+
+class RetryableError(Exception):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+class Base64JSONBody:
+    """
+    Streams {"message": ..., "content": "<base64 of file>"} without ever
+    holding the file or its encoding in memory. __len__ lets requests send a
+    Content-Length instead of chunked encoding.
+    """
+
+    CHUNK = 3 * 256 * 1024   # multiple of 3 so chunks encode independently
+
+    def __init__(self, path: str, fields: dict):
+        self.path = path
+        head = json.dumps(fields)[:-1]   # drop closing brace
+        self.prefix = (head + (', ' if fields else '') + '"content": "').encode("utf-8")
+        self.suffix = b'"}'
+        size = os.path.getsize(path)
+        self.length = len(self.prefix) + 4 * ((size + 2) // 3) + len(self.suffix)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        yield self.prefix
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(self.CHUNK), b""):
+                yield base64.b64encode(block)
+        yield self.suffix
+
+
+def uploader_configured() -> bool:
+    return bool(GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN)
+
+
+class Uploader:
+    """
+    Durable background uploader for the GitHub contents API.
+    enqueue() only writes a row to SQLite; worker threads claim rows, upload
+    through a pooled per-thread session and retry transient failures with
+    exponential backoff and jitter. Rows survive restarts, and claims are
+    atomic, so several processes can share one queue.
+    """
+
+    def __init__(self, db_path: str = UPLOAD_QUEUE_DB, concurrency: int = UPLOAD_CONCURRENCY,
+                 api_url: str = GITHUB_API_URL, user: str | None = GITHUB_USER,
+                 repo: str | None = GITHUB_REPO, token: str | None = GITHUB_TOKEN,
+                 max_attempts: int = UPLOAD_MAX_ATTEMPTS, max_bytes: int = UPLOAD_MAX_BYTES,
+                 backoff_base: float = UPLOAD_BACKOFF_BASE, poll: float = UPLOAD_POLL):
+        self.db_path = db_path
+        self.concurrency = max(1, concurrency)
+        self.api_url = api_url.rstrip("/")
+        self.user, self.repo, self.token = user, repo, token
+        self.max_attempts = max_attempts
+        self.max_bytes = max_bytes
+        self.backoff_base = backoff_base
+        self.poll = poll
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # --------------------------
+    # Public API
+    # --------------------------
+    def enqueue(self, path: str, folder: str = "d-output") -> int:
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO uploads (path, folder, status, next_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), folder, PENDING, now, now),
+            )
+            row_id = cur.lastrowid
+        self.start()
+        self._wake.set()
+        return row_id
+
+    def start(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.concurrency):
+                t = threading.Thread(target=self._worker, name=f"uploader-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stats(self) -> dict:
+        with self._conn() as conn:
+            return {r["status"]: r["n"] for r in
+                    conn.execute("SELECT status, COUNT(*) AS n FROM uploads GROUP BY status")}
+
+    def status(self, row_id: int) -> dict | None:
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM uploads WHERE id = ?", (row_id,)).fetchone()
+        return dict(row) if row else None
+
+    # --------------------------
+    # Queue
+    # --------------------------
+    def _claim(self):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM uploads WHERE (status = ? AND next_at <= ?) "
+                "OR (status = ? AND claimed_at < ?) ORDER BY next_at LIMIT 1",
+                (PENDING, now, UPLOADING, now - UPLOAD_LEASE),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE uploads SET status = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (UPLOADING, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        return dict(row, attempts=row["attempts"] + 1) if row else None
+
+    def _finish(self, row_id: int, status: str, error: str | None = None, next_at: float | None = None):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE uploads SET status = ?, last_error = ?, next_at = COALESCE(?, next_at), "
+                "claimed_at = NULL WHERE id = ?",
+                (status, error, next_at, row_id),
+            )
+
+    def _backoff(self, attempts: int, retry_after: float | None) -> float:
+        if retry_after is not None:
+            return retry_after
+        delay = min(UPLOAD_BACKOFF_MAX, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _worker(self):
+        while True:
+            row = self._claim()
+            if row is None:
+                self._wake.wait(self.poll)
+                self._wake.clear()
+                continue
+
+            name = os.path.basename(row["path"])
+            try:
+                self._upload(row["path"], row["folder"])
+                self._finish(row["id"], DONE)
+                print(f"[uploader] {name} uploaded")
+            except FileTooLarge as e:
+                self._finish(row["id"], TOO_LARGE, str(e))
+                print(f"[uploader] {name} skipped: {e}")
+            except RetryableError as e:
+                if row["attempts"] >= self.max_attempts:
+                    self._finish(row["id"], FAILED, str(e))
+                    print(f"[uploader] {name} FAILED after {row['attempts']} attempts: {e}")
+                else:
+                    delay = self._backoff(row["attempts"], e.retry_after)
+                    self._finish(row["id"], PENDING, str(e), next_at=time.time() + delay)
+                    print(f"[uploader] {name} attempt {row['attempts']} failed ({e}); retry in {delay:.1f}s")
+            except Exception as e:
+                self._finish(row["id"], FAILED, str(e))
+                print(f"[uploader] {name} FAILED: {e}")
+
+    # --------------------------
+    # HTTP
+    # --------------------------
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            s.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            s.headers["Authorization"] = f"token {self.token}"
+            s.headers["Accept"] = "application/vnd.github+json"
+            self._local.session = s
+        return s
+
+    def _upload(self, path: str, folder: str):
+        import requests
+
+        if not (self.user and self.repo and self.token):
+            raise RuntimeError("GITHUB_USER / GITHUB_REPO / GITHUB_TOKEN not set")
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            raise FileTooLarge(f"{size} bytes exceeds the {self.max_bytes} byte API limit")
+
+        filename = os.path.basename(path)
+        url = f"{self.api_url}/repos/{self.user}/{self.repo}/contents/{folder}/{filename}"
+        body = Base64JSONBody(path, {"message": f"Add {filename}"})
+        try:
+            r = self._session().put(
+                url, data=body, timeout=UPLOAD_TIMEOUT,
+                headers={"Content-Type": "application/json"},
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}")
+
+        if r.status_code in (200, 201):
+            return
+        if r.status_code in (408, 429) or r.status_code >= 500 or (
+            r.status_code == 403 and r.headers.get("X-RateLimit-Remaining") == "0"
+        ):
+            retry_after = r.headers.get("Retry-After")
+            raise RetryableError(
+                f"HTTP {r.status_code}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        raise RuntimeError(f"HTTP {r.status_code}: {r.text[:200]}")
+
+
+_UPLOADER = None
+_UPLOADER_LOCK = threading.Lock()
+
+
+def get_uploader() -> Uploader:
+    global _UPLOADER
+    with _UPLOADER_LOCK:
+        if _UPLOADER is None:
+            _UPLOADER = Uploader()
+        return _UPLOADER
+
+
+def upload_to_github(local_path, github_folder="d-output"):
+    """Queue local_path for background upload; returns immediately."""
+    try:
+        get_uploader().enqueue(local_path, github_folder)
+        return True
+    except Exception as e:
+        print("GH upload enqueue error:", e)
+        return False